@@ -0,0 +1,37 @@
+"""Create ticks table
+
+Revision ID: 7b3d9e1f4a60
+Revises: 5a9c2e7d4b18
+Create Date: 2026-10-19 16:41:08.217354
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3d9e1f4a60'
+down_revision: Union[str, None] = '5a9c2e7d4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Partitions (one per day) are created by the application as datasets are ingested.
+    op.create_table('ticks',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('ticker_code', sa.String(length=4), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    postgresql_partition_by='RANGE (time)'
+    )
+    op.create_index('ix_ticks_brin', 'ticks', ['ticker_code', 'time'], unique=False, postgresql_using='brin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ticks_brin', table_name='ticks', postgresql_using='brin')
+    op.drop_table('ticks')
@@ -0,0 +1,12 @@
+"""
+Local load-testing harness.
+
+Starts the app with uvicorn against a throwaway SQLite file (or a Postgres database given by
+``--database-uri``), seeds users with custom tickers, drives concurrent virtual users
+through a weighted mix of scenarios, and reports throughput and latency percentiles per
+route as JSON::
+
+    python -m loadtest --users 50 --workers 4 --duration 30 --mix details=5,series=3,login=1,stream=1
+
+Needs ``httpx``, plus ``websockets`` for the stream scenario (see requirements.txt here).
+"""
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from loadtest.scenarios import SCENARIOS, Recorder, VirtualUser, websockets
+from loadtest.server import free_port, seed_database, server_environment, start_server, stop_server
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}'; choose from {', '.join(SCENARIOS)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Load-tests the app locally.")
+    parser.add_argument("--database-uri", help="SQLAlchemy URI of the database; defaults to a temporary SQLite file")
+    parser.add_argument("--url", help="Test an already running server instead of starting one; its database must be the one given")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=20, help="seeded users, and concurrent virtual users")
+    parser.add_argument("--tickers-per-user", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("login=1,details=5,series=3,stream=1"),
+                        help="weighted scenarios, e.g. details=5,series=3")
+    parser.add_argument("--series-pages", type=int, default=3, help="pages followed by cursor per series scenario")
+    parser.add_argument("--series-limit", type=int, default=1000)
+    parser.add_argument("--stream-seconds", type=float, default=5.0)
+    parser.add_argument("--stream-speed", type=float, default=100.0)
+    parser.add_argument("--output", help="JSON report path; defaults to stdout")
+    return parser.parse_args()
+
+
+async def drive(args: argparse.Namespace, base_url: str, seeded: list[tuple[str, list[str]]]) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        users = [
+            VirtualUser(
+                client,
+                recorder,
+                email,
+                codes,
+                series_pages=args.series_pages,
+                series_limit=args.series_limit,
+                stream_seconds=args.stream_seconds,
+                stream_speed=args.stream_speed,
+                seed=i,
+            )
+            for i, (email, codes) in enumerate(seeded)
+        ]
+        start = time.monotonic()
+        await asyncio.gather(*(user.run(args.mix, start + args.duration) for user in users))
+        duration = time.monotonic() - start
+    report = recorder.report(duration)
+    report["config"] = {
+        "workers": args.workers,
+        "users": args.users,
+        "mix": args.mix,
+        "database": args.database_uri.split(":", 1)[0],
+    }
+    return report
+
+
+def main() -> None:
+    args = parse_args()
+    if "stream" in args.mix and websockets is None:
+        print("websockets is not installed; skipping the stream scenario.", file=sys.stderr)
+        del args.mix["stream"]
+    if not args.mix:
+        sys.exit("No scenario to run.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database_uri is None:
+            args.database_uri = f"sqlite:///{os.path.join(directory, 'loadtest.db')}"
+        env = server_environment(args.database_uri)
+        os.environ.update(env)
+        seeded = seed_database(args.users, args.tickers_per_user)
+
+        process = None
+        base_url = args.url
+        if base_url is None:
+            port = free_port()
+            process = start_server(env, port, args.workers)
+            base_url = f"http://127.0.0.1:{port}"
+        try:
+            report = asyncio.run(drive(args, base_url, seeded))
+        finally:
+            if process is not None:
+                stop_server(process)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Virtual users, the scenarios they run, and the latency report."""
+import asyncio
+import random
+import string
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+try:
+    import websockets
+except ImportError:  # only the stream scenario needs it
+    websockets = None
+
+from loadtest.server import PASSWORD
+
+API = "/api/v1"
+SCENARIOS = ("login", "details", "series", "stream")
+BUILT_IN_CATEGORIES = "ABCDEF"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.frames: dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, duration: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            milliseconds = np.asarray(latencies) * 1000
+            p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+            routes[route] = {
+                "requests": len(latencies),
+                "errors": self.errors[route],
+                "throughput_per_second": len(latencies) / duration,
+                "latency_ms": {
+                    "mean": float(milliseconds.mean()),
+                    "p50": float(p50),
+                    "p95": float(p95),
+                    "p99": float(p99),
+                    "max": float(milliseconds.max()),
+                },
+            }
+            if route in self.frames:
+                routes[route]["frames"] = self.frames[route]
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "duration_seconds": duration,
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_per_second": total / duration,
+            "routes": routes,
+        }
+
+
+def random_built_in_code(rng: random.Random) -> str:
+    return (
+        rng.choice(BUILT_IN_CATEGORIES)
+        + rng.choice(string.ascii_uppercase)
+        + rng.choice(string.ascii_uppercase)
+        + rng.choice("ABC")
+    )
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        recorder: Recorder,
+        email: str,
+        codes: list[str],
+        *,
+        series_pages: int,
+        series_limit: int,
+        stream_seconds: float,
+        stream_speed: float,
+        seed: int,
+    ):
+        self.client = client
+        self.recorder = recorder
+        self.email = email
+        self.codes = codes
+        self.series_pages = series_pages
+        self.series_limit = series_limit
+        self.stream_seconds = stream_seconds
+        self.stream_speed = stream_speed
+        self.rng = random.Random(seed)
+        self.token: str | None = None
+
+    def random_code(self) -> str:
+        """One of the user's own tickers half of the time, when they have any."""
+        if self.codes and self.rng.random() < 0.5:
+            return self.rng.choice(self.codes)
+        return random_built_in_code(self.rng)
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        if self.token is not None:
+            kwargs.setdefault("headers", {})["Authorization"] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(route, time.perf_counter() - start, False)
+            return None
+        self.recorder.record(route, time.perf_counter() - start, response.status_code < 400)
+        return response
+
+    async def login(self) -> None:
+        self.token = None
+        response = await self.request(
+            "POST /auth/login/access-token",
+            "POST",
+            f"{API}/auth/login/access-token",
+            data={"username": self.email, "password": PASSWORD},
+        )
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["access_token"]
+
+    async def details(self) -> None:
+        await self.request("GET /ticker/{code}", "GET", f"{API}/ticker/{self.random_code()}")
+
+    async def series(self) -> None:
+        code = self.random_code()
+        # Anywhere in the first four years, so some pages need long seeks.
+        start = 1577836800 + self.rng.randrange(4 * 365 * 86400)
+        params = {"start": start, "interval": 60, "limit": self.series_limit}
+        for _ in range(self.series_pages):
+            response = await self.request("GET /ticker/{code}/series", "GET", f"{API}/ticker/{code}/series", params=params)
+            if response is None or response.status_code != 200:
+                return
+            params = {"cursor": response.json()["next_cursor"], "limit": self.series_limit}
+
+    async def stream(self) -> None:
+        route = "WS /ticker/{code}/stream"
+        base_url = str(self.client.base_url).replace("http", "ws", 1).rstrip("/")
+        url = (
+            f"{base_url}{API}/ticker/{self.random_code()}/stream"
+            f"?token={self.token}&speed={self.stream_speed}&interval=1"
+        )
+        start = time.perf_counter()
+        try:
+            async with websockets.connect(url) as websocket:
+                # The latency of a subscription is the time to its first frame.
+                await websocket.recv()
+                self.recorder.record(route, time.perf_counter() - start, True)
+                frames = 1
+                deadline = time.monotonic() + self.stream_seconds
+                while (remaining := deadline - time.monotonic()) > 0:
+                    try:
+                        await asyncio.wait_for(websocket.recv(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    frames += 1
+                self.recorder.frames[route] += frames
+        except (OSError, websockets.WebSocketException):
+            self.recorder.record(route, time.perf_counter() - start, False)
+
+    async def run(self, mix: dict[str, float], deadline: float) -> None:
+        await self.login()
+        scenarios, weights = zip(*mix.items())
+        while time.monotonic() < deadline:
+            if self.token is None:
+                await self.login()
+                if self.token is None:
+                    await asyncio.sleep(1.0)
+                    continue
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await getattr(self, scenario)()
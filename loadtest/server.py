@@ -0,0 +1,133 @@
+"""Seeding the database and running the app under uvicorn for a load test."""
+import itertools
+import os
+import secrets
+import socket
+import string
+import subprocess
+import sys
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "loadtest-password"
+EMAIL_DOMAIN = "loadtest.example.com"
+
+
+def server_environment(database_uri: str) -> dict[str, str]:
+    env = dict(os.environ)
+    env["DATABASE_URI_OVERRIDE"] = database_uri
+    # Unused with the override, but required by Settings.
+    env.setdefault("POSTGRES_HOST", "localhost")
+    env.setdefault("POSTGRES_USER", "loadtest")
+    env.setdefault("POSTGRES_PASSWORD", "loadtest")
+    env.setdefault("AWS_REGION", "us-east-1")
+    # Every worker must sign and verify tokens with the same key.
+    env.setdefault("SECRET_KEY", secrets.token_urlsafe(32))
+    return env
+
+
+def user_defined_ticker_codes():
+    letters = string.ascii_uppercase[string.ascii_uppercase.index("G"):]
+    for first, second, third, market in itertools.product(letters, letters, letters, "ABC"):
+        yield first + second + third + market
+
+
+def seed_database(users: int, tickers_per_user: int) -> list[tuple[str, list[str]]]:
+    """
+    Creates the tables if needed and replaces any earlier load-test users with ``users`` new
+    ones, each owning ``tickers_per_user`` tickers. Returns the emails with their ticker codes.
+
+    Must run with the environment of ``server_environment`` already applied.
+    """
+    from sqlalchemy import delete, select
+
+    import src.api  # noqa: F401 (registers every model)
+    from src.database import Base, SessionLocal, engine
+    from src.security import get_password_hash
+    from src.ticker.models import UserDefinedTicker
+    from src.user.models import User
+
+    Base.metadata.create_all(engine)
+    # bcrypt is deliberately slow; every user shares the password, so hash it once.
+    hashed_password = get_password_hash(PASSWORD)
+    seeded = []
+    with SessionLocal() as session:
+        old_users = select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+        session.execute(delete(UserDefinedTicker).where(UserDefinedTicker.user_id.in_(old_users)))
+        session.execute(delete(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")))
+        taken = set(session.scalars(select(UserDefinedTicker.ticker_code)))
+        codes = (code for code in user_defined_ticker_codes() if code not in taken)
+        for i in range(users):
+            user = User(
+                email=f"user{i}@{EMAIL_DOMAIN}",
+                hashed_password=hashed_password,
+                is_active=True,
+                is_superuser=False,
+                first_name="Load",
+                last_name=f"Test {i}",
+                # High enough that the test measures the app, not the quotas.
+                requests_per_second=1e9,
+                points_per_second=1e12,
+            )
+            session.add(user)
+            session.flush()
+            user_codes = list(itertools.islice(codes, tickers_per_user))
+            for j, code in enumerate(user_codes):
+                session.add(UserDefinedTicker(
+                    user_id=user.id,
+                    ticker_code=code,
+                    name=f"Load test ticker {code}",
+                    description="Seeded by the load-testing harness.",
+                    sector="Load Testing",
+                    drift=5.0 + j % 5,
+                    volatility=15.0 + j % 20,
+                    jump_intensity=1.0 + j % 3,
+                    jump_mean=-1.0 + j % 3,
+                    jump_std_dev=2.0 + j % 4,
+                ))
+            seeded.append((user.email, user_codes))
+        session.commit()
+    return seeded
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env: dict[str, str], port: int, workers: int, timeout: float = 60.0) -> subprocess.Popen:
+    """Runs uvicorn in a subprocess and waits until it answers."""
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
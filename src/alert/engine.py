@@ -0,0 +1,261 @@
+"""
+Evaluation of price alerts against the live ticks of their tickers.
+
+Alerts are kept per series in two sorted lists: ``ABOVE`` alerts by descending level and
+``BELOW`` alerts by ascending level. The alerts a move fires are then always a suffix of each
+list: those at or under the move's high, and those at or over its low. Each evaluation finds
+both suffixes with one bisect each and cuts them off, so it costs O(log n) plus the alerts
+actually fired, however many alerts are waiting.
+
+Alerts follow the ticker at ``settings.ALERT_INTERVAL`` seconds, the same ticks a live stream
+at that interval shows. Each series with alerts is a ``forward_series`` of the book's own,
+which forgets the blocks it has walked past: it keeps a few blocks' worth of state, however
+short the interval, instead of every block since the epoch.
+
+One worker process per host evaluates: the one holding an ``flock`` on
+``settings.ALERT_LOCK_PATH``. It picks up new alerts from the database every
+``ALERT_SYNC_SECONDS`` and rebuilds its book every ``ALERT_RELOAD_SECONDS``, which also drops
+deleted alerts. Firing locks the rows with ``SKIP LOCKED`` and only takes those still active,
+so evaluators on several hosts still deliver each alert once.
+"""
+import asyncio
+import bisect
+import datetime
+import fcntl
+import logging
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.alert import service
+from src.alert.schemas import AlertChannelEnum, AlertDirectionEnum
+from src.config import settings
+from src.database import SessionLocal
+from src.email import service as email_service
+from src.ticker import service as ticker_service
+from src.ticker.generation import Series, forward_series, live_step, params_hash, series_key, step_timestamp
+from src.ticker.schemas import TickerDetails
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FiredAlert:
+    alert_id: int
+    step: int
+    price: float
+
+
+class SeriesAlerts:
+    """The alerts waiting on one series, a ``forward_series`` of their own."""
+
+    __slots__ = ("series", "next_step", "last_price", "above_keys", "above_ids", "below_keys", "below_ids")
+
+    def __init__(self, series: Series, next_step: int):
+        self.series = series
+        self.next_step = next_step
+        self.last_price = float(series.prices(next_step - 1, next_step)[0])
+        series.forget_before(next_step - 1)
+        # Negated levels, so that the list is ascending and the highest alerts come first.
+        self.above_keys: list[float] = []
+        self.above_ids: list[int] = []
+        self.below_keys: list[float] = []
+        self.below_ids: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.above_ids) + len(self.below_ids)
+
+    def add_many(self, alerts: list[tuple[int, AlertDirectionEnum, float]]) -> None:
+        """Adds alerts in bulk with one sort per list, instead of one insertion each."""
+        above = list(zip(self.above_keys, self.above_ids))
+        below = list(zip(self.below_keys, self.below_ids))
+        for alert_id, direction, level in alerts:
+            if direction == AlertDirectionEnum.ABOVE:
+                above.append((-level, alert_id))
+            else:
+                below.append((level, alert_id))
+        above.sort()
+        below.sort()
+        self.above_keys, self.above_ids = [key for key, _ in above], [alert_id for _, alert_id in above]
+        self.below_keys, self.below_ids = [key for key, _ in below], [alert_id for _, alert_id in below]
+
+    def add(self, alert_id: int, direction: AlertDirectionEnum, level: float) -> None:
+        if direction == AlertDirectionEnum.ABOVE:
+            position = bisect.bisect_right(self.above_keys, -level)
+            self.above_keys.insert(position, -level)
+            self.above_ids.insert(position, alert_id)
+        else:
+            position = bisect.bisect_right(self.below_keys, level)
+            self.below_keys.insert(position, level)
+            self.below_ids.insert(position, alert_id)
+
+    def advance(self, due_step: int, max_steps: int) -> list[FiredAlert]:
+        """Evaluates the ticks up to ``due_step``, at most the last ``max_steps`` of them."""
+        start = max(self.next_step, due_step - max_steps)
+        if start >= due_step:
+            return []
+        if start > self.next_step:
+            # Too far behind: the skipped ticks are not evaluated.
+            self.last_price = float(self.series.prices(start - 1, start)[0])
+        prices = self.series.prices(start, due_step)
+        self.next_step = due_step
+        self.series.forget_before(due_step - 1)
+        # The first move is from the last price evaluated, for an alert added since that can be
+        # from shortly before it was created.
+        prices = np.concatenate(([self.last_price], prices))
+        self.last_price = float(prices[-1])
+        fired = []
+
+        cut = bisect.bisect_left(self.above_keys, -float(prices.max()))
+        if cut < len(self.above_keys):
+            levels = -np.array(self.above_keys[cut:])
+            # The first tick at or above each level.
+            ticks = np.searchsorted(np.maximum.accumulate(prices), levels, side="left")
+            fired += self._fired(self.above_ids[cut:], ticks, prices, start)
+            del self.above_keys[cut:], self.above_ids[cut:]
+
+        cut = bisect.bisect_left(self.below_keys, float(prices.min()))
+        if cut < len(self.below_keys):
+            levels = np.array(self.below_keys[cut:])
+            # The first tick at or below each level: search the negated running minimum.
+            ticks = np.searchsorted(-np.minimum.accumulate(prices), -levels, side="left")
+            fired += self._fired(self.below_ids[cut:], ticks, prices, start)
+            del self.below_keys[cut:], self.below_ids[cut:]
+        return fired
+
+    @staticmethod
+    def _fired(alert_ids: list[int], ticks: np.ndarray, prices: np.ndarray, start: int) -> list[FiredAlert]:
+        # Tick 0 is the last price before ``start``.
+        steps = start - 1 + ticks
+        return [
+            FiredAlert(alert_id=alert_id, step=int(step), price=float(prices[tick]))
+            for alert_id, step, tick in zip(alert_ids, steps, ticks)
+        ]
+
+
+class AlertBook:
+    """Every waiting alert, grouped by the series it follows."""
+
+    def __init__(self, interval: int, max_catch_up_steps: int):
+        self.interval = interval
+        self.max_catch_up_steps = max_catch_up_steps
+        self._by_series: dict[int, SeriesAlerts] = {}
+
+    def __len__(self) -> int:
+        return sum(len(alerts) for alerts in self._by_series.values())
+
+    def _series_alerts(self, key: int, details: TickerDetails) -> SeriesAlerts:
+        alerts = self._by_series.get(key)
+        if alerts is None:
+            series = forward_series(details, self.interval)
+            alerts = self._by_series[key] = SeriesAlerts(series, live_step(self.interval))
+        return alerts
+
+    def add(self, alert_id: int, details: TickerDetails, direction: AlertDirectionEnum, level: float) -> None:
+        key = series_key(params_hash(details), self.interval)
+        self._series_alerts(key, details).add(alert_id, direction, level)
+
+    def add_many(self, alerts: list[tuple[int, TickerDetails, AlertDirectionEnum, float]]) -> None:
+        by_series: dict[int, tuple[TickerDetails, list]] = {}
+        for alert_id, details, direction, level in alerts:
+            key = series_key(params_hash(details), self.interval)
+            by_series.setdefault(key, (details, []))[1].append((alert_id, direction, level))
+        for key, (details, series_alerts) in by_series.items():
+            if len(series_alerts) == 1:
+                self._series_alerts(key, details).add(*series_alerts[0])
+            else:
+                self._series_alerts(key, details).add_many(series_alerts)
+
+    def advance(self) -> list[FiredAlert]:
+        """Evaluates every series up to now and drops the series left without alerts."""
+        due_step = live_step(self.interval)
+        fired = []
+        for key, alerts in list(self._by_series.items()):
+            fired += alerts.advance(due_step, self.max_catch_up_steps)
+            if not len(alerts):
+                del self._by_series[key]
+        return fired
+
+
+class AlertEngine:
+    def __init__(self):
+        self.book = AlertBook(settings.ALERT_INTERVAL, settings.ALERT_MAX_CATCH_UP_STEPS)
+        self.last_alert_id = 0
+
+    def _load(self, reload: bool) -> None:
+        """Adds the active alerts created since the last load, or all of them on a reload."""
+        if reload:
+            self.book = AlertBook(settings.ALERT_INTERVAL, settings.ALERT_MAX_CATCH_UP_STEPS)
+            self.last_alert_id = 0
+        details_by_ticker: dict[tuple, TickerDetails | None] = {}
+        with SessionLocal() as session:
+            while True:
+                alerts = service.get_active_after(
+                    session=session, after_id=self.last_alert_id, limit=settings.ALERT_LOAD_BATCH_SIZE
+                )
+                if not alerts:
+                    break
+                batch = []
+                for alert in alerts:
+                    ticker = (alert.ticker_code, alert.user_id)
+                    if ticker not in details_by_ticker:
+                        details_by_ticker[ticker] = ticker_service.get_details(
+                            session=session, ticker_code=alert.ticker_code, user_id=alert.user_id
+                        )
+                    details = details_by_ticker[ticker]
+                    # Alerts on a deleted ticker can never fire.
+                    if details is not None:
+                        batch.append((alert.id, details, AlertDirectionEnum(alert.direction), alert.level))
+                self.book.add_many(batch)
+                self.last_alert_id = alerts[-1].id
+
+    def _deliver(self, fired: list[FiredAlert]) -> None:
+        with SessionLocal() as session:
+            alerts = service.mark_triggered(
+                session=session,
+                prices={alert.alert_id: alert.price for alert in fired},
+                triggered_at={
+                    alert.alert_id: datetime.datetime.fromtimestamp(
+                        step_timestamp(alert.step, settings.ALERT_INTERVAL), datetime.UTC
+                    )
+                    for alert in fired
+                },
+            )
+            # WebSocket alerts are picked up by the subscribers' own connections.
+            if not settings.emails_enabled:
+                return
+            for alert in alerts:
+                if alert.channel == AlertChannelEnum.EMAIL:
+                    email_data = email_service.generate_price_alert_email(alert=alert, user=alert.user)
+                    email_service.send_email(
+                        email_to=alert.user.email,
+                        subject=email_data.subject,
+                        html_content=email_data.html_content,
+                    )
+
+    async def run(self) -> None:
+        with open(settings.ALERT_LOCK_PATH, "a") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(settings.ALERT_LEADER_RETRY_SECONDS)
+
+            next_sync = next_reload = 0.0
+            while True:
+                try:
+                    now = time.monotonic()
+                    if now >= next_reload or now >= next_sync:
+                        reload = now >= next_reload
+                        await asyncio.to_thread(self._load, reload)
+                        next_sync = now + settings.ALERT_SYNC_SECONDS
+                        if reload:
+                            next_reload = now + settings.ALERT_RELOAD_SECONDS
+                    fired = await asyncio.to_thread(self.book.advance)
+                    if fired:
+                        await asyncio.to_thread(self._deliver, fired)
+                except Exception:
+                    logger.exception("Alert evaluation failed")
+                await asyncio.sleep(settings.ALERT_EVALUATION_INTERVAL_MS / 1000)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+
+from src.database import Base
+from src.user.models import utcnow
+
+
+class PriceAlert(Base):
+    __tablename__ = "price_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    ticker_code = Column(String(4), nullable=False)
+    direction = Column(String, nullable=False)
+    level = Column(Float, nullable=False)
+    channel = Column(String, nullable=False, default="EMAIL", server_default="EMAIL")
+    created_at = Column(DateTime(timezone=True), default=utcnow)
+    # Set once the alert fires; active alerts have none.
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_price = Column(Float, nullable=True)
+    # When the evaluator recorded it; triggered_at is the time of the crossing tick, which is
+    # in the past after a catch-up.
+    fired_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    user = relationship("User", back_populates="alerts")
+
+    __table_args__ = (
+        Index("ix_price_alerts_active", "id", postgresql_where=triggered_at.is_(None)),
+    )
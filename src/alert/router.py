@@ -0,0 +1,102 @@
+import asyncio
+import datetime
+from typing import Any, List
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+
+from src.alert import service
+from src.alert.schemas import AlertChannelEnum, AlertDirectionEnum, PriceAlertCreate, PriceAlertPublic
+from src.config import settings
+from src.database import SessionLocal
+from src.dependencies import SessionDep, CurrentUser, CurrentWebSocketUser
+from src.ticker import service as ticker_service
+from src.ticker.generation import get_series, live_step
+from src.user.schemas import Message
+
+
+router = APIRouter()
+
+# Alerts are committed a moment after their fired_at, by whichever evaluator holds them. Each
+# poll reads this far back, skipping those already sent, so that late commits aren't missed.
+_FIRED_SLACK = datetime.timedelta(seconds=10)
+
+
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=PriceAlertPublic,
+)
+def create_alert(*, session: SessionDep, current_user: CurrentUser, body: PriceAlertCreate) -> Any:
+    """
+    Create an alert fired the first time the ticker's price crosses the level, which must be
+    above the current price for ``ABOVE`` alerts and below it for ``BELOW`` ones.
+    """
+    ticker_details = ticker_service.get_details(session=session, ticker_code=body.ticker_code, user_id=current_user.id)
+    if not ticker_details:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticker not found.")
+    # The price of the last tick alerts are evaluated on.
+    step = live_step(settings.ALERT_INTERVAL)
+    price = float(get_series(ticker_details, settings.ALERT_INTERVAL).prices(step - 1, step)[0])
+    if body.direction == AlertDirectionEnum.ABOVE and price >= body.level:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The price is already at or above the level ({price:.4f}).",
+        )
+    if body.direction == AlertDirectionEnum.BELOW and price <= body.level:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The price is already at or below the level ({price:.4f}).",
+        )
+    return service.create(session=session, user_id=current_user.id, alert_in=body)
+
+
+@router.get(
+    "/",
+    response_model=List[PriceAlertPublic],
+)
+def get_alerts(session: SessionDep, current_user: CurrentUser) -> Any:
+    """All of the current user's alerts, triggered or not."""
+    return service.get_all_by_user(session=session, user_id=current_user.id)
+
+
+@router.delete("/{alert_id}", response_model=Message)
+def delete_alert(session: SessionDep, current_user: CurrentUser, alert_id: int) -> Message:
+    alert = service.get_by_user(session=session, alert_id=alert_id, user_id=current_user.id)
+    if not alert:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert not found.")
+    service.delete(session=session, alert=alert)
+    return Message(message="Alert deleted successfully.")
+
+
+def _fired_since(user_id, since: datetime.datetime) -> list[dict]:
+    with SessionLocal() as session:
+        alerts = service.get_fired_since(
+            session=session, user_id=user_id, since=since, channel=AlertChannelEnum.WEBSOCKET
+        )
+        return [PriceAlertPublic.model_validate(alert).model_dump(mode="json") for alert in alerts]
+
+
+@router.websocket("/stream")
+async def stream_alerts(*, websocket: WebSocket, session: SessionDep, current_user: CurrentWebSocketUser) -> None:
+    """Pushes the user's WEBSOCKET alerts as they fire, one JSON message each."""
+    user_id = current_user.id
+    # The connection can last for hours; don't hold a pooled connection for all of it.
+    session.close()
+    await websocket.accept()
+    connected_at = datetime.datetime.now(datetime.UTC)
+    # Ids of the alerts sent, by when they were, for as long as polls can read them again: an
+    # alert fired before it was sent.
+    sent: dict[int, datetime.datetime] = {}
+    try:
+        while True:
+            now = datetime.datetime.now(datetime.UTC)
+            since = max(connected_at, now - _FIRED_SLACK)
+            alerts = await asyncio.to_thread(_fired_since, user_id, since)
+            for alert in alerts:
+                if alert["id"] not in sent:
+                    await websocket.send_json(alert)
+                    sent[alert["id"]] = now
+            sent = {alert_id: sent_at for alert_id, sent_at in sent.items() if sent_at > since}
+            await asyncio.sleep(settings.ALERT_PUSH_INTERVAL_SECONDS)
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,39 @@
+import datetime
+import uuid
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class AlertDirectionEnum(str, Enum):
+    ABOVE = "ABOVE"
+    BELOW = "BELOW"
+
+
+class AlertChannelEnum(str, Enum):
+    EMAIL = "EMAIL"
+    WEBSOCKET = "WEBSOCKET"
+
+
+class PriceAlertCreate(BaseModel):
+    ticker_code: str = Field(pattern=r"^[A-Z]{3}[A-CX]$")
+    direction: AlertDirectionEnum
+    level: float = Field(gt=0)
+    channel: AlertChannelEnum = AlertChannelEnum.EMAIL
+
+
+class PriceAlertPublic(BaseModel):
+    id: int
+    user_id: uuid.UUID
+    ticker_code: str
+    direction: AlertDirectionEnum
+    level: float
+    channel: AlertChannelEnum
+    created_at: datetime.datetime
+    triggered_at: Optional[datetime.datetime] = None
+    triggered_price: Optional[float] = None
+    fired_at: Optional[datetime.datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,83 @@
+import datetime
+import uuid
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.alert.models import PriceAlert
+from src.alert.schemas import AlertChannelEnum, PriceAlertCreate
+
+
+def create(*, session: Session, user_id: uuid.UUID, alert_in: PriceAlertCreate) -> PriceAlert:
+    alert = PriceAlert(
+        user_id=user_id,
+        ticker_code=alert_in.ticker_code,
+        direction=alert_in.direction,
+        level=alert_in.level,
+        channel=alert_in.channel,
+    )
+    session.add(alert)
+    session.commit()
+    session.refresh(alert)
+    return alert
+
+
+def get_by_user(*, session: Session, alert_id: int, user_id: uuid.UUID) -> PriceAlert | None:
+    return session.execute(
+        select(PriceAlert).filter(PriceAlert.id == alert_id, PriceAlert.user_id == user_id)
+    ).scalar_one_or_none()
+
+
+def get_all_by_user(*, session: Session, user_id: uuid.UUID) -> List[PriceAlert]:
+    return session.query(PriceAlert).filter(PriceAlert.user_id == user_id).order_by(PriceAlert.id).all()
+
+
+def delete(*, session: Session, alert: PriceAlert) -> None:
+    session.delete(alert)
+    session.commit()
+
+
+def get_active_after(*, session: Session, after_id: int, limit: int) -> List[PriceAlert]:
+    """Active alerts with an id above ``after_id``, by id."""
+    return list(session.scalars(
+        select(PriceAlert)
+        .filter(PriceAlert.id > after_id, PriceAlert.triggered_at.is_(None))
+        .order_by(PriceAlert.id)
+        .limit(limit)
+    ))
+
+
+def mark_triggered(
+    *, session: Session, prices: dict[int, float], triggered_at: dict[int, datetime.datetime]
+) -> List[PriceAlert]:
+    """
+    Records the alerts as triggered and returns those that were still active. Rows locked by
+    another evaluator are skipped, so an alert is only ever delivered once.
+    """
+    alerts = list(session.scalars(
+        select(PriceAlert)
+        .filter(PriceAlert.id.in_(prices), PriceAlert.triggered_at.is_(None))
+        .with_for_update(skip_locked=True)
+    ))
+    fired_at = datetime.datetime.now(datetime.UTC)
+    for alert in alerts:
+        alert.triggered_at = triggered_at[alert.id]
+        alert.triggered_price = prices[alert.id]
+        alert.fired_at = fired_at
+    session.commit()
+    return alerts
+
+
+def get_fired_since(
+    *, session: Session, user_id: uuid.UUID, since: datetime.datetime, channel: AlertChannelEnum
+) -> List[PriceAlert]:
+    return list(session.scalars(
+        select(PriceAlert)
+        .filter(
+            PriceAlert.user_id == user_id,
+            PriceAlert.channel == channel,
+            PriceAlert.fired_at > since,
+        )
+        .order_by(PriceAlert.fired_at, PriceAlert.id)
+    ))
@@ -5,6 +5,7 @@ from src.auth.router import admin_router as admin_auth_router
 from src.user.router import main_router as user_router
 from src.user.router import admin_router as admin_user_router
 from src.ticker.router import router as ticker_router
+from src.alert.router import router as alert_router
 
 ADMIN_PREFIX = "/admin"
 
@@ -14,3 +15,4 @@ api_router.include_router(admin_auth_router, prefix=f"{ADMIN_PREFIX}/auth", tags
 api_router.include_router(user_router, prefix="/user", tags=["User"])
 api_router.include_router(admin_user_router, prefix=f"{ADMIN_PREFIX}/user", tags=["Admin: User"])
 api_router.include_router(ticker_router, prefix="/ticker", tags=["Tickers"])
+api_router.include_router(alert_router, prefix="/alert", tags=["Alerts"])
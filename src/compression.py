@@ -0,0 +1,148 @@
+"""
+Response compression, negotiated from ``Accept-Encoding``.
+
+Bodies are compressed message by message as the app sends them, so streamed responses are
+never buffered: each chunk is flushed on its own, and the client can decode it as it
+arrives. Complete bodies smaller than the threshold are sent as they are.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+
+def _accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """The preferred encoding the client accepts: zstd, then gzip, else none."""
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    available = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    candidates = [(accepted.get(name, wildcard), -rank, name) for rank, name in enumerate(available)]
+    quality, _, name = max(candidates)
+    return name if quality > 0 else None
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        await _CompressedResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str | None, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Message | None = None
+        self.stream: _GzipStream | _ZstdStream | None = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.middleware.app(scope, receive, self.send_with_compression)
+
+    def _open_stream(self) -> _GzipStream | _ZstdStream:
+        if self.encoding == "zstd":
+            return _ZstdStream(self.middleware.zstd_level)
+        return _GzipStream(self.middleware.gzip_level)
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if "content-encoding" in headers:
+                self.passthrough = True
+                await self.send(message)
+                return
+            # The body depends on Accept-Encoding even when this response is not compressed.
+            headers.add_vary_header("Accept-Encoding")
+            content_length = headers.get("content-length")
+            if self.encoding is None or (content_length is not None and int(content_length) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(message)
+                return
+            # Held back until the first body message shows whether the body is worth compressing.
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+            self.stream = self._open_stream()
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.stream.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(start_message)
+
+        if more_body:
+            body = self.stream.compress(body)
+            if body:
+                await self.send({"type": "http.response.body", "body": body, "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.stream.finish(body)})
@@ -42,6 +42,9 @@ class Settings(BaseSettings):
         )
         return PostgresDsn(str(uri))
 
+    # Replaces the Postgres URI above, e.g. with a SQLite file for local load tests
+    DATABASE_URI_OVERRIDE: str | None = None
+
     AWS_REGION: str
     EMAILS_FROM_EMAIL: EmailStr | None = None
     EMAILS_FROM_NAME: EmailStr | None = None
@@ -60,5 +63,95 @@ class Settings(BaseSettings):
     CONFIRMATION_TOKEN_EXPIRE_HOURS: int = 24
     RESET_TOKEN_EXPIRE_HOURS: int = 24
 
+    # Logging; success access logs of busy routes can be sampled, e.g.
+    # LOG_ACCESS_SAMPLE_RATES='{"/api/v1/ticker/{ticker_code}": 0.01}'
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
+    LOG_ACCESS_SAMPLE_RATES: dict[str, float] = {}
+
+    # Database round-trips per request; strict mode (for tests) fails over-budget requests
+    QUERY_BUDGET_DEFAULT: int | None = 20
+    QUERY_BUDGET_STRICT: bool = False
+    QUERY_REPEAT_THRESHOLD: int = 3
+
+    # Streaming
+    STREAM_FRAME_INTERVAL_MS: int = 100
+    STREAM_MAX_TICKS_PER_SECOND: int = 2_000
+    STREAM_MAX_CATCH_UP_STEPS: int = 100_000
+    # Rings of the latest live ticks, generated once per host and read by every worker; empty
+    # disables them
+    STREAM_FANOUT_DIR: str = "/dev/shm/fauxtick-streams"
+    STREAM_FANOUT_CAPACITY: int = 4096
+
+    # Technical indicators per series page or stream
+    INDICATORS_MAX: int = 8
+
+    # Trading sandbox, per connection
+    SANDBOX_MAX_OPEN_ORDERS: int = 10_000
+    SANDBOX_MAX_BATCH: int = 1_000
+
+    # Generation
+    GENERATION_PROCESSES: int | None = None  # defaults to the number of CPUs
+    # How far past now series can be asked for; generating up to a point takes memory for
+    # every block before it
+    SERIES_HORIZON_DAYS: int = 3650
+    MONTE_CARLO_MAX_PATHS: int = 2_000_000
+    MONTE_CARLO_MAX_HORIZON_DAYS: int = 3650
+    MONTE_CARLO_CHUNK_PATHS: int = 50_000
+    STATS_MAX_WINDOW_STEPS: int = 1_000_000_000
+    STATS_CHUNK_STEPS: int = 1 << 20
+    STATS_MAX_CHUNKS_IN_FLIGHT: int = 16
+    SCREENER_MAX_WINDOW_STEPS: int = 10_000
+    SCREENER_CHUNK_TICKERS: int = 2048
+    # Persisted tick datasets: one partition of the ticks table per day of a dataset's window
+    TICK_DATASET_MAX_ROWS: int = 50_000_000
+    TICK_DATASET_MAX_DAYS: int = 366
+    TICK_DATASET_CHUNK_ROWS: int = 1 << 20
+    # Shared by all worker processes of the host; empty disables it
+    SHARED_CACHE_DIR: str = "/dev/shm/fauxtick-cache"
+    SHARED_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    # Warm-start snapshot of the built-in tickers and the hottest cached arrays, on a disk kept
+    # across restarts, e.g. /var/cache/fauxtick/snapshot; empty (the default) disables it
+    SNAPSHOT_DIR: str = ""
+    SNAPSHOT_MAX_BYTES: int = 256 * 1024 * 1024
+    SNAPSHOT_INTERVAL_SECONDS: float = 900.0
+
+    # Option chains
+    OPTION_CHAIN_MAX_STRIKES: int = 100
+    OPTION_CHAIN_MAX_EXPIRIES: int = 50
+
+    # Baskets
+    BASKET_MAX_CONSTITUENTS: int = 100
+
+    # Price alerts; evaluated on the ticks of this interval, by one worker process per host
+    ALERTS_ENABLED: bool = True
+    ALERT_INTERVAL: int = 1
+    ALERT_EVALUATION_INTERVAL_MS: int = 1000
+    ALERT_MAX_CATCH_UP_STEPS: int = 3600
+    ALERT_SYNC_SECONDS: float = 5.0
+    ALERT_RELOAD_SECONDS: float = 3600.0
+    ALERT_LOAD_BATCH_SIZE: int = 10_000
+    ALERT_LOCK_PATH: str = "/dev/shm/fauxtick-alerts.lock"
+    ALERT_LEADER_RETRY_SECONDS: float = 10.0
+    ALERT_PUSH_INTERVAL_SECONDS: float = 1.0
+
+    # Search; other workers' ticker creations show up after this long
+    SEARCH_USER_INDEX_TTL_SECONDS: float = 60.0
+
+    # HTTP caching of immutable responses
+    HTTP_CACHE_MAX_AGE: int = 365 * 24 * 60 * 60
+
+    # Response compression; smaller complete bodies are sent as they are
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Rate limits; users can have their own, superusers have none
+    RATE_LIMIT_REQUESTS_PER_SECOND: float = 10.0
+    RATE_LIMIT_POINTS_PER_SECOND: float = 500_000.0
+    RATE_LIMIT_BURST_SECONDS: float = 5.0
+
 
 settings = Settings()
@@ -1,15 +1,58 @@
-from sqlalchemy import create_engine
+import contextvars
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from src.config import settings
 
-engine = create_engine(str(settings.DB_URI))
+database_uri = settings.DATABASE_URI_OVERRIDE or str(settings.DB_URI)
+# SQLite connections are used from the threadpool the sync endpoints run in.
+connect_args = {"check_same_thread": False} if database_uri.startswith("sqlite") else {}
+engine = create_engine(database_uri, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+class QueryStats:
+    """Round-trips made while handling one request, and the time spent in them."""
+
+    __slots__ = ("queries", "seconds", "statements", "budget")
+
+    def __init__(self, budget: int | None = None):
+        self.queries = 0
+        self.seconds = 0.0
+        # Executions per SQL text; the same text run again and again is an N+1 candidate.
+        self.statements: Counter[str] = Counter()
+        self.budget = budget
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+
+# A mutable object rather than counters in the context itself, so that queries made from the
+# threadpool (which runs with a copy of the context) are counted too.
+query_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if query_stats.get() is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats.get()
+    if stats is not None:
+        stats.seconds += time.perf_counter() - context._query_started
+        stats.queries += 1
+        stats.statements[statement] += 1
+
+
 def get_db():
     db = SessionLocal()
     try:
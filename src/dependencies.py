@@ -1,14 +1,15 @@
 from typing import Annotated
 
 import jwt
-from fastapi import Depends
+from fastapi import Depends, Query, WebSocketException
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
-from src import security
+from src import quotas, security
+from src.logging import bind_context
 from src.user.models import User
 from src.auth.schemas import TokenPayload
 from src.config import settings
@@ -23,27 +24,62 @@ SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def get_token_payload(token: TokenDep) -> TokenPayload:
+    """Verifies the token without touching the database."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+
+
+TokenPayloadDep = Annotated[TokenPayload, Depends(get_token_payload)]
+
+
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    return get_user_from_token(session=session, token=token)
+
+
+def get_user_from_token(*, session: Session, token: str) -> User:
+    return get_user_from_payload(session=session, token_data=get_token_payload(token))
+
+
+def get_user_from_payload(*, session: Session, token_data: TokenPayload) -> User:
     user = session.query(User).filter(User.id == token_data.sub).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
+    bind_context(user_id=str(user.id))
     return user
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+def get_current_websocket_user(session: SessionDep, token: str = Query()) -> User:
+    """Browsers cannot set headers on WebSocket handshakes, so the token comes as a query parameter."""
+    try:
+        return get_user_from_token(session=session, token=token)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+
+
+CurrentWebSocketUser = Annotated[User, Depends(get_current_websocket_user)]
+
+
+def get_rate_limited_user(current_user: CurrentUser) -> User:
+    quotas.check_request(current_user)
+    return current_user
+
+
+RateLimitedUser = Annotated[User, Depends(get_rate_limited_user)]
+
+
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
@@ -5,6 +5,7 @@ from typing import Any
 import boto3
 from jinja2 import Template
 
+from src.alert.models import PriceAlert
 from src.config import settings
 from src.user.models import User
 
@@ -84,3 +85,17 @@ def generate_password_reset_email(token: str, user: User) -> EmailData:
         },
     )
     return EmailData(html_content=html_content, subject=subject)
+
+
+def generate_price_alert_email(alert: PriceAlert, user: User) -> EmailData:
+    project_name = settings.PROJECT_NAME
+    subject = f"{project_name} - {alert.ticker_code} crossed {alert.level:g}"
+    html_content = render_email_template(
+        template_name="price_alert.html",
+        context={
+            "project_name": settings.PROJECT_NAME,
+            "alert": alert,
+            "user": user,
+        },
+    )
+    return EmailData(html_content=html_content, subject=subject)
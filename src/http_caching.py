@@ -0,0 +1,43 @@
+"""
+Conditional HTTP caching for responses that are pure functions of their inputs.
+
+ETags are weak (``W/"..."``): they identify the content, not the exact bytes, which may
+change with the response encoding.
+"""
+import hashlib
+from typing import Any
+
+from fastapi import Response, status
+
+from src.config import settings
+
+# Built-in tickers and their series never change.
+IMMUTABLE = f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, immutable"
+# User-defined tickers change when edited, and are only for their owner.
+PRIVATE = "private, no-cache"
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ETag against an ``If-None-Match`` header."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque_tag for candidate in if_none_match.split(","))
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, cache_control)
+    return response
@@ -0,0 +1,186 @@
+"""
+Structured logging that keeps formatting and I/O off the request path.
+
+Every logger feeds one ``QueueHandler`` on the root logger, which only captures the record and
+the request's context and puts it on a bounded queue; a ``QueueListener`` thread formats the
+records as JSON lines and writes them out. When the queue is full, records are dropped and
+counted rather than blocking the request.
+
+``RequestLoggingMiddleware`` opens a context per request, so that every record logged while
+handling it carries the route, method, request id and (once authenticated) user id, and
+writes one access record with the status and latency when the response is complete. Access
+records of successful requests are sampled per route, before any record is created.
+"""
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import secrets
+import sys
+import time
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+access_logger = logging.getLogger("src.access")
+
+_request_context: contextvars.ContextVar[dict[str, Any] | None] = contextvars.ContextVar(
+    "request_context", default=None
+)
+# The router records the matched route in the scope, after the context is opened.
+_request_scope: contextvars.ContextVar[Scope | None] = contextvars.ContextVar("request_scope", default=None)
+# Attributes every LogRecord has; anything else was passed as ``extra``.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "context"}
+
+
+def bind_context(**fields: Any) -> None:
+    """
+    Adds fields to the current request's log context. The context is a dict shared with the
+    request's middleware, so fields bound in a threadpool dependency are seen too.
+    """
+    context = _request_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.datetime.fromtimestamp(record.created, datetime.UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        context = getattr(record, "context", None)
+        if context:
+            entry.update(context)
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with their request context, leaving all formatting to the listener."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the message's arguments are resolved here, as they might change before the
+        # listener gets to them; the traceback stays an object until it is formatted.
+        record.msg = record.getMessage()
+        record.args = None
+        context = _request_context.get()
+        if context is None:
+            record.context = None
+            return record
+        record.context = dict(context)
+        route = _request_scope.get().get("route")
+        if route is not None:
+            record.context["route"] = route.path
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def configure_logging(level: str, queue_size: int, json_format: bool = True) -> None:
+    """Routes the root logger through the queue and starts the listener thread."""
+    global _listener
+    if _listener is not None:
+        return
+    # Not logged anyway; skipping them makes every record cheaper to create. The formatters
+    # leave out the caller's file and line too, though the logger still looks them up.
+    logging.logMultiprocessing = False
+    logging.logProcesses = False
+    logging.logThreads = False
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s %(context)s"
+    ))
+    log_queue = queue.Queue(queue_size)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(ContextQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Stops the listener once the records already queued are written."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestLoggingMiddleware:
+    def __init__(self, app: ASGIApp, success_sample_rate: float, route_sample_rates: dict[str, float]):
+        self.app = app
+        self.success_sample_rate = success_sample_rate
+        self.route_sample_rates = route_sample_rates
+
+    def _sampled(self, route: str | None, status_code: int) -> bool:
+        if status_code >= 400:
+            return True
+        rate = self.route_sample_rates.get(route, self.success_sample_rate)
+        return rate >= 1 or random.random() < rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        context = {
+            "request_id": request_id or secrets.token_hex(8),
+            "method": scope["method"],
+            "path": scope["path"],
+        }
+        token = _request_context.set(context)
+        scope_token = _request_scope.set(scope)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The template, rather than the path, groups the requests of a route.
+            route = getattr(scope.get("route"), "path", None)
+            if self._sampled(route, status_code) and access_logger.isEnabledFor(logging.INFO):
+                access_logger.info(
+                    "%s %s %d",
+                    scope["method"],
+                    route or scope["path"],
+                    status_code,
+                    extra={
+                        "status_code": status_code,
+                        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                    },
+                )
+            _request_scope.reset(scope_token)
+            _request_context.reset(token)
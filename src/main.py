@@ -1,12 +1,71 @@
+import asyncio
+import contextlib
+
 from fastapi import FastAPI
 
+from src.alert.engine import AlertEngine
 from src.api import api_router
+from src.compression import CompressionMiddleware
 from src.config import settings
+from src.logging import RequestLoggingMiddleware, configure_logging, shutdown_logging
+from src.query_budget import QueryBudgetMiddleware
+from src.ticker.fanout import open_live_feeds, set_live_feeds
+from src.ticker.generation import set_array_cache
+from src.ticker.shared_cache import open_shared_cache
+from src.ticker.snapshot import keep_snapshot, load_snapshot, save_snapshot
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging(settings.LOG_LEVEL, settings.LOG_QUEUE_SIZE, settings.LOG_JSON)
+    # Opened on startup rather than on import, so that merely importing the app creates no files;
+    # before the snapshot, which the cache falls back to.
+    set_array_cache(open_shared_cache(settings.SHARED_CACHE_DIR, settings.SHARED_CACHE_MAX_BYTES))
+    set_live_feeds(open_live_feeds(settings.STREAM_FANOUT_DIR, settings.STREAM_FANOUT_CAPACITY))
+    load_snapshot(settings.SNAPSHOT_DIR)
+    tasks = []
+    if settings.ALERTS_ENABLED:
+        tasks.append(asyncio.create_task(AlertEngine().run()))
+    if settings.SNAPSHOT_DIR:
+        tasks.append(asyncio.create_task(keep_snapshot(
+            settings.SNAPSHOT_DIR, settings.SNAPSHOT_MAX_BYTES, settings.SNAPSHOT_INTERVAL_SECONDS
+        )))
+    yield
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    if settings.SNAPSHOT_DIR:
+        await asyncio.to_thread(save_snapshot, settings.SNAPSHOT_DIR, settings.SNAPSHOT_MAX_BYTES)
+    set_live_feeds(None)
+    set_array_cache(None)
+    shutdown_logging()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+)
+app.add_middleware(
+    QueryBudgetMiddleware,
+    default_budget=settings.QUERY_BUDGET_DEFAULT,
+    repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+    strict=settings.QUERY_BUDGET_STRICT,
+)
+# Outermost, so that the latency covers compression too.
+app.add_middleware(
+    RequestLoggingMiddleware,
+    success_sample_rate=settings.LOG_ACCESS_SAMPLE_RATE,
+    route_sample_rates=settings.LOG_ACCESS_SAMPLE_RATES,
 )
 
 
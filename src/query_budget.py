@@ -0,0 +1,81 @@
+"""
+Per-request query budgets.
+
+``QueryBudgetMiddleware`` counts the database round-trips of every HTTP request, and their
+total time, through the engine's cursor events. The counts go into the request's log context,
+so the access record carries them. A route declares its budget with a dependency:
+
+    @router.patch("/me", dependencies=[Depends(query_budget(3))])
+
+and other routes get ``settings.QUERY_BUDGET_DEFAULT``. Requests over budget, or running the
+same statement ``settings.QUERY_REPEAT_THRESHOLD`` times or more (the usual sign of an N+1
+pattern), are logged as warnings; with ``settings.QUERY_BUDGET_STRICT``, as in tests, an
+over-budget request raises ``QueryBudgetExceeded`` instead.
+"""
+import logging
+from typing import Callable
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.database import QueryStats, query_stats
+from src.logging import bind_context
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(max_queries: int) -> Callable[[], None]:
+    """A route dependency setting the request's budget of database round-trips."""
+    def set_budget() -> None:
+        stats = query_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return set_budget
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app: ASGIApp, default_budget: int | None, repeat_threshold: int, strict: bool):
+        self.app = app
+        self.default_budget = default_budget
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(self.default_budget)
+        token = query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            query_stats.reset(token)
+            bind_context(db_queries=stats.queries, db_ms=round(stats.seconds * 1000, 3))
+        self._check(scope, stats)
+
+    def _check(self, scope: Scope, stats: QueryStats) -> None:
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        repeated = stats.repeated(self.repeat_threshold)
+        if repeated:
+            logger.warning(
+                "Possible N+1 queries in %s %s",
+                scope["method"],
+                route,
+                extra={"repeated_statements": repeated},
+            )
+        if stats.budget is not None and stats.queries > stats.budget:
+            if self.strict:
+                raise QueryBudgetExceeded(
+                    f"{scope['method']} {route} made {stats.queries} queries, over its budget of {stats.budget}"
+                )
+            logger.warning(
+                "%s %s made %d queries, over its budget of %d",
+                scope["method"],
+                route,
+                stats.queries,
+                stats.budget,
+            )
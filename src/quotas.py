@@ -0,0 +1,171 @@
+"""
+Per-user rate limits and fair scheduling of generation work.
+
+Every user has two token buckets, one for requests and one for generated points. Each check
+is O(1) under a single lock. The limits come from the user's own columns when set, and from
+``Settings`` otherwise; superusers are exempt.
+
+``FairScheduler`` hands out a fixed number of generation slots by start-time fair queueing,
+so one user's many chunks interleave with everyone else's instead of running first.
+"""
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator
+
+from fastapi import HTTPException, status
+
+from src.config import settings
+from src.user.models import User
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def consume(self, amount: float) -> float:
+        """Takes ``amount`` tokens and returns 0, or returns the seconds to wait and takes nothing.
+
+        A request larger than the whole bucket is let through once the bucket is full, leaving
+        it in debt, so that large requests are slowed down rather than refused forever.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= amount
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+_request_buckets: dict[uuid.UUID, TokenBucket] = {}
+_point_buckets: dict[uuid.UUID, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def _consume(buckets: dict[uuid.UUID, TokenBucket], user_id: uuid.UUID, rate: float, amount: float) -> float:
+    with _buckets_lock:
+        bucket = buckets.get(user_id)
+        if bucket is None:
+            bucket = buckets[user_id] = TokenBucket(rate, rate * settings.RATE_LIMIT_BURST_SECONDS)
+        elif bucket.rate != rate:
+            bucket.rate = rate
+            bucket.capacity = rate * settings.RATE_LIMIT_BURST_SECONDS
+        return bucket.consume(amount)
+
+
+def _too_many_requests(wait: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Rate limit exceeded.",
+        headers={"Retry-After": str(math.ceil(wait))},
+    )
+
+
+def check_request(user: User) -> None:
+    """Counts one request against the user's request rate; raises 429 when over it."""
+    if user.is_superuser:
+        return
+    rate = user.requests_per_second or settings.RATE_LIMIT_REQUESTS_PER_SECOND
+    wait = _consume(_request_buckets, user.id, rate, 1)
+    if wait:
+        raise _too_many_requests(wait)
+
+
+def points_wait(user: User, points: int) -> float:
+    """Counts generated points against the user's budget; returns the seconds to wait if over it."""
+    if user.is_superuser:
+        return 0.0
+    rate = user.points_per_second or settings.RATE_LIMIT_POINTS_PER_SECOND
+    return _consume(_point_buckets, user.id, rate, points)
+
+
+def check_points(user: User, points: int) -> None:
+    """Like ``points_wait``, but raises 429 instead."""
+    wait = points_wait(user, points)
+    if wait:
+        raise _too_many_requests(wait)
+
+
+class FairScheduler:
+    """
+    Start-time fair queueing over a fixed number of slots.
+
+    A chunk of cost ``c`` from a user with weight ``w`` gets the start tag
+    ``max(virtual_time, user's last finish tag)`` and pushes the user's finish tag to
+    ``start + c / w``. Free slots go to the waiting chunk with the lowest start tag.
+    """
+
+    def __init__(self, slots: int):
+        self._slots = slots
+        self._condition = threading.Condition()
+        self._virtual_time = 0.0
+        self._finish_tags: dict[Hashable, float] = {}
+        self._waiting: list[tuple[float, int]] = []
+        self._sequence = itertools.count()
+
+    def acquire(self, user_key: Hashable, cost: float, weight: float = 1.0) -> None:
+        with self._condition:
+            start = max(self._virtual_time, self._finish_tags.get(user_key, 0.0))
+            self._finish_tags[user_key] = start + cost / weight
+            ticket = (start, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            while self._slots == 0 or self._waiting[0] != ticket:
+                self._condition.wait()
+            heapq.heappop(self._waiting)
+            self._slots -= 1
+            self._virtual_time = start
+            if len(self._finish_tags) > 4 * len(self._waiting) + 1024:
+                # Users whose finish tag is behind the virtual time would restart from it anyway.
+                self._finish_tags = {
+                    key: tag for key, tag in self._finish_tags.items() if tag > self._virtual_time
+                }
+            self._condition.notify_all()
+
+    def release(self) -> None:
+        with self._condition:
+            self._slots += 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, user_key: Hashable, cost: float, weight: float = 1.0) -> Iterator[None]:
+        self.acquire(user_key, cost, weight)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class FairExecutor(Executor):
+    """Submits to an executor only once the scheduler grants the user a slot."""
+
+    def __init__(self, executor: Executor, scheduler: FairScheduler, user_key: Hashable, cost: float = 1.0):
+        self._executor = executor
+        self._scheduler = scheduler
+        self._user_key = user_key
+        self._cost = cost
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        self._scheduler.acquire(self._user_key, self._cost)
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._scheduler.release()
+            raise
+        future.add_done_callback(lambda _: self._scheduler.release())
+        return future
+
+
+generation_scheduler = FairScheduler(settings.GENERATION_PROCESSES or os.cpu_count() or 1)
@@ -44,6 +44,17 @@ def generate_token(subject: str, expires_delta: datetime.timedelta) -> str:
     return token
 
 
+def create_cursor_token(payload: dict[str, Any]) -> str:
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_cursor_token(token: str) -> dict[str, Any] | None:
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    except InvalidTokenError:
+        return None
+
+
 def verify_token(token: str) -> str | None:
     try:
         decoded_token = jwt.decode(
@@ -1,7 +1,26 @@
-from typing import Dict
+import hashlib
+import itertools
+import json
+import string
+from typing import Dict, Iterator
+
+import numpy as np
 
 from src.ticker.schemas import BuiltInTickerContext, TickerDetails, TickerTypeEnum
-from src.ticker.utils import parse_market
+from src.ticker.utils import compute_composite_details, parse_market
+
+# Each sector index holds this many of its category's tickers, spread evenly over their codes.
+SECTOR_INDEX_CONSTITUENTS = 32
+
+# One row per built-in ticker, in code order.
+BUILT_IN_PARAMETER_DTYPE = np.dtype([
+    ("ticker_code", "S4"),
+    ("drift", "<f8"),
+    ("volatility", "<f8"),
+    ("jump_intensity", "<f8"),
+    ("jump_mean", "<f8"),
+    ("jump_std_dev", "<f8"),
+])
 
 
 BUILT_IN_TICKERS: Dict[str, BuiltInTickerContext] = {
@@ -72,14 +91,22 @@ def get_built_in_category_context(category_key: str) -> BuiltInTickerContext | N
     return BUILT_IN_TICKERS.get(category_key, None)
 
 
+def iter_built_in_ticker_codes() -> Iterator[str]:
+    """Every built-in ticker code, in alphabetical order."""
+    for category_key, stat_letter, jump_letter, market_letter in itertools.product(
+        sorted(BUILT_IN_TICKERS), string.ascii_uppercase, string.ascii_uppercase, "ABC"
+    ):
+        yield category_key + stat_letter + jump_letter + market_letter
+
+
 def interpolate(letter: str, lower: float, upper: float) -> float:
     """Interpolate a value between lower and upper based on the letter A-Z."""
     ratio = (ord(letter) - ord('A')) / (ord('Z') - ord('A'))
     return lower + ratio * (upper - lower)
 
 
-def compute_built_in_ticker_derived_details(ticker_code: str, category_context: BuiltInTickerContext) -> TickerDetails:
-    """Adds the statistical params, market and ticker type information."""
+def _compute_built_in_parameters(ticker_code: str, category_context: BuiltInTickerContext) -> tuple[float, ...]:
+    """(drift, volatility, jump_intensity, jump_mean, jump_std_dev) of a built-in ticker."""
     # 2nd letter => drift & volatility
     stat_letter = ticker_code[1]
     # turning tuples into arguments (https://stackoverflow.com/questions/1993727/expanding-tuples-into-arguments)
@@ -91,6 +118,14 @@ def compute_built_in_ticker_derived_details(ticker_code: str, category_context:
     jump_intensity = round(interpolate(jump_letter, *category_context.jump_intensity_range), 2)
     jump_mean = round(interpolate(jump_letter, *category_context.jump_mean_range), 2)
     jump_std_dev = round(interpolate(jump_letter, *category_context.jump_std_dev_range), 2)
+    return drift, volatility, jump_intensity, jump_mean, jump_std_dev
+
+
+def compute_built_in_ticker_derived_details(ticker_code: str, category_context: BuiltInTickerContext) -> TickerDetails:
+    """Adds the statistical params, market and ticker type information."""
+    drift, volatility, jump_intensity, jump_mean, jump_std_dev = _compute_built_in_parameters(
+        ticker_code, category_context
+    )
 
     # 4th letter => market
     market_letter = ticker_code[3]
@@ -109,3 +144,58 @@ def compute_built_in_ticker_derived_details(ticker_code: str, category_context:
         market=market,
         type=TickerTypeEnum.BUILT_IN,
     )
+
+
+def built_in_tickers_hash() -> str:
+    """Changes whenever the definitions, and so the parameter table, do."""
+    definitions = {key: context.model_dump(mode="json") for key, context in BUILT_IN_TICKERS.items()}
+    return hashlib.blake2b(json.dumps(definitions, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def compute_built_in_parameter_table() -> np.ndarray:
+    """The params of every built-in ticker, as rows of ``BUILT_IN_PARAMETER_DTYPE``."""
+    return np.array(
+        [
+            (code.encode(), *_compute_built_in_parameters(code, BUILT_IN_TICKERS[code[0]]))
+            for code in iter_built_in_ticker_codes()
+        ],
+        dtype=BUILT_IN_PARAMETER_DTYPE,
+    )
+
+
+_built_in_parameter_table: np.ndarray | None = None
+
+
+def set_built_in_parameter_table(table: np.ndarray | None) -> None:
+    """Uses a table computed earlier, e.g. memory-mapped from a warm-start snapshot."""
+    global _built_in_parameter_table
+    _built_in_parameter_table = table
+
+
+def get_built_in_parameter_table() -> np.ndarray:
+    global _built_in_parameter_table
+    if _built_in_parameter_table is None:
+        _built_in_parameter_table = compute_built_in_parameter_table()
+    return _built_in_parameter_table
+
+
+def sector_index_code(category_key: str) -> str:
+    return f"{category_key}IDX"
+
+
+def compute_sector_index_details(category_key: str, category_context: BuiltInTickerContext) -> TickerDetails:
+    """The equal-weighted index of a category's sector."""
+    codes = [code for code in iter_built_in_ticker_codes() if code[0] == category_key]
+    step = len(codes) / SECTOR_INDEX_CONSTITUENTS
+    constituents = [
+        (compute_built_in_ticker_derived_details(codes[int(i * step)], category_context), 1.0)
+        for i in range(SECTOR_INDEX_CONSTITUENTS)
+    ]
+    return compute_composite_details(
+        sector_index_code(category_key),
+        name=f"{category_context.sector} Index",
+        description=f"Equal-weighted index of {SECTOR_INDEX_CONSTITUENTS} {category_context.name} tickers across markets.",
+        sector=category_context.sector,
+        constituents=constituents,
+        ticker_type=TickerTypeEnum.INDEX,
+    )
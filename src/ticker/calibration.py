@@ -0,0 +1,171 @@
+"""
+Fitting Merton jump-diffusion parameters to an uploaded price history.
+
+Files are read in chunks and only the price column is ever materialised, as one NumPy array
+per chunk. The fit takes two passes over the file:
+
+1. Log-return moments plus the bipower variation, which estimates the diffusion variance
+   without being inflated by jumps.
+2. Returns further than ``jump_threshold(n)`` diffusion standard deviations from the mean
+   are counted as jumps, and the jump intensity, mean and spread are taken from them. The
+   threshold grows like ``sqrt(2 log n)``, the largest of n Gaussian returns, so that the
+   diffusion alone exceeds it about once per history however long it is; a fixed cutoff
+   would count a share of the diffusion's tail as jumps, e.g. ~30 a year at 4 sigma on
+   minute returns.
+
+The drift is then chosen so that the model reproduces the mean log-return.
+"""
+import io
+import math
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator
+
+import numpy as np
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet uploads are optional
+    pq = None
+
+from src.ticker.generation import SECONDS_PER_YEAR
+
+CSV_CHUNK_BYTES = 8 * 1024 * 1024
+PARQUET_BATCH_ROWS = 1 << 20
+MIN_JUMP_THRESHOLD = 4.0
+PRICE_COLUMN_NAMES = ("close", "adj close", "adj_close", "price")
+
+
+class CalibrationError(ValueError):
+    pass
+
+
+def _price_column_index(header: list[str], price_column: str | None) -> int:
+    names = [name.strip().strip('"').lower() for name in header]
+    if price_column is not None:
+        if price_column.lower() not in names:
+            raise CalibrationError(f"Column '{price_column}' not found.")
+        return names.index(price_column.lower())
+    for candidate in PRICE_COLUMN_NAMES:
+        if candidate in names:
+            return names.index(candidate)
+    return len(names) - 1
+
+
+def iter_csv_prices(file: BinaryIO, price_column: str | None = None) -> Iterator[np.ndarray]:
+    """Yields the price column of a CSV file with a header row, one chunk at a time."""
+    header = file.readline().decode().rstrip("\r\n").split(",")
+    column = _price_column_index(header, price_column)
+    remainder = b""
+    while True:
+        chunk = file.read(CSV_CHUNK_BYTES)
+        if not chunk:
+            break
+        chunk = remainder + chunk
+        cut = chunk.rfind(b"\n") + 1
+        chunk, remainder = chunk[:cut], chunk[cut:]
+        if chunk.strip():
+            yield _parse_csv_chunk(chunk, column)
+    if remainder.strip():
+        yield _parse_csv_chunk(remainder, column)
+
+
+def _parse_csv_chunk(chunk: bytes, column: int) -> np.ndarray:
+    try:
+        return np.loadtxt(io.BytesIO(chunk), delimiter=",", usecols=column, ndmin=1, dtype=np.float64)
+    except ValueError as exc:
+        raise CalibrationError(f"Could not parse prices: {exc}")
+
+
+def iter_parquet_prices(file: BinaryIO, price_column: str | None = None) -> Iterator[np.ndarray]:
+    """Yields the price column of a Parquet file, one record batch at a time."""
+    if pq is None:
+        raise CalibrationError("Parquet support is not installed.")
+    parquet_file = pq.ParquetFile(file)
+    column = parquet_file.schema_arrow.names[_price_column_index(parquet_file.schema_arrow.names, price_column)]
+    for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=[column]):
+        yield batch.column(0).to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+
+
+def iter_log_returns(chunks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+    """Turns price chunks into log-return chunks, bridging the chunk boundaries."""
+    last_log_price = None
+    for prices in chunks:
+        if not len(prices):
+            continue
+        if np.any(~(prices > 0)):
+            raise CalibrationError("Prices must be positive numbers.")
+        log_prices = np.log(prices)
+        if last_log_price is not None:
+            log_prices = np.concatenate(([last_log_price], log_prices))
+        last_log_price = log_prices[-1]
+        if len(log_prices) > 1:
+            yield np.diff(log_prices)
+
+
+def jump_threshold(n: int) -> float:
+    """Cutoff for jumps among n returns, in diffusion standard deviations."""
+    return max(MIN_JUMP_THRESHOLD, math.sqrt(2 * math.log(n)))
+
+
+@dataclass
+class FittedParams:
+    drift: float
+    volatility: float
+    jump_intensity: float
+    jump_mean: float
+    jump_std_dev: float
+
+
+def fit_merton(read_prices: Callable[[], Iterator[np.ndarray]], interval: int) -> FittedParams:
+    """
+    Fits annualised parameters (in percent, like ``UserDefinedTicker``) to a price history.
+
+    ``read_prices`` is called once per pass and must return a fresh iterator of price chunks.
+    """
+    dt = interval / SECONDS_PER_YEAR
+
+    n = 0
+    total = 0.0
+    bipower = 0.0
+    last_abs = None
+    for returns in iter_log_returns(read_prices()):
+        n += len(returns)
+        total += returns.sum()
+        abs_returns = np.abs(returns)
+        if last_abs is not None:
+            abs_returns = np.concatenate(([last_abs], abs_returns))
+        bipower += np.dot(abs_returns[1:], abs_returns[:-1])
+        last_abs = abs_returns[-1]
+    if n < 3:
+        raise CalibrationError("At least 4 prices are needed.")
+
+    mean = total / n
+    diffusion_variance = math.pi / 2 * bipower / (n - 1)
+    threshold = jump_threshold(n) * math.sqrt(diffusion_variance)
+
+    jump_count = 0
+    jump_sum = 0.0
+    jump_sum_squares = 0.0
+    for returns in iter_log_returns(read_prices()):
+        jumps = returns[np.abs(returns - mean) > threshold]
+        jump_count += len(jumps)
+        jump_sum += jumps.sum()
+        jump_sum_squares += np.dot(jumps, jumps)
+
+    jump_intensity = jump_count / (n * dt)
+    jump_mean = jump_sum / jump_count if jump_count else 0.0
+    # Each observed jump return also carries one step of diffusion.
+    jump_variance = jump_sum_squares / jump_count - jump_mean ** 2 - diffusion_variance if jump_count else 0.0
+    jump_std_dev = math.sqrt(max(jump_variance, 0.0))
+
+    volatility = math.sqrt(diffusion_variance / dt)
+    jump_compensator = jump_intensity * (math.exp(jump_mean + jump_std_dev ** 2 / 2) - 1)
+    drift = mean / dt + volatility ** 2 / 2 + jump_compensator - jump_intensity * jump_mean
+
+    return FittedParams(
+        drift=round(drift * 100, 2),
+        volatility=round(volatility * 100, 2),
+        jump_intensity=round(jump_intensity, 2),
+        jump_mean=round(jump_mean * 100, 2),
+        jump_std_dev=round(jump_std_dev * 100, 2),
+    )
@@ -0,0 +1,201 @@
+"""
+Shape-preserving downsampling of long windows for charts.
+
+A window is cut into equal buckets and each bucket is reduced to its lowest and highest
+price, in time order (min/max decimation), so spikes and jumps survive however far out the
+chart is zoomed.
+
+Buckets of two blocks or more are served from a pyramid of extremes, kept per chunk of
+``PYRAMID_CHUNK_BLOCKS`` blocks: the lowest and highest log level, with their steps, of every
+block, every aligned pair of blocks, and so on up to the whole chunk. A window is covered by
+cells of at most half the bucket size, plus single blocks and partial blocks at its edges, so
+that every bucket holds a whole cell and with it a lowest and a highest point of its own. Once
+the chunks exist the work is proportional to the points returned, not to the length of the
+window. A chunk is computed the first time a window touches it, and kept in
+the shared array cache when there is one.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.ticker.generation import BLOCK_STEPS, INITIAL_PRICE, Series, get_array_cache
+
+MAX_POINTS = 10_000
+MAX_WINDOW_STEPS = 100_000_000
+PYRAMID_CHUNK_BLOCKS = 1024
+# Cells of 1, 2, 4, ... PYRAMID_CHUNK_BLOCKS blocks.
+_LEVELS = PYRAMID_CHUNK_BLOCKS.bit_length()
+# Rows of the extremes arrays.
+_MIN_VALUE, _MIN_STEP, _MAX_VALUE, _MAX_STEP = range(4)
+
+_chunks: "OrderedDict[tuple[int, int], np.ndarray]" = OrderedDict()
+_chunks_lock = threading.Lock()
+_CHUNKS_CACHE_SIZE = 256
+
+
+def _level_start(level: int) -> int:
+    """Column of a chunk's first cell at ``level``; the levels are stored one after another."""
+    return 2 * PYRAMID_CHUNK_BLOCKS - (2 * PYRAMID_CHUNK_BLOCKS >> level)
+
+
+def _pairs(extremes: np.ndarray) -> np.ndarray:
+    """Extremes of consecutive pairs of cells; ties go to the earlier cell."""
+    left, right = extremes[:, 0::2], extremes[:, 1::2]
+    take_left_min = left[_MIN_VALUE] <= right[_MIN_VALUE]
+    take_left_max = left[_MAX_VALUE] >= right[_MAX_VALUE]
+    return np.stack((
+        np.where(take_left_min, left[_MIN_VALUE], right[_MIN_VALUE]),
+        np.where(take_left_min, left[_MIN_STEP], right[_MIN_STEP]),
+        np.where(take_left_max, left[_MAX_VALUE], right[_MAX_VALUE]),
+        np.where(take_left_max, left[_MAX_STEP], right[_MAX_STEP]),
+    ))
+
+
+def _build_chunk(series: Series, chunk: int) -> np.ndarray:
+    first_block = chunk * PYRAMID_CHUNK_BLOCKS
+    stop_block = first_block + PYRAMID_CHUNK_BLOCKS
+    increments = series.increments(first_block * BLOCK_STEPS, stop_block * BLOCK_STEPS)
+    levels = np.cumsum(increments.reshape(PYRAMID_CHUNK_BLOCKS, BLOCK_STEPS), axis=1)
+    levels += series.block_offsets(first_block, stop_block)[:, None]
+    block_starts = np.arange(first_block, stop_block, dtype=np.float64) * BLOCK_STEPS
+    rows = np.arange(PYRAMID_CHUNK_BLOCKS)
+    argmin, argmax = levels.argmin(axis=1), levels.argmax(axis=1)
+    cells = np.stack((levels[rows, argmin], block_starts + argmin, levels[rows, argmax], block_starts + argmax))
+    pyramid = [cells]
+    for _ in range(1, _LEVELS):
+        pyramid.append(_pairs(pyramid[-1]))
+    return np.concatenate(pyramid, axis=1)
+
+
+def _chunk_extremes(series: Series, chunk: int) -> np.ndarray:
+    cache_key = (series.key, chunk)
+    with _chunks_lock:
+        extremes = _chunks.get(cache_key)
+        if extremes is not None:
+            _chunks.move_to_end(cache_key)
+            return extremes
+    array_cache = get_array_cache()
+    if array_cache is not None:
+        extremes = array_cache.get_or_create(f"extremes-{series.key:032x}-{chunk}", lambda: _build_chunk(series, chunk))
+    else:
+        extremes = _build_chunk(series, chunk)
+    with _chunks_lock:
+        _chunks[cache_key] = extremes
+        while len(_chunks) > _CHUNKS_CACHE_SIZE:
+            _chunks.popitem(last=False)
+    return extremes
+
+
+def _chunk_cached(series: Series, chunk: int) -> bool:
+    with _chunks_lock:
+        if (series.key, chunk) in _chunks:
+            return True
+    array_cache = get_array_cache()
+    return array_cache is not None and array_cache.get(f"extremes-{series.key:032x}-{chunk}") is not None
+
+
+def _cells(series: Series, level: int, first: int, stop: int) -> np.ndarray:
+    """Extremes of the cells [first, stop) of a level, numbered from the epoch."""
+    cells_per_chunk = PYRAMID_CHUNK_BLOCKS >> level
+    parts = [np.empty((4, 0))]
+    cell = first
+    while cell < stop:
+        chunk = cell // cells_per_chunk
+        end = min(stop, (chunk + 1) * cells_per_chunk)
+        offset = _level_start(level) - chunk * cells_per_chunk
+        parts.append(_chunk_extremes(series, chunk)[:, offset + cell:offset + end])
+        cell = end
+    return np.concatenate(parts, axis=1)
+
+
+def _raw_extremes(series: Series, start: int, stop: int) -> np.ndarray:
+    levels = series.log_levels(start, stop)
+    argmin, argmax = int(levels.argmin()), int(levels.argmax())
+    return np.array([[levels[argmin]], [start + argmin], [levels[argmax]], [start + argmax]])
+
+
+def _window_extremes(series: Series, start: int, stop: int, level: int) -> np.ndarray:
+    """Extremes of consecutive pieces covering [start, stop), mostly cells of ``level``."""
+    cell_blocks = 1 << level
+    first_block = -(-start // BLOCK_STEPS)
+    stop_block = stop // BLOCK_STEPS
+    first_cell = -(-first_block // cell_blocks)
+    stop_cell = stop_block // cell_blocks
+    parts = []
+    if start < first_block * BLOCK_STEPS:
+        parts.append(_raw_extremes(series, start, min(stop, first_block * BLOCK_STEPS)))
+    if first_cell < stop_cell:
+        parts.append(_cells(series, 0, first_block, first_cell * cell_blocks))
+        parts.append(_cells(series, level, first_cell, stop_cell))
+        parts.append(_cells(series, 0, stop_cell * cell_blocks, stop_block))
+    elif first_block < stop_block:
+        parts.append(_cells(series, 0, first_block, stop_block))
+    if first_block <= stop_block and stop_block * BLOCK_STEPS < stop:
+        parts.append(_raw_extremes(series, stop_block * BLOCK_STEPS, stop))
+    return np.concatenate(parts, axis=1)
+
+
+def _first_extreme_per_group(
+    values: np.ndarray, steps: np.ndarray, groups: np.ndarray, ufunc: np.ufunc
+) -> tuple[np.ndarray, np.ndarray]:
+    """The earliest lowest (or highest) value of each run of equal, non-decreasing ``groups``."""
+    edges = np.flatnonzero(np.diff(groups, prepend=groups[0] - 1))
+    extremes = ufunc.reduceat(values, edges)
+    counts = np.diff(np.append(edges, len(values)))
+    hits = np.flatnonzero(values == np.repeat(extremes, counts))
+    first = hits[np.searchsorted(hits, edges)]
+    return steps[first], values[first]
+
+
+def steps_to_generate(series: Series, start: int, stop: int, max_points: int) -> int:
+    """
+    Steps ``downsample`` has to generate for the window [start, stop): all of them for small
+    buckets, otherwise its partial edge blocks and the chunks of the pyramid not built yet.
+    """
+    n_steps = stop - start
+    if n_steps <= max_points or n_steps / max(1, max_points // 2) < 2 * BLOCK_STEPS:
+        return n_steps
+    first_block = -(-start // BLOCK_STEPS)
+    stop_block = stop // BLOCK_STEPS
+    steps = min(n_steps, 2 * BLOCK_STEPS)
+    if first_block < stop_block:
+        chunks = range(first_block // PYRAMID_CHUNK_BLOCKS, (stop_block - 1) // PYRAMID_CHUNK_BLOCKS + 1)
+        steps += sum(PYRAMID_CHUNK_BLOCKS * BLOCK_STEPS for chunk in chunks if not _chunk_cached(series, chunk))
+    return steps
+
+
+def downsample(series: Series, start: int, stop: int, max_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """(steps, prices) of at most ``max_points`` points tracing the window [start, stop)."""
+    n_steps = stop - start
+    if n_steps <= max_points:
+        return np.arange(start, stop, dtype=np.int64), series.prices(start, stop)
+
+    n_buckets = max(1, max_points // 2)
+    bucket_steps = n_steps / n_buckets
+    if bucket_steps < 2 * BLOCK_STEPS:
+        values = series.log_levels(start, stop)
+        steps = np.arange(start, stop, dtype=np.int64)
+        groups = np.arange(n_steps, dtype=np.int64) * n_buckets // n_steps
+        min_steps, min_values = _first_extreme_per_group(values, steps, groups, np.minimum)
+        max_steps, max_values = _first_extreme_per_group(values, steps, groups, np.maximum)
+    else:
+        # Cells of at most half a bucket, so that a cell straddling its edges can't take all of
+        # its points to the next bucket.
+        level = min(int(math.log2(bucket_steps / BLOCK_STEPS)) - 1, _LEVELS - 1)
+        extremes = _window_extremes(series, start, stop, level)
+        # Each piece's extremes go to the bucket they fall in; their steps increase piece by piece.
+        min_steps = extremes[_MIN_STEP].astype(np.int64)
+        max_steps = extremes[_MAX_STEP].astype(np.int64)
+        min_steps, min_values = _first_extreme_per_group(
+            extremes[_MIN_VALUE], min_steps, (min_steps - start) * n_buckets // n_steps, np.minimum
+        )
+        max_steps, max_values = _first_extreme_per_group(
+            extremes[_MAX_VALUE], max_steps, (max_steps - start) * n_buckets // n_steps, np.maximum
+        )
+
+    steps = np.concatenate((min_steps, max_steps))
+    values = np.concatenate((min_values, max_values))
+    steps, first = np.unique(steps, return_index=True)
+    return steps, INITIAL_PRICE * np.exp(values[first])
@@ -0,0 +1,270 @@
+"""
+Host-wide fan-out of live ticks, so that each live series is generated once per host.
+
+Every live series has a ring of its latest ticks in a memory-mapped file of a tmpfs
+directory. One process per host produces it: the one holding an ``flock`` on the series'
+producer lock, taken by whichever process with subscribers gets to it first and given up
+when its last subscriber leaves (or it dies), for another one to take over. The producer
+appends the ticks as they fall due; every subscriber of every process reads them from the
+ring, so generation costs one series' worth of CPU however many workers stream it.
+
+The step of a tick is its sequence number. Tick ``s`` lives in slot ``s % capacity``, which
+records ``s`` alongside the price, and the header holds one past the last step written. The
+producer fills slots before advancing the header, and a reader copies the slots it wants and
+then checks both the header (no slot was reused while it read) and each slot's step (no slot
+is stale, e.g. after a gap between producers). A reader that falls more than the ring behind
+sees the check fail and resyncs to the latest tick. Producers need no hand-over: any of them
+generates the same prices for the same steps, so a new one continues where the last stopped.
+
+Indicators are kept per process: the subscribers of a feed asking for the same indicators
+share one ``IndicatorTrack``, updated once per tick, for as long as the feed has subscribers.
+"""
+import asyncio
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+import numpy as np
+from fastapi import WebSocket
+
+from src.ticker.generation import Series, live_step, step_timestamp
+from src.ticker.indicators import Indicator, IndicatorTrack
+from src.ticker.replay import latest_frame, ohlc_frame, ticks_frame, with_indicators
+from src.ticker.schemas import CoalesceModeEnum
+
+_MAGIC = b"FTKRING1"
+_HEADER = np.dtype([
+    ("magic", "S8"),
+    ("capacity", "<u8"),
+    ("next_step", "<i8"),
+])
+_SLOT = np.dtype([
+    ("step", "<i8"),
+    ("price", "<f8"),
+])
+
+
+class TickRing:
+    """The latest ticks of one series, shared by every process of the host."""
+
+    def __init__(self, path: str, capacity: int):
+        size = _HEADER.itemsize + capacity * _SLOT.itemsize
+        with open(path, "a+b") as ring_file:
+            fcntl.flock(ring_file, fcntl.LOCK_EX)
+            header = np.fromfile(path, dtype=_HEADER, count=1)
+            if os.path.getsize(path) != size or header[0]["magic"] != _MAGIC or header[0]["capacity"] != capacity:
+                ring_file.truncate(0)
+                ring_file.truncate(size)
+                np.array([(_MAGIC, capacity, 0)], dtype=_HEADER).tofile(path)
+        self.capacity = capacity
+        self._header = np.memmap(path, dtype=_HEADER, mode="r+", shape=(1,))
+        self._slots = np.memmap(path, dtype=_SLOT, mode="r+", offset=_HEADER.itemsize, shape=(capacity,))
+
+    @property
+    def next_step(self) -> int:
+        return int(self._header[0]["next_step"])
+
+    def write(self, start: int, prices: np.ndarray) -> None:
+        """
+        Appends the ticks of steps [start, start + len(prices)), at most ``capacity`` of them;
+        only the producer writes.
+        """
+        steps = np.arange(start, start + len(prices), dtype=np.int64)
+        positions = steps % self.capacity
+        self._slots["step"][positions] = -1
+        self._slots["price"][positions] = prices
+        self._slots["step"][positions] = steps
+        self._header[0]["next_step"] = start + len(prices)
+
+    def read(self, start: int, stop: int) -> np.ndarray | None:
+        """
+        Prices of steps [start, stop), or of as many as were written; None if some of them are
+        no longer, or were never, in the ring.
+        """
+        stop = min(stop, self.next_step)
+        if stop <= start:
+            return np.empty(0)
+        if stop - start > self.capacity:
+            return None
+        positions = np.arange(start, stop, dtype=np.int64) % self.capacity
+        slots = self._slots[positions]
+        if self.next_step - self.capacity > start or not np.array_equal(slots["step"], np.arange(start, stop)):
+            return None
+        return slots["price"]
+
+    def latest(self) -> tuple[int, float] | None:
+        """The last tick written, as (step, price)."""
+        step = self.next_step - 1
+        slot = self._slots[step % self.capacity]
+        if step < 0 or slot["step"] != step:
+            return None
+        return step, float(slot["price"])
+
+
+class LiveFeed:
+    """A process's view of one series' ring, and its turn at producing it."""
+
+    def __init__(self, series: Series, directory: str, capacity: int):
+        self.series = series
+        name = f"{series.key:032x}"
+        self.ring = TickRing(os.path.join(directory, f"{name}.ring"), capacity)
+        self._lock_path = os.path.join(directory, f"{name}.producer")
+        self._lock_file = None
+        self.subscribers = 0
+        # Frames are built in worker threads: one at a time produces and updates the tracks.
+        self.lock = threading.Lock()
+        self._tracks: dict[tuple[str, ...], IndicatorTrack] = {}
+
+    @property
+    def producing(self) -> bool:
+        return self._lock_file is not None
+
+    def produce(self, due_step: int) -> None:
+        """Writes the ticks due up to ``due_step`` if this process is, or can become, the producer."""
+        if self._lock_file is None:
+            lock_file = open(self._lock_path, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return
+            self._lock_file = lock_file
+        start = max(self.ring.next_step, due_step - self.ring.capacity)
+        if start < due_step:
+            self.ring.write(start, self.series.prices(start, due_step))
+
+    def track(self, indicators: list[Indicator]) -> IndicatorTrack:
+        """The track of the given indicators, shared by the subscribers asking for the same ones."""
+        specs = tuple(indicator.spec for indicator in indicators)
+        track = self._tracks.get(specs)
+        if track is None:
+            track = self._tracks[specs] = IndicatorTrack(indicators, self.series, self.ring.capacity)
+        return track
+
+    def release(self) -> None:
+        with self.lock:
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+
+class LiveFeeds:
+    """The feeds of a process, by series, kept while they have subscribers."""
+
+    def __init__(self, directory: str, capacity: int):
+        self.directory = directory
+        self.capacity = capacity
+        os.makedirs(directory, exist_ok=True)
+        self._feeds: dict[int, LiveFeed] = {}
+
+    @contextmanager
+    def subscribe(self, series: Series) -> Iterator[LiveFeed]:
+        feed = self._feeds.get(series.key)
+        if feed is None:
+            feed = self._feeds[series.key] = LiveFeed(series, self.directory, self.capacity)
+        feed.subscribers += 1
+        try:
+            yield feed
+        finally:
+            feed.subscribers -= 1
+            if not feed.subscribers:
+                # Lets a process that still has subscribers take over.
+                feed.release()
+                del self._feeds[series.key]
+
+
+_live_feeds: LiveFeeds | None = None
+
+
+def set_live_feeds(feeds: LiveFeeds | None) -> None:
+    """Makes live streams read their ticks from rings shared across processes."""
+    global _live_feeds
+    _live_feeds = feeds
+
+
+def get_live_feeds() -> LiveFeeds | None:
+    return _live_feeds
+
+
+def open_live_feeds(directory: str | None, capacity: int) -> LiveFeeds | None:
+    """The host's live feeds, or None where the directory cannot be used."""
+    if not directory:
+        return None
+    try:
+        return LiveFeeds(directory, capacity)
+    except OSError:
+        return None
+
+
+def next_live_frame(
+    feed: LiveFeed,
+    position: int,
+    due_step: int,
+    max_ticks: int,
+    coalesce: CoalesceModeEnum,
+    track: IndicatorTrack | None = None,
+) -> tuple[dict[str, Any] | None, int]:
+    """
+    Builds the frame of the ticks in the ring from step ``position``, and the step after them;
+    runs in a worker thread, as producing generates the ticks.
+    """
+    with feed.lock:
+        feed.produce(due_step)
+        prices = feed.ring.read(position, due_step)
+        if prices is None:
+            # Overrun: the ticks were overwritten before this reader got to them. Resync to the latest.
+            latest = feed.ring.latest()
+            if latest is None or latest[0] < position:
+                return None, position
+            step, price = latest
+            frame = latest_frame(int(step_timestamp(step, feed.series.interval)), price, step - position)
+            return with_indicators(frame, track, step, np.array([price])), step + 1
+        n = len(prices)
+        if not n:
+            return None, position
+        timestamps = step_timestamp(np.arange(position, position + n), feed.series.interval)
+        if n <= max_ticks:
+            frame = ticks_frame(timestamps, prices)
+        elif coalesce == CoalesceModeEnum.OHLC:
+            frame = ohlc_frame(timestamps, prices, max_ticks)
+        else:
+            frame = latest_frame(int(timestamps[-1]), float(prices[-1]), n - 1)
+        return with_indicators(frame, track, position, prices), position + n
+
+
+async def stream_live(
+    websocket: WebSocket,
+    feeds: LiveFeeds,
+    series: Series,
+    frame_interval: float,
+    max_ticks_per_second: int,
+    coalesce: CoalesceModeEnum,
+    throttle: Callable[[int], float] | None = None,
+    indicators: list[Indicator] | None = None,
+) -> None:
+    """
+    Sends the live ticks of ``series`` from the host's ring until the client disconnects, in
+    the frames ``stream_series`` would send at a speed of 1.
+
+    ``throttle`` is given the number of steps of each frame, although only the producer
+    generates them, so that a stream costs its user the same wherever it is served from.
+    """
+    max_ticks = max(1, int(max_ticks_per_second * frame_interval))
+    with feeds.subscribe(series) as feed:
+        track = feed.track(indicators) if indicators else None
+        position = live_step(series.interval) - 1
+        while True:
+            previous = position
+            # In a thread, so that generating a catch-up doesn't stall the event loop.
+            frame, position = await asyncio.to_thread(
+                next_live_frame, feed, position, live_step(series.interval), max_ticks, coalesce, track
+            )
+            if frame is not None:
+                if throttle is not None:
+                    delay = throttle(min(position - previous, feed.ring.capacity))
+                    if delay:
+                        await asyncio.sleep(delay)
+                await websocket.send_json(frame)
+            await asyncio.sleep(frame_interval)
@@ -0,0 +1,203 @@
+"""
+Offline generation of ticker datasets, without going through the API:
+
+    python -m src.ticker.generate AKLA BQZB --interval 60 --end 2021-01-01 --output data/
+    python -m src.ticker.generate --all-built-in --user someone@example.com --all-user-defined ...
+
+Tickers are resolved as the API resolves them: built-in tickers and sector indices from their
+codes, and a user's own tickers and baskets from the database. Each ticker's window is cut
+into shards of ``--shard-steps`` steps, written by a process pool as one file each:
+
+    <output>/interval=<interval>/ticker_code=<code>/part-<shard>.parquet (or .bin)
+
+Parquet files have a ``time`` (UTC timestamp) and a ``price`` column; binary ones are packed
+little-endian records of Unix seconds (int64) and price (float64). ``manifest.json`` lists the
+tickers, their parameter hashes and the window.
+
+A price only depends on the ticker's parameters and its step, through the series' own
+counter-based random streams, so the files are the same, bit for bit and as the API's series,
+whatever the sharding, the number of processes or the order shards are written in. Shards are independent, so throughput grows with the processes until
+the disk is the limit.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import numpy as np
+from sqlalchemy import select
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = pq = None
+
+from src.config import settings
+from src.database import SessionLocal
+from src.ticker import service
+from src.ticker.built_in_tickers import iter_built_in_ticker_codes
+from src.ticker.generation import SERIES_EPOCH, get_series, params_hash, step_at, step_timestamp
+from src.ticker.schemas import TickerDetails
+from src.user.models import User
+
+BINARY_RECORD = np.dtype([("time", "<i8"), ("price", "<f8")])
+_EXTENSIONS = {"parquet": "parquet", "binary": "bin"}
+_PROGRESS_SECONDS = 5.0
+
+
+def shard_path(output: str, interval: int, ticker_code: str, shard: int, file_format: str) -> str:
+    return os.path.join(
+        output, f"interval={interval}", f"ticker_code={ticker_code}", f"part-{shard:05d}.{_EXTENSIONS[file_format]}"
+    )
+
+
+def write_shard(details: TickerDetails, interval: int, start: int, stop: int, path: str, file_format: str) -> int:
+    """Writes the steps [start, stop) of a ticker's series to ``path``; runs on the process pool."""
+    series = get_series(details, interval)
+    timestamps = step_timestamp(np.arange(start, stop, dtype=np.int64), interval)
+    prices = series.prices(start, stop)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written aside and renamed, so that an interrupted run leaves no truncated part behind.
+    partial = f"{path}.partial"
+    if file_format == "parquet":
+        table = pa.table({
+            "time": pa.array(timestamps, type=pa.timestamp("s", tz="UTC")),
+            "price": pa.array(prices, type=pa.float64()),
+        })
+        pq.write_table(table, partial)
+    else:
+        records = np.empty(len(prices), dtype=BINARY_RECORD)
+        records["time"] = timestamps
+        records["price"] = prices
+        records.tofile(partial)
+    os.replace(partial, path)
+    return stop - start
+
+
+def resolve_tickers(codes: list[str], all_built_in: bool, user: str | None, all_user_defined: bool) -> list[TickerDetails]:
+    """Details of the tickers asked for; exits if one can't be resolved."""
+    codes = list(dict.fromkeys(codes))
+    if all_built_in:
+        codes += [code for code in iter_built_in_ticker_codes() if code not in codes]
+    if user is None:
+        if all_user_defined:
+            sys.exit("--all-user-defined needs --user.")
+        resolved = []
+        for code in codes:
+            details = service.get_built_in_details(code)
+            if details is None:
+                sys.exit(f"'{code}' is not a built-in ticker; give --user to look up user-defined ones.")
+            resolved.append(details)
+        return resolved
+
+    import src.api  # noqa: F401 (registers every model)
+    with SessionLocal() as session:
+        try:
+            user_id = uuid.UUID(user)
+        except ValueError:
+            user_id = session.execute(select(User.id).where(User.email == user)).scalar_one_or_none()
+            if user_id is None:
+                sys.exit(f"No user '{user}'.")
+        if all_user_defined:
+            own = [ticker.ticker_code for ticker in service.get_all_by_user(session=session, user_id=user_id)]
+            codes += [code for code in own if code not in codes]
+        resolved = []
+        for code in codes:
+            details = service.get_details(session=session, ticker_code=code, user_id=user_id)
+            if details is None:
+                sys.exit(f"Ticker '{code}' not found for user {user_id}.")
+            resolved.append(details)
+        return resolved
+
+
+def parse_time(value: str) -> datetime.datetime:
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not an ISO 8601 time.")
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=datetime.UTC)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m src.ticker.generate", description="Writes ticker datasets to files.")
+    parser.add_argument("tickers", nargs="*", help="ticker codes")
+    parser.add_argument("--all-built-in", action="store_true", help="every built-in ticker")
+    parser.add_argument("--user", help="email or id of the user whose tickers and baskets to resolve")
+    parser.add_argument("--all-user-defined", action="store_true", help="every ticker the user defined")
+    parser.add_argument("--interval", type=int, default=60, help="seconds between points")
+    parser.add_argument("--start", type=parse_time, default=SERIES_EPOCH, help="time of the first point")
+    parser.add_argument("--end", type=parse_time, help="end (exclusive) of the window")
+    parser.add_argument("--steps", type=int, help="points per ticker, instead of an end")
+    parser.add_argument("--output", required=True, help="directory to write to")
+    parser.add_argument("--format", choices=sorted(_EXTENSIONS), default="parquet")
+    parser.add_argument("--shard-steps", type=int, default=1 << 22, help="points per file")
+    parser.add_argument("--processes", type=int, default=settings.GENERATION_PROCESSES or os.cpu_count())
+    args = parser.parse_args()
+    if not args.tickers and not args.all_built_in and not args.all_user_defined:
+        parser.error("give tickers, --all-built-in or --all-user-defined")
+    if (args.end is None) == (args.steps is None):
+        parser.error("give one of --end and --steps")
+    if args.interval < 1 or args.shard_steps < 1 or args.processes < 1:
+        parser.error("--interval, --shard-steps and --processes must be positive")
+    if args.start < SERIES_EPOCH:
+        parser.error(f"series cannot start before {SERIES_EPOCH.isoformat()}")
+    if args.format == "parquet" and pq is None:
+        parser.error("pyarrow is not installed; use --format binary")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    tickers = resolve_tickers(args.tickers, args.all_built_in, args.user, args.all_user_defined)
+    start = step_at(args.start, args.interval)
+    stop = start + args.steps if args.steps is not None else step_at(args.end, args.interval)
+    if stop <= start:
+        sys.exit("The window is empty.")
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "manifest.json"), "w") as manifest_file:
+        json.dump({
+            "interval": args.interval,
+            "start": int(step_timestamp(start, args.interval)),
+            "stop": int(step_timestamp(stop, args.interval)),
+            "format": args.format,
+            "columns": {"time": "unix seconds, int64", "price": "float64"},
+            "shard_steps": args.shard_steps,
+            "tickers": {details.ticker_code: params_hash(details) for details in tickers},
+        }, manifest_file, indent=2)
+
+    shards = (
+        (details, shard_start, min(shard_start + args.shard_steps, stop), index)
+        for details in tickers
+        for index, shard_start in enumerate(range(start, stop, args.shard_steps))
+    )
+    total = len(tickers) * (stop - start)
+    written = 0
+    started = last_report = time.monotonic()
+    # Spawned like the API's pool; a few shards queued per process keep them all busy without
+    # pickling every shard's task up front.
+    with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending: set[Future] = set()
+        for details, shard_start, shard_stop, index in shards:
+            path = shard_path(args.output, args.interval, details.ticker_code, index, args.format)
+            pending.add(executor.submit(write_shard, details, args.interval, shard_start, shard_stop, path, args.format))
+            if len(pending) >= 4 * args.processes:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                written += sum(future.result() for future in done)
+            if time.monotonic() - last_report >= _PROGRESS_SECONDS:
+                last_report = time.monotonic()
+                rate = written / (last_report - started)
+                print(f"{written}/{total} points, {rate:,.0f} points/s", file=sys.stderr)
+        written += sum(future.result() for future in wait(pending).done)
+    elapsed = time.monotonic() - started
+    print(f"Wrote {written} points of {len(tickers)} tickers in {elapsed:.1f}s ({written / elapsed:,.0f} points/s).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,599 @@
+"""
+Merton jump-diffusion path generation.
+
+Every ticker/interval pair owns one path laid out on an absolute step grid starting at
+``SERIES_EPOCH``. Steps are grouped in blocks of ``BLOCK_STEPS``: the aggregate log-return of
+each block is drawn first from a handful of per-series coarse streams, and the increments
+inside a block are then drawn conditionally on that aggregate from a per-block stream. Any
+window can therefore be produced in O(window + blocks before it) time, and a page continued
+from a known price in O(page), without the path depending on how it was paged.
+"""
+import datetime
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from src.ticker.schemas import TickerDetails, TickerModelEnum
+from src.ticker.shared_cache import SharedArrayCache
+from src.ticker.stochastic_models import CHUNK_ELEMENTS, draw_shocks, get_model
+
+SERIES_EPOCH = datetime.datetime(2020, 1, 1, tzinfo=datetime.UTC)
+SERIES_EPOCH_TIMESTAMP = int(SERIES_EPOCH.timestamp())
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+BLOCK_STEPS = 1024
+# Unit of the shared array cache.
+SEGMENT_BLOCKS = 64
+SEGMENT_STEPS = SEGMENT_BLOCKS * BLOCK_STEPS
+INITIAL_PRICE = 100.0
+MAX_PAGE_STEPS = 10_000
+# Raised whenever the generated paths change, so that the immutable ETags of built-in tickers
+# served from the old paths stop matching; the shared cache has its own version.
+GENERATOR_VERSION = 1
+
+# The last Philox counter word tells the streams of a series apart; the third one is the block.
+_FINE_STREAM = 0
+_DIFFUSION_STREAM = 1
+_JUMP_COUNT_STREAM = 2
+_JUMP_SIZE_STREAM = 3
+_STATE_STREAM = 4
+
+_SERIES_CACHE_SIZE = 1024
+
+_array_cache: SharedArrayCache | None = None
+
+
+def set_array_cache(cache: SharedArrayCache | None) -> None:
+    """Makes series read and store their increments through a cache shared across processes."""
+    global _array_cache
+    _array_cache = cache
+
+
+def get_array_cache() -> SharedArrayCache | None:
+    return _array_cache
+
+
+@dataclass(frozen=True)
+class MertonParams:
+    """Ticker parameters converted from percentages to fractions."""
+    drift: float
+    volatility: float
+    jump_intensity: float
+    jump_mean: float
+    jump_std_dev: float
+
+    @classmethod
+    def from_details(cls, details: TickerDetails) -> "MertonParams":
+        return cls(
+            drift=details.drift / 100,
+            volatility=details.volatility / 100,
+            jump_intensity=details.jump_intensity,
+            jump_mean=details.jump_mean / 100,
+            jump_std_dev=details.jump_std_dev / 100,
+        )
+
+    @property
+    def jump_compensator(self) -> float:
+        """Expected relative price change per year caused by jumps."""
+        return self.jump_intensity * (math.exp(self.jump_mean + self.jump_std_dev ** 2 / 2) - 1)
+
+
+@dataclass(frozen=True)
+class GeneratorState:
+    """Everything needed to continue a path after its last emitted step."""
+    ticker_code: str
+    params_hash: str
+    interval: int
+    key: int
+    counter: int
+    last_price: float
+    timestamp: int
+
+
+def _merton_raw(ticker_code: str, drift: float, volatility: float, jump_intensity: float, jump_mean: float, jump_std_dev: float) -> str:
+    return "|".join(str(value) for value in (ticker_code, drift, volatility, jump_intensity, jump_mean, jump_std_dev))
+
+
+def merton_params_hash(ticker_code: str, drift: float, volatility: float, jump_intensity: float, jump_mean: float, jump_std_dev: float) -> str:
+    """``params_hash`` of a Merton ticker, from its params as plain floats rather than its details."""
+    return hashlib.sha256(
+        _merton_raw(ticker_code, drift, volatility, jump_intensity, jump_mean, jump_std_dev).encode()
+    ).hexdigest()[:16]
+
+
+def params_hash(details: TickerDetails) -> str:
+    """Stable digest of everything that shapes a ticker's path."""
+    raw = _merton_raw(
+        details.ticker_code,
+        details.drift,
+        details.volatility,
+        details.jump_intensity,
+        details.jump_mean,
+        details.jump_std_dev,
+    )
+    if details.model != TickerModelEnum.MERTON:
+        raw += f"|{details.model.value}|{json.dumps(details.model_params, sort_keys=True)}"
+    if details.constituents:
+        raw += "|" + ";".join(
+            f"{constituent.ticker_code}:{constituent.weight!r}:{params_hash(constituent.details)}"
+            for constituent in details.constituents
+        )
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def series_key(p_hash: str, interval: int) -> int:
+    """128-bit Philox key of the path for the given parameters and interval."""
+    digest = hashlib.sha256(f"{p_hash}|{interval}".encode()).digest()
+    return int.from_bytes(digest[:16], "big")
+
+
+def step_timestamp(step: int | np.ndarray, interval: int) -> int | np.ndarray:
+    return SERIES_EPOCH_TIMESTAMP + step * interval
+
+
+def step_at(timestamp: datetime.datetime, interval: int) -> int:
+    """First step at or after the given time."""
+    return -(-(int(timestamp.timestamp()) - SERIES_EPOCH_TIMESTAMP) // interval)
+
+
+def live_step(interval: int) -> int:
+    """One past the last step whose time has been reached, by the wall clock."""
+    return int((time.time() - SERIES_EPOCH_TIMESTAMP) // interval) + 1
+
+
+def _stream(key: int, block: int, stream: int) -> np.random.Generator:
+    return np.random.Generator(np.random.Philox(key=key, counter=[0, 0, block, stream]))
+
+
+class Series:
+    """The path of one ticker at one interval."""
+
+    # Arrays with an entry per block drawn, dropped together by ``forget_before``.
+    _block_arrays = ("_diffusion_z", "_jump_counts", "_jump_z", "_block_offsets")
+
+    def __init__(self, details: TickerDetails, interval: int):
+        self.ticker_code = details.ticker_code
+        self.params = MertonParams.from_details(details)
+        self.params_hash = params_hash(details)
+        self.interval = interval
+        self.key = series_key(self.params_hash, interval)
+
+        dt = interval / SECONDS_PER_YEAR
+        p = self.params
+        self.step_drift = (p.drift - p.volatility ** 2 / 2 - p.jump_compensator) * dt
+        self.step_volatility = p.volatility * math.sqrt(dt)
+        self.block_jump_rate = p.jump_intensity * dt * BLOCK_STEPS
+
+        self._lock = threading.Lock()
+        self._diffusion_rng = _stream(self.key, 0, _DIFFUSION_STREAM)
+        self._jump_count_rng = _stream(self.key, 0, _JUMP_COUNT_STREAM)
+        self._jump_size_rng = _stream(self.key, 0, _JUMP_SIZE_STREAM)
+        self._diffusion_z = np.empty(0)
+        self._jump_counts = np.empty(0, dtype=np.int64)
+        self._jump_z = np.empty(0)
+        # _block_offsets[b] is the log level reached at the end of block b - 1.
+        self._block_offsets = np.zeros(1)
+        # The per-block arrays start at this block; those before it are forgotten.
+        self._first_block = 0
+
+    def _position(self, block: int) -> int:
+        """Index of a block in the per-block arrays."""
+        if block < self._first_block:
+            raise ValueError(f"Blocks before {self._first_block} have been forgotten.")
+        return block - self._first_block
+
+    def _ensure_blocks(self, n_blocks: int) -> None:
+        """Draws the aggregate moves of blocks [0, n_blocks) if not drawn yet."""
+        with self._lock:
+            kept = len(self._block_offsets) - 1
+            have = self._first_block + kept
+            if n_blocks <= have:
+                return
+            # Grow geometrically so that walking forward block by block stays amortised O(1).
+            extra = max(n_blocks - have, kept // 2, 64)
+            diffusion_z = self._diffusion_rng.standard_normal(extra)
+            jump_counts = self._jump_count_rng.poisson(self.block_jump_rate, extra)
+            jump_z = self._jump_size_rng.standard_normal(extra)
+
+            p = self.params
+            totals = (
+                BLOCK_STEPS * self.step_drift
+                + self.step_volatility * math.sqrt(BLOCK_STEPS) * diffusion_z
+                + jump_counts * p.jump_mean
+                + np.sqrt(jump_counts) * p.jump_std_dev * jump_z
+            )
+            # Summed in sequence from the last offset, so that an offset comes out bit for bit the
+            # same whichever blocks were asked for first.
+            offsets = np.cumsum(np.concatenate((self._block_offsets[-1:], totals)))[1:]
+
+            self._diffusion_z = np.concatenate((self._diffusion_z, diffusion_z))
+            self._jump_counts = np.concatenate((self._jump_counts, jump_counts))
+            self._jump_z = np.concatenate((self._jump_z, jump_z))
+            self._block_offsets = np.concatenate((self._block_offsets, offsets))
+
+    def forget_before(self, step: int) -> None:
+        """
+        Drops the aggregate moves of the blocks before the segment of ``step``, for a series only
+        walked forward from there, so that it keeps a few blocks however far from the epoch it is.
+        """
+        block = step // SEGMENT_STEPS * SEGMENT_BLOCKS
+        with self._lock:
+            drop = min(block, self._first_block + len(self._block_offsets) - 1) - self._first_block
+            if drop <= 0:
+                return
+            for name in self._block_arrays:
+                setattr(self, name, getattr(self, name)[drop:].copy())
+            self._first_block += drop
+
+    def block_offset(self, block: int) -> float:
+        """Log level (relative to ``INITIAL_PRICE``) at the start of a block."""
+        self._ensure_blocks(block)
+        return float(self._block_offsets[self._position(block)])
+
+    def block_offsets(self, first: int, stop: int) -> np.ndarray:
+        """``block_offset`` of the blocks [first, stop)."""
+        self._ensure_blocks(stop)
+        position = self._position(first)
+        return self._block_offsets[position:position + stop - first]
+
+    def block_increments(self, block: int) -> np.ndarray:
+        """Per-step log-returns of a block, conditioned on the block's aggregate move."""
+        self._ensure_blocks(block + 1)
+        position = self._position(block)
+        diffusion_z = self._diffusion_z[position]
+        jump_count = int(self._jump_counts[position])
+        jump_z = self._jump_z[position]
+
+        rng = _stream(self.key, block, _FINE_STREAM)
+        z = rng.standard_normal(BLOCK_STEPS)
+        increments = self.step_drift + self.step_volatility * (
+            z - z.mean() + diffusion_z / math.sqrt(BLOCK_STEPS)
+        )
+        if jump_count:
+            p = self.params
+            positions = rng.integers(0, BLOCK_STEPS, jump_count)
+            z_sizes = rng.standard_normal(jump_count)
+            sizes = p.jump_mean + p.jump_std_dev * (z_sizes - z_sizes.mean() + jump_z / math.sqrt(jump_count))
+            np.add.at(increments, positions, sizes)
+        return increments
+
+    def blocks_increments(self, first: int, stop: int) -> np.ndarray:
+        """``block_increments`` of the blocks [first, stop), one row per block."""
+        return np.stack([self.block_increments(block) for block in range(first, stop)])
+
+    def segment_increments(self, segment: int) -> np.ndarray:
+        """Log-returns of ``SEGMENT_BLOCKS`` consecutive blocks, through the shared cache."""
+        first = segment * SEGMENT_BLOCKS
+        return _array_cache.get_or_create(
+            f"increments-{self.key:032x}-{segment}",
+            lambda: self.blocks_increments(first, first + SEGMENT_BLOCKS).ravel(),
+        )
+
+    def increments(self, start: int, stop: int) -> np.ndarray:
+        """Log-returns of steps [start, stop); step ``s`` moves the price from ``s - 1`` to ``s``."""
+        if _array_cache is None:
+            first, last = start // BLOCK_STEPS, (stop - 1) // BLOCK_STEPS
+            offset = first * BLOCK_STEPS
+            return self.blocks_increments(first, last + 1).ravel()[start - offset:stop - offset]
+        first, last = start // SEGMENT_STEPS, (stop - 1) // SEGMENT_STEPS
+        parts = [self.segment_increments(segment) for segment in range(first, last + 1)]
+        offset = first * SEGMENT_STEPS
+        if len(parts) == 1:
+            return parts[0][start - offset:stop - offset]
+        return np.concatenate(parts)[start - offset:stop - offset]
+
+    def log_levels(self, start: int, stop: int) -> np.ndarray:
+        """Log levels (relative to ``INITIAL_PRICE``) of steps [start, stop)."""
+        first, last = start // BLOCK_STEPS, (stop - 1) // BLOCK_STEPS
+        offset = first * BLOCK_STEPS
+        # Each block from its own offset, so that a level doesn't depend on where the window starts.
+        increments = self.increments(offset, (last + 1) * BLOCK_STEPS).reshape(-1, BLOCK_STEPS)
+        levels = np.cumsum(increments, axis=1)
+        levels += self.block_offsets(first, last + 1)[:, None]
+        return levels.ravel()[start - offset:stop - offset]
+
+    def prices(self, start: int, stop: int) -> np.ndarray:
+        """Prices of steps [start, stop)."""
+        return INITIAL_PRICE * np.exp(self.log_levels(start, stop))
+
+    def prices_after(self, state: GeneratorState, n: int) -> np.ndarray:
+        """The next ``n`` prices after a saved state, without walking from the epoch."""
+        increments = self.increments(state.counter, state.counter + n)
+        return state.last_price * np.exp(np.cumsum(increments))
+
+    def state_at(self, counter: int) -> GeneratorState:
+        """State positioned so that the next emitted step is ``counter``, found by seeking."""
+        last_price = float(self.prices(counter - 1, counter)[0]) if counter > 0 else INITIAL_PRICE
+        return self.state_after(counter, last_price)
+
+    def state_after(self, counter: int, last_price: float) -> GeneratorState:
+        """State positioned so that the next emitted step is ``counter``."""
+        return GeneratorState(
+            ticker_code=self.ticker_code,
+            params_hash=self.params_hash,
+            interval=self.interval,
+            key=self.key,
+            counter=counter,
+            last_price=last_price,
+            timestamp=step_timestamp(counter - 1, self.interval),
+        )
+
+
+class ModelSeries(Series):
+    """
+    The path of a ticker following one of the stateful models.
+
+    The states at the starts of the blocks form a chain, each drawn from the model's transition
+    law over a block from the one before, in O(1) per block: regimes and volatility carry over
+    from block to block, and a block can still be generated on its own. As for Merton paths, the
+    aggregate move of each block is drawn first, in O(1), from the law of the model's
+    ``block_moments`` between its start state and the next block's; the steps inside are then
+    simulated with the model's recursion (many blocks at once, as the paths of one batch), ending
+    in the next block's state where the model can pin it, and conditioned on the aggregate by
+    spreading the difference evenly over them.
+    """
+
+    _block_arrays = ("_block_states", "_block_totals", "_block_offsets")
+
+    def __init__(self, details: TickerDetails, interval: int):
+        super().__init__(details, interval)
+        self.model = get_model(details.model, self.params, details.model_params, interval / SECONDS_PER_YEAR)
+        self._state_rng = _stream(self.key, 0, _STATE_STREAM)
+        # _block_states[b] is the model's state at the start of block b, one more than the totals.
+        self._block_states = self.model.initial_state(self._state_rng, 1)
+        self._block_totals = np.empty(0)
+
+    def _ensure_blocks(self, n_blocks: int) -> None:
+        with self._lock:
+            kept = len(self._block_totals)
+            have = self._first_block + kept
+            if n_blocks <= have:
+                return
+            extra = max(n_blocks - have, kept // 2, 64)
+            states = np.concatenate((
+                self._block_states[-1:],
+                self.model.chain_states(self._state_rng, self._block_states[-1], BLOCK_STEPS, extra),
+            ))
+            drift, volatility, jump_probability, jump_mean, jump_std_dev = self.model.block_moments(
+                states[:-1], states[1:], BLOCK_STEPS
+            )
+            diffusion_z = self._diffusion_rng.standard_normal(extra)
+            jump_counts = self._jump_count_rng.poisson(np.broadcast_to(jump_probability * BLOCK_STEPS, extra))
+            jump_z = self._jump_size_rng.standard_normal(extra)
+            totals = (
+                BLOCK_STEPS * drift
+                + volatility * math.sqrt(BLOCK_STEPS) * diffusion_z
+                + jump_counts * jump_mean
+                + np.sqrt(jump_counts) * jump_std_dev * jump_z
+            )
+            offsets = np.cumsum(np.concatenate((self._block_offsets[-1:], totals)))[1:]
+
+            self._block_states = np.concatenate((self._block_states, states[1:]))
+            self._block_totals = np.concatenate((self._block_totals, totals))
+            self._block_offsets = np.concatenate((self._block_offsets, offsets))
+
+    def block_increments(self, block: int) -> np.ndarray:
+        return self.blocks_increments(block, block + 1)[0]
+
+    def blocks_increments(self, first: int, stop: int) -> np.ndarray:
+        """Simulates the blocks [first, stop) together, as the paths of one batch."""
+        self._ensure_blocks(stop)
+        position = self._position(first)
+        states = self._block_states[position:position + stop - first + 1]
+        totals = self._block_totals[position:position + stop - first]
+        rows = []
+        group_size = max(1, CHUNK_ELEMENTS // BLOCK_STEPS)
+        for group_start in range(first, stop, group_size):
+            group_stop = min(group_start + group_size, stop)
+            z, u = zip(*(
+                draw_shocks(self.model, _stream(self.key, block, _FINE_STREAM), BLOCK_STEPS, 1)
+                for block in range(group_start, group_stop)
+            ))
+            increments = self.model.simulate_bridge(
+                np.concatenate(z, axis=1),
+                np.concatenate(u, axis=1),
+                states[group_start - first:group_stop - first],
+                states[group_start - first + 1:group_stop - first + 1],
+            )
+            rows.append(increments.T)
+        increments = np.concatenate(rows)
+        return increments + ((totals - increments.sum(axis=1)) / BLOCK_STEPS)[:, None]
+
+
+class BasketSeries(Series):
+    """
+    The path of an index or basket: the value of holding each constituent from the epoch,
+    with ``weight`` of the initial price put into it.
+
+    Windows are computed for all constituents at once, as the weighted sum of the constituents'
+    prices; the constituents' paths come from their own series, made by ``constituent_series``.
+    """
+
+    def __init__(
+        self, details: TickerDetails, interval: int, constituent_series: Callable[[TickerDetails, int], Series]
+    ):
+        self.ticker_code = details.ticker_code
+        self.params_hash = params_hash(details)
+        self.interval = interval
+        self.key = series_key(self.params_hash, interval)
+        self.constituents = [constituent_series(constituent.details, interval) for constituent in details.constituents]
+        self.weights = np.array([constituent.weight for constituent in details.constituents])
+        self.weights /= self.weights.sum()
+        # Steps per window, to bound the size of the constituents' levels.
+        self._window_steps = max(BLOCK_STEPS, CHUNK_ELEMENTS // len(self.constituents))
+
+    def _log_value(self, constituent_levels: list[np.ndarray]) -> np.ndarray:
+        """
+        Log of the weighted sum of the constituents' values, added up constituent by constituent
+        rather than by a matrix product, whose rounding depends on the shape of the window.
+        """
+        value = np.zeros_like(constituent_levels[0])
+        for weight, levels in zip(self.weights, constituent_levels):
+            value += weight * np.exp(levels)
+        return np.log(value)
+
+    def forget_before(self, step: int) -> None:
+        for series in self.constituents:
+            series.forget_before(step)
+
+    def block_offsets(self, first: int, stop: int) -> np.ndarray:
+        return self._log_value([series.block_offsets(first, stop) for series in self.constituents])
+
+    def block_offset(self, block: int) -> float:
+        return float(self.block_offsets(block, block + 1)[0])
+
+    def log_levels(self, start: int, stop: int) -> np.ndarray:
+        levels = np.zeros(stop - start)
+        # The basket is worth INITIAL_PRICE before the epoch, like its constituents.
+        for window_start in range(max(start, 0), stop, self._window_steps):
+            window_stop = min(window_start + self._window_steps, stop)
+            levels[window_start - start:window_stop - start] = self._log_value(
+                [series.log_levels(window_start, window_stop) for series in self.constituents]
+            )
+        return levels
+
+    def increments(self, start: int, stop: int) -> np.ndarray:
+        return np.diff(self.log_levels(start - 1, stop))
+
+    def prices_after(self, state: GeneratorState, n: int) -> np.ndarray:
+        return self.prices(state.counter, state.counter + n)
+
+
+def merton_log_levels(keys: list[int], params: np.ndarray, interval: int, start: int, stop: int) -> np.ndarray:
+    """
+    ``Series.log_levels(start, stop)`` of many Merton series at once, one row per series, given
+    their keys and their params as rows of (drift, volatility, jump_intensity, jump_mean,
+    jump_std_dev) in the units of ``TickerDetails``. Only the draws are made series by series,
+    as each series has streams of its own; everything else is one pass over the array of the
+    series' steps. The aggregate moves of the blocks before the window are drawn and summed
+    ``CHUNK_ELEMENTS`` at a time, keeping only where each series stands at the window's start.
+    """
+    n_series = len(keys)
+    first, last = start // BLOCK_STEPS, (stop - 1) // BLOCK_STEPS
+    n_blocks = last - first + 1
+    drift, volatility = params[:, 0] / 100, params[:, 1] / 100
+    jump_intensity, jump_mean, jump_std_dev = params[:, 2], params[:, 3] / 100, params[:, 4] / 100
+    dt = interval / SECONDS_PER_YEAR
+    jump_compensator = jump_intensity * (np.exp(jump_mean + jump_std_dev ** 2 / 2) - 1)
+    step_drift = (drift - volatility ** 2 / 2 - jump_compensator) * dt
+    step_volatility = volatility * math.sqrt(dt)
+    block_jump_rate = jump_intensity * dt * BLOCK_STEPS
+
+    def block_totals(i: int, diffusion_z: np.ndarray, jump_counts: np.ndarray, jump_z: np.ndarray) -> np.ndarray:
+        return (
+            BLOCK_STEPS * step_drift[i]
+            + step_volatility[i] * math.sqrt(BLOCK_STEPS) * diffusion_z
+            + jump_counts * jump_mean[i]
+            + np.sqrt(jump_counts) * jump_std_dev[i] * jump_z
+        )
+
+    diffusion_z = np.empty((n_series, n_blocks))
+    jump_counts = np.empty((n_series, n_blocks), dtype=np.int64)
+    jump_z = np.empty((n_series, n_blocks))
+    offsets = np.empty((n_series, n_blocks))
+    z = np.empty((n_series, n_blocks, BLOCK_STEPS))
+    # Jumps inside the window's blocks: flat step index, and their standardised sizes by group.
+    jump_positions, jump_sizes, jump_groups = [], [], []
+    for i, key in enumerate(keys):
+        diffusion_rng = _stream(key, 0, _DIFFUSION_STREAM)
+        jump_count_rng = _stream(key, 0, _JUMP_COUNT_STREAM)
+        jump_size_rng = _stream(key, 0, _JUMP_SIZE_STREAM)
+        # Summed in sequence like Series does, so that the offsets come out bit for bit the same.
+        reached = np.zeros(1)
+        for slice_start in range(0, first, CHUNK_ELEMENTS):
+            n = min(CHUNK_ELEMENTS, first - slice_start)
+            totals = block_totals(
+                i,
+                diffusion_rng.standard_normal(n),
+                jump_count_rng.poisson(block_jump_rate[i], n),
+                jump_size_rng.standard_normal(n),
+            )
+            reached = np.cumsum(np.concatenate((reached, totals)))[-1:]
+        diffusion_z[i] = diffusion_rng.standard_normal(n_blocks)
+        jump_counts[i] = jump_count_rng.poisson(block_jump_rate[i], n_blocks)
+        jump_z[i] = jump_size_rng.standard_normal(n_blocks)
+        offsets[i] = np.cumsum(np.concatenate((reached, block_totals(i, diffusion_z[i], jump_counts[i], jump_z[i]))))[:-1]
+        for j, block in enumerate(range(first, last + 1)):
+            rng = _stream(key, block, _FINE_STREAM)
+            z[i, j] = rng.standard_normal(BLOCK_STEPS)
+            jump_count = int(jump_counts[i, j])
+            if jump_count:
+                jump_positions.append((i * n_blocks + j) * BLOCK_STEPS + rng.integers(0, BLOCK_STEPS, jump_count))
+                jump_sizes.append(rng.standard_normal(jump_count))
+                jump_groups.append((i, j, jump_count))
+
+    increments = step_drift[:, None, None] + step_volatility[:, None, None] * (
+        z - z.mean(axis=2, keepdims=True) + (diffusion_z / math.sqrt(BLOCK_STEPS))[:, :, None]
+    )
+    increments = increments.reshape(n_series, n_blocks * BLOCK_STEPS)
+    if jump_groups:
+        series_index, blocks, counts = (np.array(column) for column in zip(*jump_groups))
+        sizes = np.concatenate(jump_sizes)
+        group_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        group_means = np.add.reduceat(sizes, group_starts) / counts
+        group = np.repeat(np.arange(len(counts)), counts)
+        sizes = jump_mean[series_index[group]] + jump_std_dev[series_index[group]] * (
+            sizes - group_means[group] + (jump_z[series_index, blocks] / np.sqrt(counts))[group]
+        )
+        np.add.at(increments.reshape(-1), np.concatenate(jump_positions), sizes)
+    levels = np.cumsum(increments.reshape(n_series, n_blocks, BLOCK_STEPS), axis=2) + offsets[:, :, None]
+    offset = first * BLOCK_STEPS
+    return levels.reshape(n_series, n_blocks * BLOCK_STEPS)[:, start - offset:stop - offset]
+
+
+_series_cache: "OrderedDict[tuple[str, int], Series]" = OrderedDict()
+_series_cache_lock = threading.Lock()
+
+
+def _new_series(
+    details: TickerDetails, interval: int, constituent_series: Callable[[TickerDetails, int], Series]
+) -> Series:
+    if details.constituents:
+        return BasketSeries(details, interval, constituent_series)
+    if details.model == TickerModelEnum.MERTON:
+        return Series(details, interval)
+    return ModelSeries(details, interval)
+
+
+def get_series(details: TickerDetails, interval: int) -> Series:
+    """Returns the (process-wide, LRU cached) path of a ticker at an interval."""
+    cache_key = (params_hash(details), interval)
+    with _series_cache_lock:
+        series = _series_cache.get(cache_key)
+        if series is not None:
+            _series_cache.move_to_end(cache_key)
+            return series
+    series = _new_series(details, interval, get_series)
+    with _series_cache_lock:
+        series = _series_cache.setdefault(cache_key, series)
+        while len(_series_cache) > _SERIES_CACHE_SIZE:
+            _series_cache.popitem(last=False)
+    return series
+
+
+def forward_series(details: TickerDetails, interval: int) -> Series:
+    """
+    The path of a ticker at an interval as a series of its own, outside the LRU and with
+    constituents of its own, for walking forward with ``forget_before``.
+    """
+    return _new_series(details, interval, forward_series)
+
+
+def generate_page(
+    series: Series, start_step: int, limit: int, state: GeneratorState | None = None
+) -> tuple[np.ndarray, np.ndarray, GeneratorState]:
+    """Produces one page of (timestamps, prices), either from ``start_step`` or after ``state``."""
+    if state is not None:
+        start_step = state.counter
+        prices = series.prices_after(state, limit)
+    else:
+        prices = series.prices(start_step, start_step + limit)
+    steps = np.arange(start_step, start_step + limit, dtype=np.int64)
+    next_state = series.state_after(start_step + limit, float(prices[-1]))
+    return step_timestamp(steps, series.interval), prices, next_state
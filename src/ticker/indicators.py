@@ -0,0 +1,409 @@
+"""
+Technical indicators over a ticker's prices, for pages of history and for live streams alike.
+
+An indicator is given as a spec such as ``sma:20``, ``ema:12``, ``rsi:14``, ``macd:12:26:9``,
+``bb:20:2`` or ``atr:14``. Each has two implementations that agree to rounding:
+
+* a vectorised kernel over an array of prices, for history: rolling windows as differences of
+  cumulative sums, and exponential averages by a blocked recurrence. Inside blocks short enough
+  for the decay factor's powers to stay well-conditioned, an average is a cumulative sum of
+  rescaled prices; only the carry from block to block is a loop, over the blocks;
+* an incremental state, updated in O(1) per tick, for live streams. States are seeded from the
+  kernel's state at the end of the history, so live values continue the historical ones exactly.
+
+A value depends on the prices of the ``lookback`` steps before it. Exponential averages, whose
+memory never quite ends, start early enough (or at the epoch) for their starting point to weigh
+less than ``EMA_WARMUP_WEIGHT`` of their value: ``log(EMA_WARMUP_WEIGHT) / log(1 - alpha)``
+steps, about 20 periods for the EMA's ``2 / (period + 1)`` and 40 for Wilder's ``1 / period``.
+Values the path is too short for (near the epoch) are NaN.
+
+An ``IndicatorTrack`` keeps the states of a stream's indicators and their values for its most
+recent steps, so that the subscribers of one live series share it rather than each updating
+their own.
+"""
+import math
+from collections import deque
+import numpy as np
+
+from src.ticker.generation import Series
+
+EMA_WARMUP_WEIGHT = 1e-17
+MAX_PERIOD = 1000
+# Batches longer than this are recomputed with the kernels rather than tick by tick.
+_INCREMENTAL_MAX_TICKS = 256
+# Smallest power of the decay factor within a block of the blocked recurrence.
+_MIN_BLOCK_DECAY = 1e-3
+
+
+def ema(values: np.ndarray, alpha: float, initial: float | None = None) -> np.ndarray:
+    """
+    ``y[t] = y[t-1] + alpha * (values[t] - y[t-1])``, from ``y[-1] = initial`` (``values[0]`` if
+    not given, so that ``y[0] = values[0]``), by the blocked recurrence.
+    """
+    n = len(values)
+    if not n:
+        return np.empty(0)
+    decay = 1 - alpha
+    carry = float(values[0]) if initial is None else initial
+    if decay <= 0:
+        return np.array(values, dtype=np.float64)
+    block = max(1, min(n, int(math.log(_MIN_BLOCK_DECAY) / math.log(decay))))
+    n_blocks = -(-n // block)
+    padded = np.zeros(n_blocks * block)
+    padded[:n] = values
+    padded = padded.reshape(n_blocks, block)
+    powers = decay ** np.arange(block + 1)
+    # Each block's averages from a zero carry: y[j] = alpha decay^j sum_{i<=j} x[i] decay^-i.
+    partial = alpha * powers[:block] * np.cumsum(padded / powers[:block], axis=1)
+    carries = np.empty(n_blocks)
+    block_decay = powers[block]
+    for b in range(n_blocks):
+        carries[b] = carry
+        carry = float(partial[b, -1]) + block_decay * carry
+    return (partial + powers[1:] * carries[:, None]).ravel()[:n]
+
+
+def warmup_steps(alpha: float) -> int:
+    """Steps after which the start of an exponential average weighs less than ``EMA_WARMUP_WEIGHT``."""
+    if alpha >= 1:
+        return 0
+    return math.ceil(math.log(EMA_WARMUP_WEIGHT) / math.log1p(-alpha))
+
+
+def rolling_sum(values: np.ndarray, period: int) -> np.ndarray:
+    """Sums of the last ``period`` values, NaN for the first ``period - 1``."""
+    sums = np.cumsum(values)
+    sums[period:] -= sums[:-period].copy()
+    sums[:period - 1] = np.nan
+    return sums
+
+
+class IndicatorState:
+    def update(self, price: float) -> tuple[float, ...]:
+        raise NotImplementedError
+
+
+class Indicator:
+    """An indicator with its params, e.g. ``sma:20``."""
+    kind: str
+    outputs: tuple[str, ...] = ("",)
+
+    def __init__(self, *params: float):
+        self.params = params
+
+    @property
+    def spec(self) -> str:
+        return ":".join((self.kind, *(f"{param:g}" for param in self.params)))
+
+    @property
+    def columns(self) -> list[str]:
+        """Names of the outputs, as the spec for a single one or ``spec.output``."""
+        return [self.spec if not output else f"{self.spec}.{output}" for output in self.outputs]
+
+    @property
+    def lookback(self) -> int:
+        raise NotImplementedError
+
+    def compute(self, prices: np.ndarray) -> tuple[np.ndarray, IndicatorState]:
+        """Outputs over the prices, one row each, and the state after the last of them."""
+        raise NotImplementedError
+
+
+class _WindowState(IndicatorState):
+    def __init__(self, tail: np.ndarray, period: int, width: float | None):
+        self.window = deque(tail.tolist(), maxlen=period)
+        self.period = period
+        self.width = width
+        self.total = float(tail.sum())
+        self.squares = float(np.dot(tail, tail))
+
+    def update(self, price: float) -> tuple[float, ...]:
+        if len(self.window) == self.period:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.squares -= oldest * oldest
+        self.window.append(price)
+        self.total += price
+        self.squares += price * price
+        if len(self.window) < self.period:
+            return (math.nan,) * (1 if self.width is None else 3)
+        mean = self.total / self.period
+        if self.width is None:
+            return (mean,)
+        deviation = self.width * math.sqrt(max(self.squares / self.period - mean * mean, 0.0))
+        return mean + deviation, mean, mean - deviation
+
+
+class SMA(Indicator):
+    kind = "sma"
+
+    @property
+    def lookback(self) -> int:
+        return int(self.params[0]) - 1
+
+    def compute(self, prices):
+        period = int(self.params[0])
+        tail = prices[-period:]
+        return rolling_sum(prices, period)[None] / period, _WindowState(tail, period, None)
+
+
+class BollingerBands(Indicator):
+    """Middle band the SMA, outer bands ``width`` standard deviations (of the window) away."""
+    kind = "bb"
+    outputs = ("upper", "middle", "lower")
+
+    @property
+    def lookback(self) -> int:
+        return int(self.params[0]) - 1
+
+    def compute(self, prices):
+        period, width = int(self.params[0]), self.params[1]
+        mean = rolling_sum(prices, period) / period
+        variance = rolling_sum(prices * prices, period) / period - mean * mean
+        deviation = width * np.sqrt(np.maximum(variance, 0.0))
+        return np.stack((mean + deviation, mean, mean - deviation)), _WindowState(prices[-period:], period, width)
+
+
+class _AverageState(IndicatorState):
+    """Exponential averages of functions of the price and of its change."""
+
+    def __init__(self, alphas: tuple[float, ...], averages: list[float], last_price: float, indicator: "Indicator"):
+        self.alphas = alphas
+        self.averages = averages
+        self.last_price = last_price
+        # The indicator's step() updates the averages with a price, and values() reads them.
+        self.indicator = indicator
+
+    def update(self, price: float) -> tuple[float, ...]:
+        self.averages = self.indicator.step(self.averages, self.alphas, price, self.last_price)
+        self.last_price = price
+        return self.indicator.values(self.averages)
+
+
+class EMA(Indicator):
+    kind = "ema"
+
+    @property
+    def lookback(self) -> int:
+        return warmup_steps(2 / (self.params[0] + 1))
+
+    def compute(self, prices):
+        alpha = 2 / (self.params[0] + 1)
+        values = ema(prices, alpha)
+        return values[None], _AverageState((alpha,), [float(values[-1])], float(prices[-1]), self)
+
+    @staticmethod
+    def step(averages, alphas, price, last_price):
+        return [averages[0] + alphas[0] * (price - averages[0])]
+
+    @staticmethod
+    def values(averages):
+        return (averages[0],)
+
+
+class RSI(Indicator):
+    """Wilder's relative strength index, 0 to 100; 50 while the price hasn't moved."""
+    kind = "rsi"
+
+    @property
+    def lookback(self) -> int:
+        return warmup_steps(1 / self.params[0]) + 1
+
+    def compute(self, prices):
+        alpha = 1 / self.params[0]
+        changes = np.diff(prices)
+        gains = ema(np.maximum(changes, 0.0), alpha)
+        losses = ema(np.maximum(-changes, 0.0), alpha)
+        values = np.concatenate(([math.nan], self._rsi(gains, losses)))
+        averages = [float(gains[-1]), float(losses[-1])] if len(changes) else [math.nan, math.nan]
+        return values[None], _AverageState((alpha,), averages, float(prices[-1]), self)
+
+    @staticmethod
+    def _rsi(gains, losses):
+        total = gains + losses
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, 100 * gains / total, 50.0)
+
+    @staticmethod
+    def step(averages, alphas, price, last_price):
+        change = price - last_price
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if math.isnan(averages[0]):
+            return [gain, loss]
+        return [averages[0] + alphas[0] * (gain - averages[0]), averages[1] + alphas[0] * (loss - averages[1])]
+
+    @staticmethod
+    def values(averages):
+        total = averages[0] + averages[1]
+        return (100 * averages[0] / total if total > 0 else 50.0,)
+
+
+class ATR(Indicator):
+    """
+    Wilder's average true range. A tick path has no range within a step, so the true range is
+    the absolute change from the previous price.
+    """
+    kind = "atr"
+
+    @property
+    def lookback(self) -> int:
+        return warmup_steps(1 / self.params[0]) + 1
+
+    def compute(self, prices):
+        alpha = 1 / self.params[0]
+        ranges = ema(np.abs(np.diff(prices)), alpha)
+        values = np.concatenate(([math.nan], ranges))
+        averages = [float(ranges[-1]) if len(ranges) else math.nan]
+        return values[None], _AverageState((alpha,), averages, float(prices[-1]), self)
+
+    @staticmethod
+    def step(averages, alphas, price, last_price):
+        true_range = abs(price - last_price)
+        if math.isnan(averages[0]):
+            return [true_range]
+        return [averages[0] + alphas[0] * (true_range - averages[0])]
+
+    @staticmethod
+    def values(averages):
+        return (averages[0],)
+
+
+class MACD(Indicator):
+    """Fast EMA less slow EMA, its signal line (an EMA of it) and the histogram between them."""
+    kind = "macd"
+    outputs = ("macd", "signal", "histogram")
+
+    @property
+    def lookback(self) -> int:
+        # The signal line's warm-up starts once the slow average's is over.
+        return warmup_steps(2 / (self.params[1] + 1)) + warmup_steps(2 / (self.params[2] + 1))
+
+    def compute(self, prices):
+        alphas = tuple(2 / (period + 1) for period in self.params)
+        fast, slow = ema(prices, alphas[0]), ema(prices, alphas[1])
+        line = fast - slow
+        signal = ema(line, alphas[2])
+        averages = [float(fast[-1]), float(slow[-1]), float(signal[-1])]
+        return np.stack((line, signal, line - signal)), _AverageState(alphas, averages, float(prices[-1]), self)
+
+    @staticmethod
+    def step(averages, alphas, price, last_price):
+        fast = averages[0] + alphas[0] * (price - averages[0])
+        slow = averages[1] + alphas[1] * (price - averages[1])
+        signal = averages[2] + alphas[2] * (fast - slow - averages[2])
+        return [fast, slow, signal]
+
+    @staticmethod
+    def values(averages):
+        line = averages[0] - averages[1]
+        return line, averages[2], line - averages[2]
+
+
+_INDICATORS = {
+    indicator.kind: (indicator, n_params)
+    for indicator, n_params in ((SMA, 1), (EMA, 1), (RSI, 1), (ATR, 1), (MACD, 3), (BollingerBands, 2))
+}
+
+
+def parse_indicator(spec: str) -> Indicator:
+    """The indicator of a spec such as ``macd:12:26:9``; raises ValueError if it is not one."""
+    kind, *raw_params = spec.strip().lower().split(":")
+    if kind not in _INDICATORS:
+        raise ValueError(f"Unknown indicator '{kind}'; use one of {', '.join(_INDICATORS)}.")
+    indicator, n_params = _INDICATORS[kind]
+    if len(raw_params) != n_params:
+        raise ValueError(f"Indicator '{kind}' takes {n_params} parameter(s), as in '{kind}{':n' * n_params}'.")
+    try:
+        params = [float(param) for param in raw_params]
+    except ValueError:
+        raise ValueError(f"Parameters of '{spec}' must be numbers.")
+    # Every parameter but the width of Bollinger bands is a period.
+    periods = params[:1] if indicator is BollingerBands else params
+    if any(not period.is_integer() or not 1 <= period <= MAX_PERIOD for period in periods):
+        raise ValueError(f"Periods of '{spec}' must be whole numbers from 1 to {MAX_PERIOD}.")
+    if indicator is BollingerBands and not 0 < params[1] <= 10:
+        raise ValueError(f"The width of '{spec}' must be above 0 and at most 10.")
+    return indicator(*params)
+
+
+def json_values(values: np.ndarray) -> list[float | None]:
+    """Values as JSON allows them, with NaN as null."""
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+def indicators_lookback(indicators: list[Indicator]) -> int:
+    """Steps of history the indicators need before the first of their values."""
+    return max(indicator.lookback for indicator in indicators)
+
+
+def compute_indicators(
+    indicators: list[Indicator], series: Series, start: int, prices: np.ndarray
+) -> tuple[dict[str, np.ndarray], list[IndicatorState]]:
+    """
+    Values of the indicators at the steps from ``start``, which are ``prices``, by column, and
+    their states after them.
+    """
+    first = max(0, start - indicators_lookback(indicators))
+    history = series.prices(first, start) if first < start else np.empty(0)
+    return compute_indicators_over(indicators, np.concatenate((history, prices)), len(prices))
+
+
+def compute_indicators_over(
+    indicators: list[Indicator], prices: np.ndarray, n: int
+) -> tuple[dict[str, np.ndarray], list[IndicatorState]]:
+    """Like ``compute_indicators``, over prices that include their lookback, for the last ``n``."""
+    columns, states = {}, []
+    for indicator in indicators:
+        lookback = len(prices) - n
+        # Each from its own lookback, so that it doesn't depend on the other indicators asked for.
+        own = prices[max(0, lookback - indicator.lookback):]
+        values, state = indicator.compute(own)
+        columns.update(zip(indicator.columns, values[:, -n:] if n else values[:, :0]))
+        states.append(state)
+    return columns, states
+
+
+class IndicatorTrack:
+    """
+    The live states of some indicators on a series, and their values for the latest
+    ``capacity`` steps. Readers at any position within them share one update per tick.
+    """
+
+    def __init__(self, indicators: list[Indicator], series: Series, capacity: int):
+        self.indicators = indicators
+        self.series = series
+        self.columns = [column for indicator in indicators for column in indicator.columns]
+        self.capacity = capacity
+        # The next step to update the states with, and the values of the steps before it.
+        self.position: int | None = None
+        self._states: list[IndicatorState] = []
+        self._values: deque[tuple[float, ...]] = deque(maxlen=capacity)
+
+    def _seed(self, start: int, prices: np.ndarray) -> dict[str, list[float]]:
+        """Restarts from the history before ``start``, then through ``prices``; returns their values."""
+        columns, self._states = compute_indicators(self.indicators, self.series, start, prices)
+        values = {column: columns[column].tolist() for column in self.columns}
+        self._values.clear()
+        self._values.extend(zip(*values.values()))
+        self.position = start + len(prices)
+        return values
+
+    def values(self, start: int, prices: np.ndarray) -> dict[str, list[float]]:
+        """Values of the steps [start, start + len(prices)), which are ``prices``."""
+        stop = start + len(prices)
+        if (
+            self.position is None
+            or not self.position - len(self._values) <= start <= self.position
+            or stop - self.position > _INCREMENTAL_MAX_TICKS
+        ):
+            return self._seed(start, prices)
+        offset = self.position - len(self._values)
+        rows = [self._values[i] for i in range(start - offset, min(stop, self.position) - offset)]
+        new = [
+            tuple(value for state in self._states for value in state.update(price))
+            for price in prices[len(rows):].tolist()
+        ]
+        self._values.extend(new)
+        self.position = max(self.position, stop)
+        rows += new
+        return {column: [row[i] for row in rows] for i, column in enumerate(self.columns)}
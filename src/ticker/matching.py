@@ -0,0 +1,137 @@
+"""
+A limit order book matching by price-time priority.
+
+Prices are integer multiples of the tick size. Each side keeps a FIFO queue of orders per price
+level and a heap of its level prices, best first (bids are pushed negated). A level is pushed
+when it is created and popped once found empty at the top, so the heap may hold stale prices
+for a while but never misses a live one. Cancelling an order only zeroes what remains of it
+and forgets it; the queue drops it when it comes to the front, which keeps every operation
+O(log levels) at worst. Once cancelled orders outnumber resting ones, the queues are swept.
+
+An incoming order takes liquidity from the best opposite levels while its price crosses them,
+always at the resting order's price, and whatever remains rests at its own price unless it is
+a market or immediate-or-cancel order.
+"""
+import heapq
+import itertools
+from collections import deque
+from typing import NamedTuple
+
+BUY = 1
+SELL = -1
+
+
+class Order:
+    __slots__ = ("order_id", "side", "price", "quantity", "remaining", "owner")
+
+    def __init__(self, order_id: int, side: int, price: int | None, quantity: int, owner: int):
+        self.order_id = order_id
+        self.side = side
+        # None for market orders.
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity
+        self.owner = owner
+
+
+class Fill(NamedTuple):
+    maker: Order
+    taker: Order
+    price: int
+    quantity: int
+
+
+class OrderBook:
+    def __init__(self):
+        self._levels: dict[int, dict[int, deque[Order]]] = {BUY: {}, SELL: {}}
+        # Bid prices negated, so that both heaps pop the best price first.
+        self._heaps: dict[int, list[int]] = {BUY: [], SELL: []}
+        self._orders: dict[int, Order] = {}
+        # Cancelled orders still queued.
+        self._cancelled = 0
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        """Resting orders."""
+        return len(self._orders)
+
+    def get(self, order_id: int) -> Order | None:
+        return self._orders.get(order_id)
+
+    def best(self, side: int) -> int | None:
+        """The best price resting on a side."""
+        heap, levels = self._heaps[side], self._levels[side]
+        while heap:
+            price = -heap[0] * side
+            queue = levels.get(price)
+            if queue is not None:
+                while queue and not queue[0].remaining:
+                    queue.popleft()
+                    self._cancelled -= 1
+                if queue:
+                    return price
+                del levels[price]
+            heapq.heappop(heap)
+        return None
+
+    def submit(
+        self, side: int, quantity: int, price: int | None = None, owner: int = 0, rest: bool = True
+    ) -> tuple[Order, list[Fill]]:
+        """
+        Matches an order and rests what remains of it at ``price``, unless it is a market order
+        (no price) or ``rest`` is false. The order's ``remaining`` is what rests, or what was
+        left unfilled.
+        """
+        order = Order(next(self._ids), side, price, quantity, owner)
+        fills = []
+        opposite = -side
+        levels = self._levels[opposite]
+        while order.remaining:
+            best = self.best(opposite)
+            # A buy crosses asks at or below its price, a sell bids at or above it.
+            if best is None or (price is not None and (best - price) * side > 0):
+                break
+            queue = levels[best]
+            while order.remaining and queue:
+                maker = queue[0]
+                if not maker.remaining:
+                    queue.popleft()
+                    self._cancelled -= 1
+                    continue
+                traded = min(order.remaining, maker.remaining)
+                maker.remaining -= traded
+                order.remaining -= traded
+                fills.append(Fill(maker, order, best, traded))
+                if not maker.remaining:
+                    queue.popleft()
+                    del self._orders[maker.order_id]
+        if order.remaining and price is not None and rest:
+            own_levels = self._levels[side]
+            queue = own_levels.get(price)
+            if queue is None:
+                queue = own_levels[price] = deque()
+                heapq.heappush(self._heaps[side], -price * side)
+            queue.append(order)
+            self._orders[order.order_id] = order
+        return order, fills
+
+    def cancel(self, order_id: int) -> int | None:
+        """Withdraws a resting order; returns what remained of it, or None if it wasn't resting."""
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return None
+        remaining, order.remaining = order.remaining, 0
+        queue = self._levels[order.side][order.price]
+        if queue[-1] is order:
+            queue.pop()
+        else:
+            self._cancelled += 1
+            if self._cancelled > len(self._orders) + 1024:
+                self._sweep()
+        return remaining
+
+    def _sweep(self) -> None:
+        for levels in self._levels.values():
+            for price, queue in levels.items():
+                levels[price] = deque(order for order in queue if order.remaining)
+        self._cancelled = 0
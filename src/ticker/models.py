@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, DateTime, Index, Integer, String, Float, ForeignKey, JSON, Table
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -19,6 +19,39 @@ class UserDefinedTicker(Base):
     jump_intensity = Column(Float, nullable=False)
     jump_mean = Column(Float, nullable=False)
     jump_std_dev = Column(Float, nullable=False)
+    model = Column(String, nullable=False, default="MERTON", server_default="MERTON")
+    model_params = Column(JSON, nullable=True)
 
     # Relationships
     user = relationship("User", back_populates="tickers")
+
+
+class UserDefinedBasket(Base):
+    __tablename__ = "user_defined_baskets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    ticker_code = Column(String(4), unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    # Ticker code to weight, as given; normalised when the basket is resolved.
+    constituents = Column(JSON, nullable=False)
+
+    # Relationships
+    user = relationship("User", back_populates="baskets")
+
+
+# Persisted ticks of users' datasets. Written only by COPY, so a Core table rather than a
+# mapped class; range-partitioned by day on time, partitions being created as datasets need them.
+ticks = Table(
+    "ticks",
+    Base.metadata,
+    Column("user_id", UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("ticker_code", String(4), nullable=False),
+    Column("interval", Integer, nullable=False),
+    Column("time", DateTime(timezone=True), nullable=False),
+    Column("price", Float, nullable=False),
+    postgresql_partition_by="RANGE (time)",
+)
+# A dataset is written in one go, so its rows sit together and block ranges stay narrow.
+Index("ix_ticks_brin", ticks.c.ticker_code, ticks.c.time, postgresql_using="brin")
@@ -0,0 +1,284 @@
+"""
+Monte Carlo risk measures and European option prices for a ticker.
+
+Paths are simulated in chunks on the process pool and every chunk is reduced before it comes
+back: for VaR/ES only the largest losses a chunk could contribute to the overall tail, and
+for options running sums for a control-variate estimate. No more than one chunk of paths is
+held in memory per worker.
+
+Variance reduction:
+
+* antithetic pairs: every chunk uses each shock both as drawn and negated, and the pair's
+  average is one sample;
+* control variate: the discounted terminal price, whose expectation is the spot price under
+  the risk-neutral measure.
+
+Merton paths are sampled directly at each horizon from their closed-form law. Stateful models
+are stepped daily with their batched simulation, ``CHUNK_ELEMENTS`` path-days at a time.
+"""
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.ticker.generation import MertonParams, SECONDS_PER_YEAR, params_hash, series_key
+from src.ticker.schemas import MonteCarloResult, OptionQuote, RiskAtHorizon, TickerDetails, TickerModelEnum
+from src.ticker.stochastic_models import CHUNK_ELEMENTS, draw_shocks, get_model
+
+DAYS_PER_YEAR = SECONDS_PER_YEAR / 86400
+
+
+@dataclass
+class ChunkResult:
+    pairs: int
+    # Per horizon: the largest losses of the chunk, as a fraction of the spot price.
+    tail_losses: list[np.ndarray]
+    # Per expiry, arrays over strikes: sums over antithetic pairs for the control-variate fit.
+    sum_control: list[float] = field(default_factory=list)
+    sum_control_squares: list[float] = field(default_factory=list)
+    sum_calls: list[np.ndarray] = field(default_factory=list)
+    sum_call_squares: list[np.ndarray] = field(default_factory=list)
+    sum_call_control: list[np.ndarray] = field(default_factory=list)
+    sum_puts: list[np.ndarray] = field(default_factory=list)
+    sum_put_squares: list[np.ndarray] = field(default_factory=list)
+    sum_put_control: list[np.ndarray] = field(default_factory=list)
+
+
+def _merton_log_returns(params: MertonParams, years: float, rng: np.random.Generator, pairs: int) -> np.ndarray:
+    """Terminal log-returns of ``pairs`` antithetic pairs, shape (2, pairs)."""
+    z = rng.standard_normal(pairs)
+    jump_z = rng.standard_normal(pairs)
+    jump_counts = rng.poisson(params.jump_intensity * years, pairs)
+    drift = (params.drift - params.volatility ** 2 / 2 - params.jump_compensator) * years
+    jumps_mean = jump_counts * params.jump_mean
+    jumps_spread = np.sqrt(jump_counts) * params.jump_std_dev * jump_z
+    diffusion = params.volatility * math.sqrt(years) * z
+    return np.stack((
+        drift + diffusion + jumps_mean + jumps_spread,
+        drift - diffusion + jumps_mean - jumps_spread,
+    ))
+
+
+def _model_log_returns(
+    details: dict, params: MertonParams, horizon_days: list[int], rng: np.random.Generator, pairs: int
+) -> list[np.ndarray]:
+    """Log-returns at each horizon of ``pairs`` antithetic pairs of daily-stepped paths."""
+    model = get_model(TickerModelEnum(details["model"]), params, details["model_params"], 1 / DAYS_PER_YEAR)
+    state = model.initial_state(rng, pairs)
+    state = np.concatenate((state, state))
+    log_returns = np.zeros(2 * pairs)
+    results = []
+    day = 0
+    chunk_days = max(1, CHUNK_ELEMENTS // (2 * pairs))
+    for horizon in sorted(horizon_days):
+        while day < horizon:
+            days = min(chunk_days, horizon - day)
+            z, u = draw_shocks(model, rng, days, pairs)
+            increments, state = model.simulate(np.concatenate((z, -z), axis=1), np.concatenate((u, u), axis=1), state)
+            log_returns = log_returns + increments.sum(axis=0)
+            day += days
+        results.append(log_returns.reshape(2, pairs))
+    by_horizon = dict(zip(sorted(horizon_days), results))
+    return [by_horizon[horizon] for horizon in horizon_days]
+
+
+def simulate_chunk(
+    details: dict,
+    horizon_days: list[int],
+    strikes: list[float],
+    spot: float,
+    rate: float,
+    pairs: int,
+    tail_size: int,
+    seed: tuple[int, int],
+) -> ChunkResult:
+    """Simulates and reduces one chunk of antithetic pairs; runs on the process pool."""
+    ticker_details = TickerDetails(**details)
+    physical = MertonParams.from_details(ticker_details)
+    risk_neutral = MertonParams(**{**physical.__dict__, "drift": rate})
+    key, chunk = seed
+    rng = np.random.default_rng(np.random.SeedSequence(key, spawn_key=(chunk,)))
+
+    def log_returns(params: MertonParams) -> list[np.ndarray]:
+        if ticker_details.model == TickerModelEnum.MERTON:
+            return [_merton_log_returns(params, days / DAYS_PER_YEAR, rng, pairs) for days in horizon_days]
+        return _model_log_returns(details, params, horizon_days, rng, pairs)
+
+    result = ChunkResult(pairs=pairs, tail_losses=[])
+    for returns in log_returns(physical):
+        losses = -np.expm1(returns).ravel()
+        size = min(tail_size, len(losses))
+        result.tail_losses.append(np.partition(losses, len(losses) - size)[len(losses) - size:])
+
+    strikes_array = np.asarray(strikes)
+    for days, returns in zip(horizon_days, log_returns(risk_neutral)):
+        discount = math.exp(-rate * days / DAYS_PER_YEAR)
+        terminal = spot * np.exp(returns)
+        # Average each antithetic pair into one sample.
+        control = discount * terminal.mean(axis=0)
+        calls = discount * np.maximum(terminal[..., None] - strikes_array, 0).mean(axis=0)
+        puts = discount * np.maximum(strikes_array - terminal[..., None], 0).mean(axis=0)
+        result.sum_control.append(float(control.sum()))
+        result.sum_control_squares.append(float(np.dot(control, control)))
+        result.sum_calls.append(calls.sum(axis=0))
+        result.sum_call_squares.append((calls ** 2).sum(axis=0))
+        result.sum_call_control.append(control @ calls)
+        result.sum_puts.append(puts.sum(axis=0))
+        result.sum_put_squares.append((puts ** 2).sum(axis=0))
+        result.sum_put_control.append(control @ puts)
+    return result
+
+
+def steps_per_path(details: TickerDetails, horizon_days: list[int]) -> int:
+    """Draws per path: one per horizon for Merton paths, one per day up to the last horizon otherwise."""
+    if details.model == TickerModelEnum.MERTON:
+        return len(horizon_days)
+    return max(horizon_days)
+
+
+def tail_size(paths: int, confidence_levels: list[float]) -> int:
+    """Number of largest losses needed for VaR/ES at the lowest confidence level."""
+    return math.ceil((1 - min(confidence_levels)) * paths) + 1
+
+
+def risk_measures(tail_losses: np.ndarray, paths: int, confidence: float) -> tuple[float, float]:
+    """(VaR, ES) from the overall largest losses."""
+    worst = np.sort(tail_losses)[::-1]
+    count = max(1, math.ceil((1 - confidence) * paths))
+    return float(worst[count - 1]), float(worst[:count].mean())
+
+
+def control_variate_estimate(
+    n: int, spot: float, sum_x: float, sum_xx: float, sum_y: np.ndarray, sum_yy: np.ndarray, sum_xy: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Control-variate mean and standard error of ``y`` from running sums, with E[x] = spot."""
+    mean_x = sum_x / n
+    mean_y = sum_y / n
+    var_x = sum_xx / n - mean_x ** 2
+    var_y = sum_yy / n - mean_y ** 2
+    cov_xy = sum_xy / n - mean_x * mean_y
+    beta = cov_xy / var_x if var_x > 0 else np.zeros_like(mean_y)
+    estimate = mean_y - beta * (mean_x - spot)
+    residual_variance = np.maximum(var_y - beta * cov_xy, 0)
+    return estimate, np.sqrt(residual_variance / n)
+
+
+def chunk_seeds(details: TickerDetails, n_chunks: int) -> list[tuple[int, int]]:
+    key = series_key(params_hash(details), 0)
+    return [(key, chunk) for chunk in range(n_chunks)]
+
+
+_results_cache: "OrderedDict[tuple, MonteCarloResult]" = OrderedDict()
+_results_cache_lock = threading.Lock()
+_RESULTS_CACHE_SIZE = 256
+
+
+def run_montecarlo(
+    details: TickerDetails,
+    horizon_days: list[int],
+    confidence_levels: list[float],
+    strikes: list[float],
+    spot: float,
+    rate: float,
+    paths: int,
+    executor: Executor,
+    chunk_paths: int,
+) -> MonteCarloResult:
+    """
+    Splits the paths over the executor and reduces the chunk results.
+
+    Results are deterministic for given parameters and inputs, so they are cached by the
+    parameter hash: built-in tickers never change, and an edited user-defined ticker gets a
+    new hash.
+    """
+    cache_key = (
+        params_hash(details), tuple(horizon_days), tuple(confidence_levels), tuple(strikes), spot, rate, paths
+    )
+    with _results_cache_lock:
+        if cache_key in _results_cache:
+            _results_cache.move_to_end(cache_key)
+            return _results_cache[cache_key]
+
+    pairs_per_chunk = max(1, chunk_paths // 2)
+    n_chunks = math.ceil(paths / 2 / pairs_per_chunk)
+    total_pairs = n_chunks * pairs_per_chunk
+    total_paths = 2 * total_pairs
+    futures = [
+        executor.submit(
+            simulate_chunk,
+            details.model_dump(mode="json"),
+            horizon_days,
+            strikes,
+            spot,
+            rate / 100,
+            pairs_per_chunk,
+            tail_size(total_paths, confidence_levels),
+            seed,
+        )
+        for seed in chunk_seeds(details, n_chunks)
+    ]
+
+    tails = [[] for _ in horizon_days]
+    sums = None
+    for future in futures:
+        chunk = future.result()
+        for horizon_tails, chunk_tail in zip(tails, chunk.tail_losses):
+            horizon_tails.append(chunk_tail)
+        chunk_sums = [
+            chunk.sum_control, chunk.sum_control_squares,
+            chunk.sum_calls, chunk.sum_call_squares, chunk.sum_call_control,
+            chunk.sum_puts, chunk.sum_put_squares, chunk.sum_put_control,
+        ]
+        if sums is None:
+            sums = chunk_sums
+        else:
+            sums = [[a + b for a, b in zip(total, part)] for total, part in zip(sums, chunk_sums)]
+        del chunk
+
+    risk = []
+    for days, horizon_tails in zip(horizon_days, tails):
+        all_tails = np.concatenate(horizon_tails)
+        for confidence in confidence_levels:
+            value_at_risk, expected_shortfall = risk_measures(all_tails, total_paths, confidence)
+            risk.append(RiskAtHorizon(
+                horizon_days=days,
+                confidence=confidence,
+                value_at_risk=value_at_risk,
+                expected_shortfall=expected_shortfall,
+            ))
+
+    options = []
+    sum_x, sum_xx, sum_calls, sum_call_squares, sum_call_control, sum_puts, sum_put_squares, sum_put_control = sums
+    for i, days in enumerate(horizon_days):
+        calls, call_errors = control_variate_estimate(
+            total_pairs, spot, sum_x[i], sum_xx[i], sum_calls[i], sum_call_squares[i], sum_call_control[i]
+        )
+        puts, put_errors = control_variate_estimate(
+            total_pairs, spot, sum_x[i], sum_xx[i], sum_puts[i], sum_put_squares[i], sum_put_control[i]
+        )
+        for j, strike in enumerate(strikes):
+            options.append(OptionQuote(
+                expiry_days=days,
+                strike=strike,
+                call=float(calls[j]),
+                put=float(puts[j]),
+                call_std_error=float(call_errors[j]),
+                put_std_error=float(put_errors[j]),
+            ))
+
+    result = MonteCarloResult(
+        ticker_code=details.ticker_code,
+        paths=total_paths,
+        spot=spot,
+        rate=rate,
+        risk=risk,
+        options=options,
+    )
+    with _results_cache_lock:
+        _results_cache[cache_key] = result
+        while len(_results_cache) > _RESULTS_CACHE_SIZE:
+            _results_cache.popitem(last=False)
+    return result
@@ -0,0 +1,191 @@
+"""
+Closed-form European option chains under Merton's jump-diffusion.
+
+With jumps in the log price drawn from N(jump_mean, jump_std_dev²), an option is worth a
+Poisson mixture of Black-Scholes prices: given n jumps before expiry, the log return is normal
+with variance ``σ²T + nδ²`` and a drift shifted by n log-jumps. The mixture is truncated once
+the Poisson tail is negligible, for each expiry on its own. The terms every expiry keeps are
+evaluated at once for all strikes, as arrays of shape (terms, strikes) with each expiry's terms
+in a run, and each expiry's mixture is a sum over its run. So are the Greeks: the mixture
+weights do not depend on the spot, volatility or rate, so each Greek but theta is the same
+mixture of the terms' Greeks, and theta adds the derivative of the weights.
+
+Stateful models are priced with their Merton params, as an approximation.
+"""
+import math
+
+import numpy as np
+
+from src.ticker.generation import MertonParams
+from src.ticker.montecarlo import DAYS_PER_YEAR
+from src.ticker.schemas import OptionChain
+
+# Poisson terms beyond the mean, in standard deviations, to consider at most.
+_TAIL_DEVIATIONS = 12
+_MIN_TERMS = 16
+# Each expiry leaves out its least likely terms as long as they weigh this much in all; far
+# below the error of ``norm_cdf``.
+_MAX_DROPPED_WEIGHT = 1e-9
+# Terms times strikes evaluated at a time, so that the temporaries stay small and in cache.
+_CHUNK_ELEMENTS = 8192
+_SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(x * x * -0.5) / _SQRT_2PI
+
+
+def norm_cdf(x: np.ndarray, pdf: np.ndarray | None = None) -> np.ndarray:
+    """
+    Standard normal CDF, to an absolute error under 7.5e-8 (Abramowitz & Stegun 26.2.17).
+
+    Pass ``norm_pdf(x)`` if already known: it is the only transcendental function needed.
+    """
+    if pdf is None:
+        pdf = norm_pdf(x)
+    # In place, and without np.where, which are most of the cost on arrays of a whole chain.
+    t = np.abs(x)
+    t *= 0.2316419
+    t += 1
+    np.reciprocal(t, out=t)
+    upper_tail = t * 1.330274429
+    for coefficient in (-1.821255978, 1.781477937, -0.356563782, 0.319381530):
+        upper_tail += coefficient
+        upper_tail *= t
+    upper_tail *= pdf
+    # 1 - upper_tail for x >= 0, upper_tail itself otherwise.
+    cdf = upper_tail * -2
+    cdf += 1
+    cdf *= x >= 0
+    cdf += upper_tail
+    return cdf
+
+
+def _poisson_weights(means: np.ndarray) -> np.ndarray:
+    """Poisson probabilities of 0, 1, ... jumps for each mean, shape (terms, len(means))."""
+    largest = float(means.max())
+    terms = max(_MIN_TERMS, math.ceil(largest + _TAIL_DEVIATIONS * math.sqrt(largest)) + 1)
+    n = np.arange(terms, dtype=np.float64)[:, None]
+    log_factorials = np.concatenate(([0.0], np.cumsum(np.log(n[1:, 0]))))[:, None]
+    # With a mean of 0, every term but the first vanishes.
+    log_means = np.log(np.maximum(means, np.finfo(np.float64).tiny))
+    return np.exp(-means + n * log_means - log_factorials)
+
+
+def _mixed_terms(
+    spot: float,
+    strikes: np.ndarray,
+    std_dev: np.ndarray,
+    growth: np.ndarray,
+    discounts: np.ndarray,
+    weights: np.ndarray,
+    runs: np.ndarray,
+) -> np.ndarray:
+    """
+    N(d1), K e^{-growth} N(d2) and φ(d1)/σ of some terms at every strike, mixed over each run
+    of terms by each row of ``weights``: shape (rows, runs, 3, strikes).
+    """
+    d1 = (np.log(spot / strikes) + (growth + std_dev ** 2 / 2)[:, None]) / std_dev[:, None]
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1 = norm_cdf(d1, pdf_d1)
+    # The usual identity S φ(d1) = K e^{-growth} φ(d2) saves a second exponential.
+    discounted_strikes = discounts[:, None] * strikes
+    cdf_d2 = norm_cdf(d1 - std_dev[:, None], pdf_d1 * (spot / discounted_strikes))
+    terms = np.concatenate((cdf_d1, discounted_strikes * cdf_d2, pdf_d1 / std_dev[:, None]), axis=1)
+    mixed = np.stack([np.add.reduceat(row[:, None] * terms, runs) for row in weights])
+    return mixed.reshape(len(weights), len(runs), 3, len(strikes))
+
+
+def merton_chain(
+    params: MertonParams, spot: float, strikes: np.ndarray, expiry_days: np.ndarray, rate: float
+) -> dict[str, np.ndarray]:
+    """Prices and Greeks of calls and puts, each of shape (expiries, strikes)."""
+    years = np.asarray(expiry_days, dtype=np.float64) / DAYS_PER_YEAR
+    strikes = np.asarray(strikes, dtype=np.float64)
+    n_expiries, n_strikes = len(years), len(strikes)
+    volatility = params.volatility
+    # Expected log-jump plus half its variance: log(1 + k), k the mean relative jump.
+    log_jump_growth = params.jump_mean + params.jump_std_dev ** 2 / 2
+    net_rate = rate - params.jump_compensator
+    jump_rate = params.jump_intensity * math.exp(log_jump_growth)
+
+    # The terms worth evaluating, as (expiry, jumps) pairs in runs by expiry: short expiries
+    # need only a few. Every expiry keeps at least the terms around its mean.
+    all_weights = _poisson_weights(jump_rate * years)
+    ascending = np.sort(all_weights, axis=0)
+    cutoffs = np.where(np.cumsum(ascending, axis=0) <= _MAX_DROPPED_WEIGHT, ascending, 0).max(axis=0)
+    expiry, jumps = np.nonzero(all_weights.T > cutoffs[:, None])
+    runs = np.searchsorted(expiry, np.arange(n_expiries))
+    bounds = np.append(runs, len(jumps))
+    weights = all_weights[jumps, expiry]
+    pair_years = years[expiry]
+    # Derivatives of the weights by the time to expiry.
+    weights_by_years = weights * (jumps / pair_years - jump_rate)
+
+    # Per term: total variance and discounting exponent.
+    variance = np.maximum(volatility ** 2 * pair_years + jumps * params.jump_std_dev ** 2, 1e-300)
+    std_dev = np.sqrt(variance)
+    growth = net_rate * pair_years + jumps * log_jump_growth
+    discounts = np.exp(-growth)
+
+    # Everything else is a linear function of these three mixtures, evaluated for as many whole
+    # expiries at a time as fit in _CHUNK_ELEMENTS (at least one).
+    mixed = np.empty((2, n_expiries, 3, n_strikes))
+    max_terms = max(1, _CHUNK_ELEMENTS // n_strikes)
+    first = 0
+    while first < n_expiries:
+        stop = max(first + 1, int(np.searchsorted(bounds, bounds[first] + max_terms, side="right")) - 1)
+        terms = slice(bounds[first], bounds[stop])
+        mixed[:, first:stop] = _mixed_terms(
+            spot, strikes, std_dev[terms], growth[terms], discounts[terms],
+            np.stack((weights[terms], weights_by_years[terms])), runs[first:stop] - bounds[first],
+        )
+        first = stop
+    delta, strike_term, density = mixed[0, :, 0], mixed[0, :, 1], mixed[0, :, 2]
+    delta_by_years, strike_term_by_years = mixed[1, :, 0], mixed[1, :, 1]
+    total_weight = np.add.reduceat(weights, runs)[:, None]
+    total_weight_by_years = np.add.reduceat(weights_by_years, runs)[:, None]
+    mixed_discounts = np.add.reduceat(weights * discounts, runs)[:, None] * strikes
+    mixed_discounts_by_years = np.add.reduceat(weights_by_years * discounts, runs)[:, None] * strikes
+
+    calls = spot * delta - strike_term
+    puts = calls - spot * total_weight + mixed_discounts
+    # Derivatives of the terms by the time to expiry, through their variance and discounting.
+    call_time_value = spot * density * volatility ** 2 / 2 + strike_term * net_rate
+    put_time_value = call_time_value - mixed_discounts * net_rate
+    call_by_years = spot * delta_by_years - strike_term_by_years
+    put_by_years = call_by_years - spot * total_weight_by_years + mixed_discounts_by_years
+    return {
+        "calls": calls,
+        "puts": puts,
+        "call_delta": delta,
+        "put_delta": delta - total_weight,
+        "gamma": density / spot,
+        "vega": spot * density * volatility * years[:, None],
+        "call_theta": -(call_by_years + call_time_value),
+        "put_theta": -(put_by_years + put_time_value),
+        "call_rho": strike_term * years[:, None],
+        "put_rho": (strike_term - mixed_discounts) * years[:, None],
+    }
+
+
+def option_chain(
+    ticker_code: str,
+    params: MertonParams,
+    timestamp: int,
+    spot: float,
+    strikes: list[float],
+    expiry_days: list[int],
+    rate: float,
+) -> OptionChain:
+    """The chain of a ticker at one point of its path; ``rate`` is a fraction per year."""
+    chain = merton_chain(params, spot, np.asarray(strikes), np.asarray(expiry_days), rate)
+    return OptionChain(
+        ticker_code=ticker_code,
+        timestamp=timestamp,
+        spot=spot,
+        rate=rate * 100,
+        expiry_days=expiry_days,
+        strikes=strikes,
+        **{name: values.tolist() for name, values in chain.items()},
+    )
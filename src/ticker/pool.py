@@ -0,0 +1,22 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from src.config import settings
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Process pool shared by the CPU-heavy ticker endpoints, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a threaded server process is unsafe; workers import only what they need.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.GENERATION_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
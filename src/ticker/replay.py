@@ -0,0 +1,186 @@
+"""
+Live and accelerated-time streaming of a ticker's series.
+
+A ``ReplayClock`` maps wall-clock time onto series steps at a speed-up. Each frame emits every
+step that became due since the previous one: as raw ticks while they fit in the connection's
+budget, otherwise coalesced into OHLC bars or just the latest tick. A slow consumer therefore
+only makes frames coarser; it never makes the stream fall further behind the virtual clock.
+
+With an ``IndicatorTrack``, frames also carry the indicators' values at their points: at every
+tick, at each bar's close, or at the latest tick. The track is updated with every tick
+generated, whether it is sent or not.
+"""
+import asyncio
+import math
+import time
+from typing import Any, Callable
+
+import numpy as np
+from fastapi import WebSocket
+
+from src.ticker.generation import GeneratorState, Series, generate_page, step_timestamp
+from src.ticker.indicators import Indicator, IndicatorTrack, json_values
+from src.ticker.schemas import CoalesceModeEnum
+
+
+class ReplayClock:
+    """Virtual clock running ``speed`` times faster than the wall clock from ``start_step``."""
+
+    def __init__(self, start_step: int, interval: int, speed: float):
+        self.start_step = start_step
+        self.steps_per_second = speed / interval
+        self.started_at = time.monotonic()
+
+    def due_step(self) -> int:
+        """One past the last step whose time has been reached."""
+        elapsed = time.monotonic() - self.started_at
+        return self.start_step + math.floor(elapsed * self.steps_per_second) + 1
+
+
+def ticks_frame(timestamps: np.ndarray, prices: np.ndarray) -> dict[str, Any]:
+    return {
+        "type": "ticks",
+        "timestamps": timestamps.tolist(),
+        "prices": prices.tolist(),
+    }
+
+
+def ohlc_frame(timestamps: np.ndarray, prices: np.ndarray, max_bars: int) -> dict[str, Any]:
+    """Aggregates consecutive ticks into at most ``max_bars`` OHLC bars."""
+    bar_size = math.ceil(len(prices) / max_bars)
+    starts = np.arange(0, len(prices), bar_size)
+    ends = np.append(starts[1:], len(prices)) - 1
+    return {
+        "type": "ohlc",
+        "timestamps": timestamps[starts].tolist(),
+        "open": prices[starts].tolist(),
+        "high": np.maximum.reduceat(prices, starts).tolist(),
+        "low": np.minimum.reduceat(prices, starts).tolist(),
+        "close": prices[ends].tolist(),
+    }
+
+
+def latest_frame(timestamp: int, price: float, skipped: int) -> dict[str, Any]:
+    return {
+        "type": "latest",
+        "timestamp": timestamp,
+        "price": price,
+        "skipped": skipped,
+    }
+
+
+def with_indicators(frame: dict[str, Any], track: IndicatorTrack | None, start: int, prices: np.ndarray) -> dict[str, Any]:
+    """
+    Adds the values of the track's indicators at the frame's points to a frame of the ticks
+    [start, start + len(prices)); null where the path is too short for them.
+    """
+    if track is None:
+        return frame
+    values = track.values(start, prices)
+    if frame["type"] == "ticks":
+        points = slice(None)
+    elif frame["type"] == "ohlc":
+        # The closes of the bars of ohlc_frame.
+        bar_size = math.ceil(len(prices) / len(frame["close"]))
+        points = np.append(np.arange(bar_size, len(prices), bar_size), len(prices)) - 1
+    else:
+        points = [-1]
+    frame["indicators"] = {column: json_values(np.asarray(column_values)[points]) for column, column_values in values.items()}
+    return frame
+
+
+def next_frame(
+    series: Series,
+    state: GeneratorState,
+    due_step: int,
+    max_ticks: int,
+    coalesce: CoalesceModeEnum,
+    max_catch_up_steps: int,
+    track: IndicatorTrack | None = None,
+) -> tuple[dict[str, Any] | None, GeneratorState]:
+    """Builds the frame covering every step due since ``state``, within the tick budget."""
+    start = state.counter
+    n = due_step - start
+    if n <= 0:
+        return None, state
+
+    if n > max_catch_up_steps:
+        # Too far behind to be worth generating every step: seek straight to the clock.
+        state = series.state_at(due_step)
+        frame = latest_frame(state.timestamp, state.last_price, n - 1)
+        return with_indicators(frame, track, due_step - 1, np.array([state.last_price])), state
+
+    timestamps, prices, state = generate_page(series, start, n, state)
+    if n <= max_ticks:
+        frame = ticks_frame(timestamps, prices)
+    elif coalesce == CoalesceModeEnum.OHLC:
+        frame = ohlc_frame(timestamps, prices, max_ticks)
+    else:
+        frame = latest_frame(int(timestamps[-1]), float(prices[-1]), n - 1)
+    return with_indicators(frame, track, start, prices), state
+
+
+async def stream_series(
+    websocket: WebSocket,
+    series: Series,
+    start_step: int,
+    speed: float,
+    frame_interval: float,
+    max_ticks_per_second: int,
+    coalesce: CoalesceModeEnum,
+    max_catch_up_steps: int,
+    throttle: Callable[[int], float] | None = None,
+    indicators: list[Indicator] | None = None,
+) -> None:
+    """
+    Sends frames until the client disconnects.
+
+    ``throttle`` is given the number of steps generated for each frame and returns how long to
+    hold the frame back; steps due meanwhile are folded into the next frame.
+    """
+    clock = ReplayClock(start_step, series.interval, speed)
+    # Generation runs in a thread, so that a long seek or catch-up doesn't stall the event loop.
+    state = await asyncio.to_thread(series.state_at, start_step)
+    max_ticks = max(1, int(max_ticks_per_second * frame_interval))
+    # A replay has its own virtual clock, so nothing to share its indicators with, and its
+    # frames never look back: only the latest values need keeping.
+    track = IndicatorTrack(indicators, series, 1) if indicators else None
+    while True:
+        counter = state.counter
+        frame, state = await asyncio.to_thread(
+            next_frame, series, state, clock.due_step(), max_ticks, coalesce, max_catch_up_steps, track
+        )
+        if frame is not None:
+            if throttle is not None:
+                delay = throttle(min(state.counter - counter, max_catch_up_steps))
+                if delay:
+                    await asyncio.sleep(delay)
+            # Awaiting the send is the backpressure: whatever accrues meanwhile lands in the next frame.
+            await websocket.send_json(frame)
+        await asyncio.sleep(frame_interval)
+
+
+async def stream_snapshots(
+    websocket: WebSocket,
+    series: Series,
+    start_step: int,
+    speed: float,
+    frame_interval: float,
+    snapshot: Callable[[int, float], dict[str, Any]],
+) -> None:
+    """
+    Sends ``snapshot(timestamp, price)`` of the latest due step every frame, e.g. an option
+    chain alongside the underlying, until the client disconnects. Steps passed over between
+    frames are skipped rather than sent.
+    """
+    clock = ReplayClock(start_step, series.interval, speed)
+    last_step = None
+    while True:
+        step = clock.due_step() - 1
+        if step != last_step:
+            frame = await asyncio.to_thread(
+                lambda: snapshot(step_timestamp(step, series.interval), float(series.prices(step, step + 1)[0]))
+            )
+            await websocket.send_json(frame)
+            last_step = step
+        await asyncio.sleep(frame_interval)
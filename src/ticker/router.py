@@ -15,52 +15,861 @@
 #
 #
 
+import asyncio
+import contextlib
+import datetime
 import re
 import uuid
-from typing import Any, List
-from src.dependencies import SessionDep, CurrentUser, get_current_active_superuser
+from typing import Annotated, Any, List
+from src import http_caching, quotas
+from src.config import settings
+from src.query_budget import query_budget
+from src.dependencies import SessionDep, CurrentUser, CurrentWebSocketUser, RateLimitedUser, TokenPayloadDep, get_current_active_superuser, get_rate_limited_user, get_user_from_payload
 
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Response, status, Path, Query, UploadFile, WebSocket, WebSocketDisconnect, WebSocketException
 
-from src.ticker.utils import compute_user_defined_ticker_derived_details
-from src.ticker.built_in_tickers import get_built_in_category_context, compute_built_in_ticker_derived_details
-from src.ticker.schemas import TickerDetails, UserDefinedTickerCreate
+from src.ticker.built_in_tickers import get_built_in_parameter_table
+from src.ticker.calibration import CalibrationError, fit_merton, iter_csv_prices, iter_parquet_prices
+from src.ticker.downsampling import MAX_POINTS, MAX_WINDOW_STEPS, downsample, steps_to_generate
+from src.ticker.fanout import get_live_feeds, stream_live
+from src.ticker.indicators import Indicator, compute_indicators, indicators_lookback, json_values, parse_indicator
+from src.ticker.generation import BLOCK_STEPS, GENERATOR_VERSION, SERIES_EPOCH, SERIES_EPOCH_TIMESTAMP, INITIAL_PRICE, MAX_PAGE_STEPS, MertonParams, get_series, generate_page, live_step, params_hash, step_at, step_timestamp
+from src.ticker.montecarlo import run_montecarlo, steps_per_path
+from src.ticker.options import option_chain
+from src.ticker.pool import get_process_pool
+from src.ticker.replay import stream_series, stream_snapshots
+from src.ticker.sandbox import Sandbox, run_sandbox
+from src.ticker.screener import cached_universe_metrics, points_per_ticker, screen, universe_metrics
+from src.ticker.search import tokenize
+from src.ticker.stats import compute_stats
+from src.ticker.stochastic_models import validate_model_params
+from src.ticker.tick_store import ingest_ticks, partition_days, read_ticks
+from src.ticker.utils import encode_series_cursor, decode_series_cursor
+from src.ticker.schemas import BasketCreate, CoalesceModeEnum, MonteCarloResult, OptionChain, ScreenerResult, ScreenerSortEnum, TickDataset, TickDatasetPage, TickerDetails, TickerSeries, TickerStats, UserDefinedTickerCreate
+from src.user.schemas import Message
 from src.ticker import service
 
 
 router = APIRouter()
 
+TickerCodePath = Annotated[str, Path(
+    regex="^[A-Z]{3}[A-CX]$",
+    description="Ticker code must be 4 characters: first 3 uppercase letters and 4th letter A, B, or C, or X for indices and baskets"
+)]
+
+
+# Registered before "/{ticker_code}", which would otherwise match "search" and "screen".
+@router.get(
+    "/search",
+    response_model=List[TickerDetails],
+)
+def search_tickers(
+    *,
+    session: SessionDep,
+    current_user: RateLimitedUser,
+    q: str | None = Query(None, description="Words to look for in the name, description and sector; each may be a prefix"),
+    code: str | None = Query(None, pattern="^[A-Z]{0,4}$", description="Prefix of the ticker code"),
+    min_drift: float | None = None,
+    max_drift: float | None = None,
+    min_volatility: float | None = None,
+    max_volatility: float | None = None,
+    min_jump_intensity: float | None = None,
+    max_jump_intensity: float | None = None,
+    min_jump_mean: float | None = None,
+    max_jump_mean: float | None = None,
+    min_jump_std_dev: float | None = None,
+    max_jump_std_dev: float | None = None,
+    limit: int = Query(50, ge=1, le=500),
+) -> Any:
+    """Searches the built-in tickers and the user's own by code, words and params."""
+    bounds = {
+        "drift": (min_drift, max_drift),
+        "volatility": (min_volatility, max_volatility),
+        "jump_intensity": (min_jump_intensity, max_jump_intensity),
+        "jump_mean": (min_jump_mean, max_jump_mean),
+        "jump_std_dev": (min_jump_std_dev, max_jump_std_dev),
+    }
+    ranges = {name: bound for name, bound in bounds.items() if bound != (None, None)}
+    return service.search(
+        session=session,
+        user_id=current_user.id,
+        code_prefix=code,
+        terms=tokenize(q),
+        ranges=ranges,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/screen",
+    response_model=ScreenerResult,
+)
+def screen_tickers(
+    *,
+    current_user: RateLimitedUser,
+    as_of: datetime.datetime | None = Query(None, description="Time of the window's last point; defaults to now"),
+    interval: int = Query(86400, ge=1, le=86400, description="Seconds between points"),
+    window: int = Query(20, ge=1, le=settings.SCREENER_MAX_WINDOW_STEPS, description="Returns in the window, so one more point"),
+    min_return: float | None = Query(None, description="Lowest return over the window, as a fraction"),
+    max_return: float | None = Query(None, description="Highest return over the window, as a fraction"),
+    min_volatility: float | None = Query(None, description="Lowest annualised realized volatility over the window, in percent"),
+    max_volatility: float | None = Query(None, description="Highest annualised realized volatility over the window, in percent"),
+    categories: List[str] | None = Query(None, description="First letters of the ticker codes to keep"),
+    markets: List[str] | None = Query(None, description="Last letters of the ticker codes to keep"),
+    sort_by: ScreenerSortEnum = Query(ScreenerSortEnum.WINDOW_RETURN),
+    descending: bool = True,
+    limit: int = Query(100, ge=1, le=500),
+) -> Any:
+    """Screens every built-in ticker on its return and realized volatility over a recent window."""
+    if as_of is None:
+        as_of_step = live_step(interval) - 1
+    else:
+        if as_of.tzinfo is None:
+            as_of = as_of.replace(tzinfo=datetime.UTC)
+        _check_series_time(as_of)
+        as_of_step = (int(as_of.timestamp()) - SERIES_EPOCH_TIMESTAMP) // interval
+    if as_of_step - window < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The window cannot start before {SERIES_EPOCH.isoformat()}."
+        )
+
+    metrics = cached_universe_metrics(interval, as_of_step, window)
+    if metrics is None:
+        chunk_tickers = settings.SCREENER_CHUNK_TICKERS
+        points = points_per_ticker(as_of_step, window)
+        cost = chunk_tickers * points
+        quotas.check_points(current_user, len(get_built_in_parameter_table()) * points)
+        metrics = universe_metrics(
+            interval,
+            as_of_step,
+            window,
+            executor=quotas.FairExecutor(get_process_pool(), quotas.generation_scheduler, current_user.id, cost=cost),
+            chunk_tickers=chunk_tickers,
+        )
+    matches, results = screen(
+        metrics,
+        min_return=min_return,
+        max_return=max_return,
+        min_volatility=min_volatility,
+        max_volatility=max_volatility,
+        categories=categories,
+        markets=markets,
+        sort_by=sort_by,
+        descending=descending,
+        limit=limit,
+    )
+    return ScreenerResult(
+        interval=interval,
+        window=window,
+        as_of=int(step_timestamp(as_of_step, interval)),
+        matches=matches,
+        results=results,
+    )
+
 
 @router.get(
     "/{ticker_code}",
+    # The user, then the ticker if it is one of theirs.
+    dependencies=[Depends(query_budget(2))],
     response_model=TickerDetails
 )
 def get_ticker_details(
     *,
     session: SessionDep,
-    current_user: CurrentUser,
-    ticker_code: str = Path(
-        ...,
-        regex="^[A-Z]{3}[A-C]$",
-        description="Ticker code must be 4 characters: first 3 uppercase letters and 4th letter A, B, or C"
-    )
+    token_data: TokenPayloadDep,
+    ticker_code: TickerCodePath,
+    response: Response,
+    if_none_match: str | None = Header(None),
 ) -> Any:
     """Given a default or custom ticker, retrieves details."""
-    category_key = ticker_code[0]
-    built_in_category_context = get_built_in_category_context(category_key)
+    # Built-in details never change, so a client's copy is revalidated without the database.
+    built_in_details = service.get_built_in_details(ticker_code)
+    if built_in_details is not None:
+        etag = http_caching.weak_etag(ticker_code, params_hash(built_in_details), GENERATOR_VERSION)
+        if http_caching.etag_matches(if_none_match, etag):
+            return http_caching.not_modified(etag, http_caching.IMMUTABLE)
 
-    if built_in_category_context is not None:
-        return compute_built_in_ticker_derived_details(ticker_code, built_in_category_context)
+    current_user = get_user_from_payload(session=session, token_data=token_data)
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    if not ticker_details:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticker not found."
+        )
 
-    user_defined_ticker = service.get_by_user(session=session, ticker_code=ticker_code, user_id=current_user.id)
-    if not user_defined_ticker:
+    if built_in_details is not None:
+        cache_control = http_caching.IMMUTABLE
+    else:
+        # Any edit of the row changes the details, and so the ETag.
+        etag = http_caching.weak_etag(ticker_details.model_dump_json())
+        cache_control = http_caching.PRIVATE
+        if http_caching.etag_matches(if_none_match, etag):
+            return http_caching.not_modified(etag, cache_control)
+    http_caching.set_cache_headers(response, etag, cache_control)
+    return ticker_details
+
+
+def _check_series_time(moment: datetime.datetime) -> None:
+    """Raises 400 unless series have points at ``moment``: from their epoch to the horizon past now."""
+    if moment < SERIES_EPOCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Series cannot start before {SERIES_EPOCH.isoformat()}."
+        )
+    if moment > datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=settings.SERIES_HORIZON_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Series only go up to {settings.SERIES_HORIZON_DAYS} days from now."
+        )
+
+
+IndicatorsQuery = Query(
+    None, description="Technical indicators to add, e.g. sma:20, ema:12, rsi:14, macd:12:26:9, bb:20:2 or atr:14"
+)
+
+
+def _parse_indicators(specs: List[str] | None) -> List[Indicator]:
+    """Raises 400 unless every spec is an indicator."""
+    if not specs:
+        return []
+    if len(specs) > settings.INDICATORS_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.INDICATORS_MAX} indicators can be asked for."
+        )
+    try:
+        return [parse_indicator(spec) for spec in specs]
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/{ticker_code}/series",
+    dependencies=[Depends(query_budget(2))],
+    response_model=TickerSeries
+)
+def get_ticker_series(
+    *,
+    session: SessionDep,
+    token_data: TokenPayloadDep,
+    ticker_code: TickerCodePath,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    start: datetime.datetime = Query(SERIES_EPOCH, description="Time of the first point; ignored when a cursor is given"),
+    interval: int = Query(60, ge=1, le=86400, description="Seconds between points; ignored when a cursor is given"),
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_STEPS),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    max_points: int | None = Query(None, ge=2, le=MAX_POINTS, description="Downsample the window to at most this many points, keeping the low and high of each bucket"),
+    end: datetime.datetime | None = Query(None, description="End (exclusive) of a downsampled window; defaults to limit points after the start"),
+    indicators: List[str] | None = IndicatorsQuery,
+) -> Any:
+    """Retrieves one page of a ticker's price series, along with a cursor to the next page."""
+    indicator_list = _parse_indicators(indicators)
+    if indicator_list and max_points is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indicators are not supported with max_points."
+        )
+    # A page is a pure function of the parameters and the window. For built-in tickers, an
+    # unchanged page is answered before looking the user up.
+    current_user = None
+    ticker_details = service.get_built_in_details(ticker_code)
+    if ticker_details is None:
+        current_user = get_rate_limited_user(get_user_from_payload(session=session, token_data=token_data))
+        ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    if not ticker_details:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Ticker not found."
         )
 
-    return compute_user_defined_ticker_derived_details(ticker_code, user_defined_ticker)
+    state = None
+    if cursor is not None:
+        state = decode_series_cursor(cursor)
+        if state is None or state.ticker_code != ticker_code:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor."
+            )
+        interval = state.interval
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.UTC)
+    if state is None:
+        _check_series_time(start)
 
+    series = get_series(ticker_details, interval)
+    if state is not None and (state.params_hash != series.params_hash or state.key != series.key):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ticker parameters changed since the cursor was issued."
+        )
+
+    start_step = state.counter if state is not None else step_at(start, interval)
+    stop_step = start_step + limit
+    if end is not None:
+        if max_points is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="An end time is only supported with max_points."
+            )
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=datetime.UTC)
+        stop_step = step_at(end, interval)
+        if not 0 < stop_step - start_step <= MAX_WINDOW_STEPS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The window must hold between 1 and {MAX_WINDOW_STEPS} points."
+            )
+    etag = http_caching.weak_etag(
+        ticker_code, series.params_hash, GENERATOR_VERSION, interval, start_step, stop_step, max_points,
+        state.last_price if state is not None else None, *(indicator.spec for indicator in indicator_list),
+    )
+    cache_control = http_caching.IMMUTABLE if current_user is None else http_caching.PRIVATE
+    if http_caching.etag_matches(if_none_match, etag):
+        return http_caching.not_modified(etag, cache_control)
+
+    if current_user is None:
+        current_user = get_rate_limited_user(get_user_from_payload(session=session, token_data=token_data))
+    # Every point of an index or basket takes a point of each constituent.
+    points_per_step = len(ticker_details.constituents or ()) or 1
+    indicator_values = None
+    if max_points is None:
+        # Indicators also take the points of the history before the page that they depend on.
+        lookback = min(indicators_lookback(indicator_list), start_step) if indicator_list else 0
+        cost = (limit + lookback) * points_per_step
+        quotas.check_points(current_user, cost)
+        with quotas.generation_scheduler.slot(current_user.id, cost):
+            timestamps, prices, next_state = generate_page(series, start_step, limit, state)
+            if indicator_list:
+                columns, _ = compute_indicators(indicator_list, series, start_step, prices)
+                indicator_values = {column: json_values(values) for column, values in columns.items()}
+    else:
+        # Mostly served from the pyramid, which costs about one point per block once built;
+        # the chunks it still lacks cost every step they cover.
+        generated = steps_to_generate(series, start_step, stop_step, max_points)
+        cost = (max_points + (stop_step - start_step) // BLOCK_STEPS + generated) * points_per_step
+        quotas.check_points(current_user, cost)
+        with quotas.generation_scheduler.slot(current_user.id, cost):
+            steps, prices = downsample(series, start_step, stop_step, max_points)
+            next_state = series.state_at(stop_step)
+        timestamps = step_timestamp(steps, interval)
+    http_caching.set_cache_headers(response, etag, cache_control)
+    return TickerSeries(
+        ticker_code=ticker_code,
+        interval=interval,
+        timestamps=timestamps.tolist(),
+        prices=prices.tolist(),
+        next_cursor=encode_series_cursor(next_state),
+        indicators=indicator_values,
+    )
+
+
+
+@router.get(
+    "/{ticker_code}/montecarlo",
+    response_model=MonteCarloResult
+)
+def get_ticker_montecarlo(
+    *,
+    session: SessionDep,
+    current_user: RateLimitedUser,
+    ticker_code: TickerCodePath,
+    horizons: List[int] = Query([1, 10, 30], description="Horizons in days for VaR/ES, also used as option expiries"),
+    confidence_levels: List[float] = Query([0.95, 0.99]),
+    strikes: List[float] | None = Query(None, description="Defaults to 80% to 120% of spot in 5% steps"),
+    spot: float = Query(INITIAL_PRICE, gt=0),
+    rate: float = Query(0.0, description="Annual risk-free rate in percent, for option pricing"),
+    paths: int = Query(100_000, ge=2, le=settings.MONTE_CARLO_MAX_PATHS),
+) -> Any:
+    """Simulates a ticker's paths to estimate VaR/ES at several horizons and European option prices."""
+    if not horizons or any(not 1 <= days <= settings.MONTE_CARLO_MAX_HORIZON_DAYS for days in horizons):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Horizons must be between 1 and {settings.MONTE_CARLO_MAX_HORIZON_DAYS} days."
+        )
+    if not confidence_levels or any(not 0 < level < 1 for level in confidence_levels):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Confidence levels must be between 0 and 1."
+        )
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    if not ticker_details:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticker not found."
+        )
+
+    if ticker_details.constituents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Monte Carlo simulation is not supported for indices and baskets."
+        )
+
+    steps = steps_per_path(ticker_details, horizons)
+    quotas.check_points(current_user, paths * steps)
+    if strikes is None:
+        strikes = [round(spot * moneyness / 100, 4) for moneyness in range(80, 125, 5)]
+    return run_montecarlo(
+        ticker_details,
+        horizon_days=horizons,
+        confidence_levels=confidence_levels,
+        strikes=strikes,
+        spot=spot,
+        rate=rate,
+        paths=paths,
+        executor=quotas.FairExecutor(
+            get_process_pool(),
+            quotas.generation_scheduler,
+            current_user.id,
+            cost=settings.MONTE_CARLO_CHUNK_PATHS * steps,
+        ),
+        chunk_paths=settings.MONTE_CARLO_CHUNK_PATHS,
+    )
+
+
+DEFAULT_STATS_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+@router.get(
+    "/{ticker_code}/stats",
+    response_model=TickerStats
+)
+def get_ticker_stats(
+    *,
+    session: SessionDep,
+    current_user: RateLimitedUser,
+    ticker_code: TickerCodePath,
+    end: datetime.datetime = Query(description="End (exclusive) of the window"),
+    start: datetime.datetime = Query(SERIES_EPOCH, description="Time of the first point"),
+    interval: int = Query(60, ge=1, le=86400, description="Seconds between points"),
+    quantiles: List[float] = Query(DEFAULT_STATS_QUANTILES, description="Levels of the log-return quantiles to estimate"),
+    jump_threshold: float = Query(5.0, gt=0, description="Log-returns further than this many standard deviations from the median count as jumps"),
+) -> Any:
+    """Summary statistics of a ticker's prices over a window of any length, without its points."""
+    if any(not 0 <= level <= 1 for level in quantiles):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Quantile levels must be between 0 and 1."
+        )
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.UTC)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=datetime.UTC)
+    _check_series_time(start)
+    start_step, stop_step = step_at(start, interval), step_at(end, interval)
+    if not 2 <= stop_step - start_step <= settings.STATS_MAX_WINDOW_STEPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The window must hold between 2 and {settings.STATS_MAX_WINDOW_STEPS} points."
+        )
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    if not ticker_details:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticker not found."
+        )
+
+    points = (stop_step - start_step) * (len(ticker_details.constituents or ()) or 1)
+    quotas.check_points(current_user, points)
+    if stop_step - start_step <= settings.STATS_CHUNK_STEPS:
+        # A single chunk isn't worth a trip to the process pool.
+        executor = None
+        slot = quotas.generation_scheduler.slot(current_user.id, points)
+    else:
+        executor = quotas.FairExecutor(
+            get_process_pool(),
+            quotas.generation_scheduler,
+            current_user.id,
+            cost=settings.STATS_CHUNK_STEPS,
+        )
+        slot = contextlib.nullcontext()
+    with slot:
+        return compute_stats(
+            ticker_details,
+            interval=interval,
+            start_step=start_step,
+            stop_step=stop_step,
+            quantile_levels=quantiles,
+            jump_threshold=jump_threshold,
+            executor=executor,
+            chunk_steps=settings.STATS_CHUNK_STEPS,
+            max_in_flight=settings.STATS_MAX_CHUNKS_IN_FLIGHT,
+        )
+
+
+def _require_tick_store(session: SessionDep) -> None:
+    if session.get_bind().dialect.name != "postgresql":
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Tick datasets need a PostgreSQL database."
+        )
+
+
+@router.post(
+    "/{ticker_code}/dataset",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TickDataset,
+)
+def create_tick_dataset(
+    *,
+    session: SessionDep,
+    current_user: RateLimitedUser,
+    ticker_code: TickerCodePath,
+    end: datetime.datetime = Query(description="End (exclusive) of the window"),
+    start: datetime.datetime = Query(SERIES_EPOCH, description="Time of the first tick"),
+    interval: int = Query(60, ge=1, le=86400, description="Seconds between ticks"),
+) -> Any:
+    """Persists a ticker's ticks over a window as one of the user's datasets, replacing those already there."""
+    _require_tick_store(session)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.UTC)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=datetime.UTC)
+    _check_series_time(start)
+    start_step, stop_step = step_at(start, interval), step_at(end, interval)
+    if not 0 < stop_step - start_step <= settings.TICK_DATASET_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The window must hold between 1 and {settings.TICK_DATASET_MAX_ROWS} ticks."
+        )
+    first_timestamp = int(step_timestamp(start_step, interval))
+    last_timestamp = int(step_timestamp(stop_step - 1, interval))
+    if len(partition_days(first_timestamp, last_timestamp)) > settings.TICK_DATASET_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The window must span at most {settings.TICK_DATASET_MAX_DAYS} days."
+        )
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    if not ticker_details:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticker not found."
+        )
+
+    points = (stop_step - start_step) * (len(ticker_details.constituents or ()) or 1)
+    quotas.check_points(current_user, points)
+    with quotas.generation_scheduler.slot(current_user.id, points):
+        rows = ingest_ticks(
+            session,
+            current_user.id,
+            ticker_code,
+            get_series(ticker_details, interval),
+            start_step=start_step,
+            stop_step=stop_step,
+            chunk_steps=settings.TICK_DATASET_CHUNK_ROWS,
+        )
+    return TickDataset(
+        ticker_code=ticker_code,
+        interval=interval,
+        start=first_timestamp,
+        end=last_timestamp,
+        rows=rows,
+    )
+
+
+@router.get(
+    "/{ticker_code}/dataset",
+    dependencies=[Depends(query_budget(2))],
+    response_model=TickDatasetPage,
+)
+def get_tick_dataset(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    ticker_code: TickerCodePath,
+    start: datetime.datetime = Query(SERIES_EPOCH, description="Time of the first tick"),
+    end: datetime.datetime | None = Query(None, description="End (exclusive) of the window; defaults to limit ticks after the start"),
+    interval: int = Query(60, ge=1, le=86400, description="Seconds between ticks"),
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_STEPS),
+) -> Any:
+    """Reads back one page of a persisted dataset; the next page starts one interval after the last tick."""
+    _require_tick_store(session)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.UTC)
+    if end is None:
+        end = start + datetime.timedelta(seconds=limit * interval)
+    elif end.tzinfo is None:
+        end = end.replace(tzinfo=datetime.UTC)
+    timestamps, prices = read_ticks(session, current_user.id, ticker_code, interval, start, end, limit)
+    return TickDatasetPage(
+        ticker_code=ticker_code,
+        interval=interval,
+        timestamps=timestamps.tolist(),
+        prices=prices.tolist(),
+    )
+
+
+DEFAULT_OPTION_EXPIRIES = [7, 14, 30, 60, 90, 180, 365]
+
+
+def _option_chain_inputs(
+    ticker_details: TickerDetails | None, expiries: List[int], strikes: List[float] | None
+) -> None:
+    """Raises 400 (or 404) unless a chain can be priced for the ticker with these inputs."""
+    if not ticker_details:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticker not found.")
+    if ticker_details.constituents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Option chains are not supported for indices and baskets."
+        )
+    if not 0 < len(expiries) <= settings.OPTION_CHAIN_MAX_EXPIRIES or any(days < 1 for days in expiries):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Give between 1 and {settings.OPTION_CHAIN_MAX_EXPIRIES} expiries of at least 1 day."
+        )
+    if strikes is not None and (
+        not 0 < len(strikes) <= settings.OPTION_CHAIN_MAX_STRIKES or any(strike <= 0 for strike in strikes)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Give between 1 and {settings.OPTION_CHAIN_MAX_STRIKES} positive strikes."
+        )
+
+
+def _default_strikes(spot: float) -> List[float]:
+    """50% to 150% of spot in 5% steps."""
+    return [round(spot * moneyness / 100, 4) for moneyness in range(50, 155, 5)]
+
+
+@router.get(
+    "/{ticker_code}/options",
+    response_model=OptionChain
+)
+def get_ticker_option_chain(
+    *,
+    session: SessionDep,
+    current_user: RateLimitedUser,
+    ticker_code: TickerCodePath,
+    at: datetime.datetime | None = Query(None, description="Point of the path to price at; defaults to now"),
+    expiries: List[int] = Query(DEFAULT_OPTION_EXPIRIES, description="Days to expiry"),
+    strikes: List[float] | None = Query(None, description="Defaults to 50% to 150% of spot in 5% steps"),
+    rate: float = Query(0.0, description="Annual risk-free rate in percent"),
+) -> Any:
+    """Prices European calls and puts with their Greeks from the ticker's closed-form law."""
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    _option_chain_inputs(ticker_details, expiries, strikes)
+    if at is None:
+        at = datetime.datetime.now(datetime.UTC)
+    elif at.tzinfo is None:
+        at = at.replace(tzinfo=datetime.UTC)
+    _check_series_time(at)
+
+    # The last tick at or before ``at`` on the one-second path, the one live streams show.
+    series = get_series(ticker_details, 1)
+    step = int(at.timestamp()) - SERIES_EPOCH_TIMESTAMP
+    spot = float(series.prices(step, step + 1)[0])
+    strikes = strikes or _default_strikes(spot)
+    cost = len(strikes) * len(expiries)
+    quotas.check_points(current_user, cost)
+    with quotas.generation_scheduler.slot(current_user.id, cost):
+        return option_chain(
+            ticker_code,
+            MertonParams.from_details(ticker_details),
+            timestamp=step_timestamp(step, 1),
+            spot=spot,
+            strikes=strikes,
+            expiry_days=expiries,
+            rate=rate / 100,
+        )
+
+
+@router.websocket("/{ticker_code}/options/stream")
+async def stream_ticker_option_chain(
+    *,
+    websocket: WebSocket,
+    session: SessionDep,
+    current_user: CurrentWebSocketUser,
+    ticker_code: TickerCodePath,
+    start: datetime.datetime | None = Query(None, description="Virtual time to replay from; defaults to now"),
+    speed: float = Query(1.0, ge=1.0, le=10_000.0, description="Virtual seconds per wall-clock second"),
+    expiries: List[int] = Query(DEFAULT_OPTION_EXPIRIES, description="Days to expiry, rolling with the clock"),
+    strikes: List[float] | None = Query(None, description="Defaults to 50% to 150% of the starting spot in 5% steps"),
+    rate: float = Query(0.0, description="Annual risk-free rate in percent"),
+) -> None:
+    """Streams the ticker's option chain, repriced at each frame's latest tick."""
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    # The stream can last for hours; don't hold a pooled connection for all of it.
+    session.close()
+    try:
+        _option_chain_inputs(ticker_details, expiries, strikes)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+
+    if start is None:
+        start = datetime.datetime.now(datetime.UTC)
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.UTC)
+    try:
+        _check_series_time(start)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+
+    try:
+        quotas.check_request(current_user)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason=exc.detail)
+
+    series = get_series(ticker_details, 1)
+    start_step = step_at(start, 1)
+    params = MertonParams.from_details(ticker_details)
+    if strikes is None:
+        spot = await asyncio.to_thread(series.prices, start_step, start_step + 1)
+        strikes = _default_strikes(float(spot[0]))
+
+    def snapshot(timestamp: int, spot: float) -> dict[str, Any]:
+        chain = option_chain(ticker_code, params, timestamp, spot, strikes, expiries, rate / 100)
+        return {"type": "options", **chain.model_dump()}
+
+    await websocket.accept()
+    try:
+        await stream_snapshots(
+            websocket,
+            series,
+            start_step=start_step,
+            speed=speed,
+            frame_interval=settings.STREAM_FRAME_INTERVAL_MS / 1000,
+            snapshot=snapshot,
+        )
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/{ticker_code}/stream")
+async def stream_ticker(
+    *,
+    websocket: WebSocket,
+    session: SessionDep,
+    current_user: CurrentWebSocketUser,
+    ticker_code: TickerCodePath,
+    start: datetime.datetime | None = Query(None, description="Virtual time to replay from; defaults to now"),
+    speed: float = Query(1.0, ge=1.0, le=10_000.0, description="Virtual seconds per wall-clock second"),
+    interval: int = Query(1, ge=1, le=86400),
+    max_ticks_per_second: int = Query(settings.STREAM_MAX_TICKS_PER_SECOND, ge=1, le=settings.STREAM_MAX_TICKS_PER_SECOND),
+    coalesce: CoalesceModeEnum = Query(CoalesceModeEnum.OHLC, description="How to summarise ticks beyond the budget"),
+    indicators: List[str] | None = IndicatorsQuery,
+) -> None:
+    """Streams a ticker live, or replays it from a past time at an accelerated speed."""
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    # The stream can last for hours; don't hold a pooled connection for all of it.
+    session.close()
+    if not ticker_details:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Ticker not found.")
+    try:
+        indicator_list = _parse_indicators(indicators)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+
+    live = start is None and speed == 1
+    if start is None:
+        start = datetime.datetime.now(datetime.UTC)
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.UTC)
+    try:
+        _check_series_time(start)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+
+    try:
+        quotas.check_request(current_user)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason=exc.detail)
+
+    points_per_step = len(ticker_details.constituents or ()) or 1
+    throttle = lambda points: quotas.points_wait(current_user, points * points_per_step)
+    series = get_series(ticker_details, interval)
+    live_feeds = get_live_feeds()
+    await websocket.accept()
+    try:
+        if live and live_feeds is not None:
+            # Every live viewer of the series on this host reads the same ticks, generated once.
+            await stream_live(
+                websocket,
+                live_feeds,
+                series,
+                frame_interval=settings.STREAM_FRAME_INTERVAL_MS / 1000,
+                max_ticks_per_second=max_ticks_per_second,
+                coalesce=coalesce,
+                throttle=throttle,
+                indicators=indicator_list,
+            )
+        else:
+            await stream_series(
+                websocket,
+                series,
+                start_step=step_at(start, interval),
+                speed=speed,
+                frame_interval=settings.STREAM_FRAME_INTERVAL_MS / 1000,
+                max_ticks_per_second=max_ticks_per_second,
+                coalesce=coalesce,
+                max_catch_up_steps=settings.STREAM_MAX_CATCH_UP_STEPS,
+                throttle=throttle,
+                indicators=indicator_list,
+            )
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/{ticker_code}/sandbox")
+async def trade_ticker_sandbox(
+    *,
+    websocket: WebSocket,
+    session: SessionDep,
+    current_user: CurrentWebSocketUser,
+    ticker_code: TickerCodePath,
+    start: datetime.datetime | None = Query(None, description="Virtual time to trade from; defaults to now"),
+    speed: float = Query(1.0, ge=1.0, le=10_000.0, description="Virtual seconds per wall-clock second"),
+    interval: int = Query(1, ge=1, le=86400),
+    tick_size: float = Query(0.01, gt=0, description="Price increment of orders and quotes"),
+    spread_bps: float = Query(10.0, ge=0, le=1000, description="Spread of the synthetic market's touch, in basis points"),
+    depth: int = Query(100, ge=1, le=1_000_000, description="Quantity the synthetic market quotes at each level"),
+    levels: int = Query(5, ge=1, le=50, description="Price levels the synthetic market quotes a side"),
+) -> None:
+    """Matches the user's orders against a synthetic order book that moves with the ticker's path."""
+    ticker_details = service.get_details(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    # The sandbox can last for hours; don't hold a pooled connection for all of it.
+    session.close()
+    if not ticker_details:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Ticker not found.")
+
+    if start is None:
+        start = datetime.datetime.now(datetime.UTC)
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.UTC)
+    try:
+        _check_series_time(start)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+
+    try:
+        quotas.check_request(current_user)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason=exc.detail)
+
+    points_per_step = len(ticker_details.constituents or ()) or 1
+    sandbox = Sandbox(
+        get_series(ticker_details, interval),
+        start_step=step_at(start, interval),
+        tick_size=tick_size,
+        spread_bps=spread_bps,
+        depth=depth,
+        levels=levels,
+        max_open_orders=settings.SANDBOX_MAX_OPEN_ORDERS,
+        max_catch_up_steps=settings.STREAM_MAX_CATCH_UP_STEPS,
+    )
+    await websocket.accept()
+    try:
+        await run_sandbox(
+            websocket,
+            sandbox,
+            speed=speed,
+            frame_interval=settings.STREAM_FRAME_INTERVAL_MS / 1000,
+            max_batch=settings.SANDBOX_MAX_BATCH,
+            throttle=lambda points: quotas.points_wait(current_user, points * points_per_step),
+        )
+    except WebSocketDisconnect:
+        pass
 
 
 @router.post(
@@ -81,6 +890,14 @@ def create_user_defined_ticker(
             detail="Ticker code must match pattern '^[G-Z]{3}[A-C]$'."
         )
 
+    try:
+        validate_model_params(body.model, body.model_params)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
     existing_ticker = service.get_by_user(session=session, ticker_code=body.ticker_code, user_id=current_user.id)
     if existing_ticker:
         raise HTTPException(
@@ -96,6 +913,111 @@ def create_user_defined_ticker(
     return new_ticker
 
 
+@router.post(
+    "/basket",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TickerDetails,
+)
+def create_basket(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    body: BasketCreate,
+) -> Any:
+    """Create a basket: a weighted holding of built-in and the user's own tickers, queried like a ticker."""
+    if len(body.constituents) > settings.BASKET_MAX_CONSTITUENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A basket holds at most {settings.BASKET_MAX_CONSTITUENTS} tickers."
+        )
+    if any(weight <= 0 for weight in body.constituents.values()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Weights must be positive."
+        )
+    # Indices and baskets are already kept out by the codes' pattern.
+    resolved = service.get_constituent_details(
+        session=session, ticker_codes=list(body.constituents), user_id=current_user.id
+    )
+    for ticker_code in body.constituents:
+        if ticker_code not in resolved:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown constituent '{ticker_code}'."
+            )
+
+    existing_basket = service.get_basket_by_user(session=session, ticker_code=body.ticker_code, user_id=current_user.id)
+    if existing_basket:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Existing basket with the same code already exists."
+        )
+
+    service.create_basket(session=session, user_id=current_user.id, basket_data=body)
+    return service.get_details(session=session, ticker_code=body.ticker_code, user_id=current_user.id)
+
+
+@router.delete("/basket/{ticker_code}", response_model=Message)
+def delete_basket(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    ticker_code: TickerCodePath,
+) -> Message:
+    basket = service.get_basket_by_user(session=session, ticker_code=ticker_code, user_id=current_user.id)
+    if not basket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Basket not found."
+        )
+    service.delete_basket(session=session, basket=basket)
+    return Message(message="Basket deleted successfully.")
+
+
+@router.post(
+    "/calibrate",
+    response_model=UserDefinedTickerCreate,
+)
+def calibrate_user_defined_ticker(
+    *,
+    current_user: RateLimitedUser,
+    file: UploadFile = File(..., description="CSV (with a header row) or Parquet price history, oldest first"),
+    ticker_code: str = Form(..., pattern=r"^[G-Z]{3}[A-C]$"),
+    name: str = Form(...),
+    description: str | None = Form(None),
+    sector: str | None = Form(None),
+    interval: int = Form(86400, ge=1, description="Seconds between consecutive prices"),
+    price_column: str | None = Form(None, description="Defaults to close/price, or the last column"),
+) -> Any:
+    """Fits the statistical params of a new user-defined ticker to an uploaded price history."""
+    is_parquet = (file.filename or "").lower().endswith((".parquet", ".pq"))
+    iter_prices = iter_parquet_prices if is_parquet else iter_csv_prices
+
+    def read_prices():
+        file.file.seek(0)
+        return iter_prices(file.file, price_column)
+
+    try:
+        params = fit_merton(read_prices, interval)
+    except CalibrationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
+    return UserDefinedTickerCreate(
+        ticker_code=ticker_code,
+        name=name,
+        description=description,
+        sector=sector,
+        drift=params.drift,
+        volatility=params.volatility,
+        jump_intensity=params.jump_intensity,
+        jump_mean=params.jump_mean,
+        jump_std_dev=params.jump_std_dev,
+    )
+
+
 @router.get(
     "/",
     response_model=List[TickerDetails],
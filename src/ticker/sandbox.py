@@ -0,0 +1,247 @@
+"""
+A trading sandbox: a connection's orders matched against a synthetic market on a ticker's path.
+
+A synthetic market maker quotes ``levels`` prices a side around the series' price, ``depth``
+each, ``spread_bps`` apart at the touch, in one ``OrderBook`` with the trader's orders. Every
+frame it withdraws its quotes, sweeps the trader's orders the path crossed since the previous
+frame (as if it had quoted at the lowest and highest prices of the steps in between), and
+quotes again at the latest price, filling whatever of the trader's orders the new quotes cross.
+So resting orders fill as the price moves through them, and incoming ones take the quotes, or
+the trader's own opposite orders, by price-time priority.
+
+The trader sends orders and cancels as JSON objects, or arrays of them to save round-trips,
+and gets one ``reports`` frame per message: fills, then each request's outcome. Fills of
+resting orders come with the ``quote`` frame of the move that caused them.
+"""
+import asyncio
+import json
+import math
+import time
+from typing import Any, Callable
+
+from fastapi import WebSocket
+from pydantic import ValidationError
+
+from src.ticker.generation import Series, step_timestamp
+from src.ticker.matching import BUY, SELL, Fill, OrderBook
+from src.ticker.replay import ReplayClock
+from src.ticker.schemas import OrderSideEnum, SandboxCancel, SandboxOrder, TimeInForceEnum
+
+MARKET_MAKER = 0
+TRADER = 1
+_SIDES = {OrderSideEnum.BUY: BUY, OrderSideEnum.SELL: SELL}
+_SIDE_NAMES = {BUY: OrderSideEnum.BUY.value, SELL: OrderSideEnum.SELL.value}
+
+
+class SyntheticMarket:
+    """The market maker's quotes, kept in the book around the series' price."""
+
+    def __init__(self, book: OrderBook, tick_size: float, spread_bps: float, depth: int, levels: int):
+        self.book = book
+        self.tick_size = tick_size
+        self.spread_bps = spread_bps
+        self.depth = depth
+        self.levels = levels
+        self._quotes: list[int] = []
+
+    def _touch(self, price: float) -> tuple[int, int]:
+        """Best bid and ask, in ticks, around a price."""
+        mid = price / self.tick_size
+        half_spread = max(0.5, mid * self.spread_bps / 20_000)
+        bid = math.floor(mid - half_spread)
+        return bid, max(bid + 1, math.ceil(mid + half_spread))
+
+    @property
+    def resting_quotes(self) -> int:
+        return sum(1 for order_id in self._quotes if self.book.get(order_id) is not None)
+
+    def move(self, low: float, high: float, last: float) -> list[Fill]:
+        """Requotes at ``last``, after the path went as low and as high as given."""
+        for order_id in self._quotes:
+            self.book.cancel(order_id)
+        self._quotes.clear()
+        liquidity = self.depth * self.levels
+        # The ask was at its lowest at the low and the bid at its highest at the high.
+        _, lowest_ask = self._touch(low)
+        highest_bid, _ = self._touch(high)
+        fills = self.book.submit(SELL, liquidity, max(lowest_ask, 1), MARKET_MAKER, rest=False)[1]
+        fills += self.book.submit(BUY, liquidity, max(highest_bid, 1), MARKET_MAKER, rest=False)[1]
+        bid, ask = self._touch(last)
+        for level in range(self.levels):
+            for side, price in ((BUY, bid - level), (SELL, ask + level)):
+                if price <= 0:
+                    continue
+                order, quote_fills = self.book.submit(side, self.depth, price, MARKET_MAKER)
+                fills += quote_fills
+                if order.remaining:
+                    self._quotes.append(order.order_id)
+        return fills
+
+
+class Sandbox:
+    """The state of one connection's sandbox: its book, market and position on the path."""
+
+    def __init__(
+        self,
+        series: Series,
+        start_step: int,
+        tick_size: float,
+        spread_bps: float,
+        depth: int,
+        levels: int,
+        max_open_orders: int,
+        max_catch_up_steps: int,
+    ):
+        self.series = series
+        self.book = OrderBook()
+        self.market = SyntheticMarket(self.book, tick_size, spread_bps, depth, levels)
+        self.tick_size = tick_size
+        self.max_open_orders = max_open_orders
+        self.max_catch_up_steps = max_catch_up_steps
+        # The next step to price, and the latest one priced.
+        self.position = start_step
+        self.step = start_step
+        self.price = float("nan")
+
+    def _price(self, ticks: int) -> float:
+        return round(ticks * self.tick_size, 10)
+
+    def _fill_reports(self, fills: list[Fill]) -> list[dict[str, Any]]:
+        timestamp = int(step_timestamp(self.step, self.series.interval))
+        reports = []
+        # What remained of each order after each of its fills, from what remains now.
+        remaining: dict[int, int] = {}
+        for fill in reversed(fills):
+            for order, liquidity in ((fill.maker, "MAKER"), (fill.taker, "TAKER")):
+                if order.owner == TRADER:
+                    after = remaining.get(order.order_id, order.remaining)
+                    remaining[order.order_id] = after + fill.quantity
+                    reports.append({
+                        "type": "fill",
+                        "order_id": order.order_id,
+                        "side": _SIDE_NAMES[order.side],
+                        "price": self._price(fill.price),
+                        "quantity": fill.quantity,
+                        "remaining": after,
+                        "liquidity": liquidity,
+                        "timestamp": timestamp,
+                    })
+        reports.reverse()
+        return reports
+
+    def advance(self, due_step: int) -> tuple[dict[str, Any] | None, int]:
+        """Moves the market to the steps due; returns the quote frame and the steps generated."""
+        if due_step <= self.position:
+            return None, 0
+        # Too far behind to be worth generating every step: only the latest ones count.
+        start = max(self.position, due_step - self.max_catch_up_steps)
+        prices = self.series.prices(start, due_step)
+        self.position, self.step, self.price = due_step, due_step - 1, float(prices[-1])
+        fills = self.market.move(float(prices.min()), float(prices.max()), self.price)
+        bid, ask = self.book.best(BUY), self.book.best(SELL)
+        frame = {
+            "type": "quote",
+            "timestamp": int(step_timestamp(self.step, self.series.interval)),
+            "price": self.price,
+            "bid": None if bid is None else self._price(bid),
+            "ask": None if ask is None else self._price(ask),
+            "fills": self._fill_reports(fills),
+        }
+        return frame, len(prices)
+
+    def _order(self, request: SandboxOrder) -> list[dict[str, Any]]:
+        price = None
+        if request.price is not None:
+            price = round(request.price / self.tick_size)
+            if price <= 0:
+                return [_rejected(request.client_order_id, "The price must be at least one tick.")]
+        rest = price is not None and request.time_in_force == TimeInForceEnum.GTC
+        if rest and len(self.book) - self.market.resting_quotes >= self.max_open_orders:
+            return [_rejected(request.client_order_id, f"At most {self.max_open_orders} orders can rest.")]
+        order, fills = self.book.submit(_SIDES[request.side], request.quantity, price, TRADER, rest)
+        reports = self._fill_reports(fills)
+        reports.append({
+            "type": "order",
+            "order_id": order.order_id,
+            "client_order_id": request.client_order_id,
+            "status": "FILLED" if not order.remaining else "RESTING" if rest else "EXPIRED",
+            "remaining": order.remaining,
+        })
+        return reports
+
+    def _cancel(self, request: SandboxCancel) -> list[dict[str, Any]]:
+        order = self.book.get(request.order_id)
+        if order is None or order.owner != TRADER:
+            return [_rejected(None, "No such resting order.", order_id=request.order_id)]
+        return [{"type": "cancelled", "order_id": request.order_id, "remaining": self.book.cancel(request.order_id)}]
+
+    def handle(self, message: Any) -> list[dict[str, Any]]:
+        """The reports of a message of one request or a list of them."""
+        reports = []
+        for request in message if isinstance(message, list) else [message]:
+            kind = request.get("type") if isinstance(request, dict) else None
+            try:
+                if kind == "order":
+                    reports += self._order(SandboxOrder.model_validate(request))
+                elif kind == "cancel":
+                    reports += self._cancel(SandboxCancel.model_validate(request))
+                else:
+                    reports.append(_rejected(None, "Requests are of type 'order' or 'cancel'."))
+            except ValidationError as exc:
+                reports.append(_rejected(
+                    request.get("client_order_id"), exc.errors(include_url=False, include_context=False)
+                ))
+        return reports
+
+
+def _rejected(client_order_id: str | None, reason: Any, **fields: Any) -> dict[str, Any]:
+    return {"type": "rejected", "client_order_id": client_order_id, "reason": reason, **fields}
+
+
+async def run_sandbox(
+    websocket: WebSocket,
+    sandbox: Sandbox,
+    speed: float,
+    frame_interval: float,
+    max_batch: int,
+    throttle: Callable[[int], float] | None = None,
+) -> None:
+    """
+    Runs the sandbox until the client disconnects: requests are handled as they come, and the
+    market moves every frame. ``throttle`` is given the steps generated for each frame, as in
+    ``stream_series``.
+    """
+    clock = ReplayClock(sandbox.position, sandbox.series.interval, speed)
+    # Moving the market generates the path; that runs in a thread, off the event loop.
+    frame, _ = await asyncio.to_thread(sandbox.advance, clock.due_step())
+    await websocket.send_json(frame)
+    next_frame = time.monotonic() + frame_interval
+    receive = asyncio.ensure_future(websocket.receive_text())
+    try:
+        while True:
+            done, _ = await asyncio.wait((receive,), timeout=max(0.0, next_frame - time.monotonic()))
+            if done:
+                text = receive.result()
+                receive = asyncio.ensure_future(websocket.receive_text())
+                try:
+                    message = json.loads(text)
+                except ValueError:
+                    reports = [_rejected(None, "Messages must be JSON.")]
+                else:
+                    if isinstance(message, list) and len(message) > max_batch:
+                        reports = [_rejected(None, f"At most {max_batch} requests per message.")]
+                    else:
+                        reports = sandbox.handle(message)
+                await websocket.send_json({"type": "reports", "reports": reports})
+                continue
+
+            next_frame = max(next_frame + frame_interval, time.monotonic())
+            frame, steps = await asyncio.to_thread(sandbox.advance, clock.due_step())
+            if frame is not None:
+                if throttle is not None:
+                    delay = throttle(steps)
+                    if delay:
+                        await asyncio.sleep(delay)
+                await websocket.send_json(frame)
+    finally:
+        receive.cancel()
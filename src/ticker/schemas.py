@@ -1,5 +1,5 @@
-from pydantic import BaseModel, constr
-from typing import Tuple, Optional
+from pydantic import BaseModel, Field, constr
+from typing import Dict, List, Tuple, Optional
 from enum import Enum
 
 
@@ -17,6 +17,45 @@ class BuiltInTickerContext(BaseModel):
 class TickerTypeEnum(str, Enum):
     BUILT_IN = "BUILT_IN"
     USER_DEFINED = "USER_DEFINED"
+    INDEX = "INDEX"
+    BASKET = "BASKET"
+
+
+class TickerModelEnum(str, Enum):
+    MERTON = "MERTON"
+    REGIME_SWITCHING = "REGIME_SWITCHING"
+    GARCH = "GARCH"
+    HESTON = "HESTON"
+
+
+class CoalesceModeEnum(str, Enum):
+    OHLC = "OHLC"
+    LATEST = "LATEST"
+
+
+class OrderSideEnum(str, Enum):
+    BUY = "BUY"
+    SELL = "SELL"
+
+
+class TimeInForceEnum(str, Enum):
+    # Good till cancelled: rests until filled or cancelled.
+    GTC = "GTC"
+    # Immediate or cancel: whatever doesn't fill at once expires.
+    IOC = "IOC"
+
+
+class ScreenerSortEnum(str, Enum):
+    WINDOW_RETURN = "window_return"
+    REALIZED_VOLATILITY = "realized_volatility"
+
+
+class BasketConstituent(BaseModel):
+    ticker_code: str
+    # Normalised: the weights of a basket add up to 1.
+    weight: float
+    # Needed to generate the basket's path, but not part of the response.
+    details: Optional["TickerDetails"] = Field(None, exclude=True)
 
 
 class TickerDetails(BaseModel):
@@ -29,12 +68,19 @@ class TickerDetails(BaseModel):
     jump_intensity: float
     jump_mean: float
     jump_std_dev: float
+    model: TickerModelEnum = TickerModelEnum.MERTON
+    model_params: Optional[Dict[str, float]] = None
     market: str
     type: TickerTypeEnum
+    # Indices and baskets only; their statistical params are the weighted means of the constituents'.
+    constituents: Optional[List[BasketConstituent]] = None
+
+
+BasketConstituent.model_rebuild()
 
 
 class UserDefinedTickerCreate(BaseModel):
-    ticker_code: constr(regex=r"^[G-Z]{3}[A-C]$")
+    ticker_code: constr(pattern=r"^[G-Z]{3}[A-C]$")
     name: str
     description: Optional[str]
     sector: Optional[str]
@@ -43,3 +89,143 @@ class UserDefinedTickerCreate(BaseModel):
     jump_intensity: float
     jump_mean: float
     jump_std_dev: float
+    model: TickerModelEnum = TickerModelEnum.MERTON
+    model_params: Optional[Dict[str, float]] = None
+
+
+class BasketCreate(BaseModel):
+    ticker_code: constr(pattern=r"^[G-Z]{3}X$")
+    name: str
+    description: Optional[str] = None
+    # Ticker code to weight, of built-in or the user's own tickers; the weights are normalised
+    # to add up to 1.
+    constituents: Dict[constr(pattern=r"^[A-Z]{3}[A-C]$"), float] = Field(min_length=2)
+
+
+class TickerSeries(BaseModel):
+    ticker_code: str
+    interval: int
+    timestamps: List[int]
+    prices: List[float]
+    next_cursor: str
+    # By column, e.g. "sma:20" or "macd:12:26:9.signal"; null where the path is too short for them.
+    indicators: Dict[str, List[float | None]] | None = None
+
+
+class RiskAtHorizon(BaseModel):
+    horizon_days: int
+    confidence: float
+    value_at_risk: float
+    expected_shortfall: float
+
+
+class OptionQuote(BaseModel):
+    expiry_days: int
+    strike: float
+    call: float
+    put: float
+    call_std_error: float
+    put_std_error: float
+
+
+class MonteCarloResult(BaseModel):
+    ticker_code: str
+    paths: int
+    spot: float
+    rate: float
+    risk: List[RiskAtHorizon]
+    options: List[OptionQuote]
+
+
+class OptionChain(BaseModel):
+    ticker_code: str
+    timestamp: int
+    spot: float
+    rate: float
+    expiry_days: List[int]
+    strikes: List[float]
+    # One row per expiry, one column per strike; theta is per year.
+    calls: List[List[float]]
+    puts: List[List[float]]
+    call_delta: List[List[float]]
+    put_delta: List[List[float]]
+    gamma: List[List[float]]
+    vega: List[List[float]]
+    call_theta: List[List[float]]
+    put_theta: List[List[float]]
+    call_rho: List[List[float]]
+    put_rho: List[List[float]]
+
+
+class TickerStats(BaseModel):
+    ticker_code: str
+    interval: int
+    # Timestamps of the first and last points of the window.
+    start: int
+    end: int
+    returns: int
+    first_price: float
+    last_price: float
+    high: float
+    low: float
+    # Fractions, except the annualised realized volatility, in percent like the ticker params.
+    total_return: float
+    max_drawdown: float
+    realized_volatility: float
+    # Of the log-returns between consecutive points.
+    mean_return: float
+    return_std_dev: float
+    skewness: float
+    excess_kurtosis: float
+    jumps: int
+    quantile_levels: List[float]
+    return_quantiles: List[float]
+
+
+class TickDataset(BaseModel):
+    ticker_code: str
+    interval: int
+    # Timestamps of the first and last ticks persisted.
+    start: int
+    end: int
+    rows: int
+
+
+class TickDatasetPage(BaseModel):
+    ticker_code: str
+    interval: int
+    timestamps: List[int]
+    prices: List[float]
+
+
+class SandboxOrder(BaseModel):
+    side: OrderSideEnum
+    quantity: int = Field(gt=0, le=1_000_000_000)
+    # A market order without one.
+    price: Optional[float] = Field(None, gt=0)
+    time_in_force: TimeInForceEnum = TimeInForceEnum.GTC
+    client_order_id: Optional[str] = Field(None, max_length=64)
+
+
+class SandboxCancel(BaseModel):
+    order_id: int
+
+
+class ScreenerMatch(BaseModel):
+    ticker_code: str
+    name: str
+    sector: str
+    market: str
+    last_price: float
+    # A fraction, and annualised in percent like the ticker params.
+    window_return: float
+    realized_volatility: float
+
+
+class ScreenerResult(BaseModel):
+    interval: int
+    window: int
+    # Timestamp of the last point of the window.
+    as_of: int
+    matches: int
+    results: List[ScreenerMatch]
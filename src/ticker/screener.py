@@ -0,0 +1,143 @@
+"""
+Screening the built-in ticker universe on the recent behaviour of its paths.
+
+For an as-of step and a window of steps, every built-in ticker's window return and realized
+volatility are computed together, as one (tickers, steps) array of log levels from
+``merton_log_levels``, in chunks of tickers on the process pool. The metrics only depend on
+the as-of step, the window and the interval, so they are cached by those: screening again
+within the same as-of step only costs the filter. Generating them costs, per ticker, the steps
+of the window's blocks and one aggregate move for every block before the window, which at short
+intervals is most of it.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.ticker.built_in_tickers import BUILT_IN_TICKERS, get_built_in_parameter_table
+from src.ticker.generation import BLOCK_STEPS, INITIAL_PRICE, SECONDS_PER_YEAR, merton_log_levels, merton_params_hash, series_key
+from src.ticker.schemas import ScreenerMatch, ScreenerSortEnum
+from src.ticker.utils import parse_market
+
+_PARAMETER_FIELDS = ("drift", "volatility", "jump_intensity", "jump_mean", "jump_std_dev")
+
+
+@dataclass(frozen=True)
+class UniverseMetrics:
+    """Metrics of every built-in ticker, in the order of the built-in parameter table."""
+    last_price: np.ndarray
+    # Fractions.
+    window_return: np.ndarray
+    # Annualised, in percent like the ticker params.
+    realized_volatility: np.ndarray
+
+
+def points_per_ticker(as_of_step: int, window: int) -> int:
+    """Draws made for each ticker: every step of the window's blocks, and the blocks before them."""
+    first, last = (as_of_step - window) // BLOCK_STEPS, as_of_step // BLOCK_STEPS
+    return first + (last - first + 1) * BLOCK_STEPS
+
+
+def screen_chunk(table: np.ndarray, interval: int, start_step: int, stop_step: int) -> tuple[np.ndarray, ...]:
+    """Last price, window return and realized volatility of some tickers; runs on the process pool."""
+    params = np.column_stack([table[field] for field in _PARAMETER_FIELDS])
+    keys = [
+        series_key(merton_params_hash(row["ticker_code"].decode(), *(float(row[field]) for field in _PARAMETER_FIELDS)), interval)
+        for row in table
+    ]
+    levels = merton_log_levels(keys, params, interval, start_step, stop_step)
+    returns = np.diff(levels, axis=1)
+    return (
+        INITIAL_PRICE * np.exp(levels[:, -1]),
+        np.expm1(levels[:, -1] - levels[:, 0]),
+        100 * np.sqrt(np.einsum("ij,ij->i", returns, returns) / returns.shape[1] / (interval / SECONDS_PER_YEAR)),
+    )
+
+
+_metrics_cache: "OrderedDict[tuple[int, int, int], UniverseMetrics]" = OrderedDict()
+_metrics_cache_lock = threading.Lock()
+_METRICS_CACHE_SIZE = 64
+
+
+def cached_universe_metrics(interval: int, as_of_step: int, window: int) -> UniverseMetrics | None:
+    cache_key = (interval, as_of_step, window)
+    with _metrics_cache_lock:
+        metrics = _metrics_cache.get(cache_key)
+        if metrics is not None:
+            _metrics_cache.move_to_end(cache_key)
+        return metrics
+
+
+def universe_metrics(
+    interval: int, as_of_step: int, window: int, executor: Executor | None, chunk_tickers: int
+) -> UniverseMetrics:
+    """Metrics of the ``window`` returns up to ``as_of_step``, computed once per (as-of step, window)."""
+    metrics = cached_universe_metrics(interval, as_of_step, window)
+    if metrics is not None:
+        return metrics
+
+    table = np.asarray(get_built_in_parameter_table())
+    start_step, stop_step = as_of_step - window, as_of_step + 1
+    chunks = [table[i:i + chunk_tickers] for i in range(0, len(table), chunk_tickers)]
+    if executor is None:
+        results = [screen_chunk(chunk, interval, start_step, stop_step) for chunk in chunks]
+    else:
+        futures = [executor.submit(screen_chunk, chunk, interval, start_step, stop_step) for chunk in chunks]
+        results = [future.result() for future in futures]
+    metrics = UniverseMetrics(*(np.concatenate(columns) for columns in zip(*results)))
+    with _metrics_cache_lock:
+        _metrics_cache[(interval, as_of_step, window)] = metrics
+        while len(_metrics_cache) > _METRICS_CACHE_SIZE:
+            _metrics_cache.popitem(last=False)
+    return metrics
+
+
+def screen(
+    metrics: UniverseMetrics,
+    min_return: float | None = None,
+    max_return: float | None = None,
+    min_volatility: float | None = None,
+    max_volatility: float | None = None,
+    categories: list[str] | None = None,
+    markets: list[str] | None = None,
+    sort_by: ScreenerSortEnum = ScreenerSortEnum.WINDOW_RETURN,
+    descending: bool = True,
+    limit: int = 100,
+) -> tuple[int, list[ScreenerMatch]]:
+    """The number of tickers passing the filters, and the first ``limit`` of them in the given order."""
+    codes = np.asarray(get_built_in_parameter_table())["ticker_code"]
+    mask = np.ones(len(codes), dtype=bool)
+    for values, lower, upper in (
+        (metrics.window_return, min_return, max_return),
+        (metrics.realized_volatility, min_volatility, max_volatility),
+    ):
+        if lower is not None:
+            mask &= values >= lower
+        if upper is not None:
+            mask &= values <= upper
+    # Codes are the category letter, two parameter letters and the market letter.
+    letters = codes.astype("S4").view("S1").reshape(-1, 4)
+    if categories:
+        mask &= np.isin(letters[:, 0], [category.encode() for category in categories])
+    if markets:
+        mask &= np.isin(letters[:, 3], [market.encode() for market in markets])
+
+    matches = np.flatnonzero(mask)
+    values = getattr(metrics, sort_by.value)[matches]
+    order = np.argsort(-values if descending else values, kind="stable")[:limit]
+    results = []
+    for i in matches[order]:
+        code = codes[i].decode()
+        context = BUILT_IN_TICKERS[code[0]]
+        results.append(ScreenerMatch(
+            ticker_code=code,
+            name=context.name,
+            sector=context.sector,
+            market=parse_market(code[3]),
+            last_price=float(metrics.last_price[i]),
+            window_return=float(metrics.window_return[i]),
+            realized_volatility=float(metrics.realized_volatility[i]),
+        ))
+    return len(matches), results
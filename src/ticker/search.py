@@ -0,0 +1,201 @@
+"""
+In-memory search over built-in and user-defined tickers.
+
+An index keeps its tickers sorted by code, so a code prefix is a contiguous range of
+positions. Words of the name, description and sector map to the sorted positions of the
+tickers containing them, and each statistical param is kept as a sorted array with the
+positions in that order, so a range filter is two binary searches. A query intersects
+boolean masks over the positions, which stays well under a millisecond for tens of thousands
+of tickers.
+
+The built-in index is built once, from the built-in parameter table, and creates the details of
+the tickers it returns as they are returned. Each user's tickers have their own small index, loaded on
+first search and updated whenever the user creates a ticker.
+"""
+import bisect
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Sequence
+
+import numpy as np
+
+from src.config import settings
+from src.ticker.built_in_tickers import get_built_in_category_context, compute_built_in_ticker_derived_details, get_built_in_parameter_table
+from src.ticker.schemas import TickerDetails
+
+PARAMETERS = ("drift", "volatility", "jump_intensity", "jump_mean", "jump_std_dev")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class TickerIndex:
+    def __init__(self, tickers: list[TickerDetails]):
+        tickers = sorted(tickers, key=lambda ticker: ticker.ticker_code)
+        values = np.array(
+            [[getattr(ticker, name) for name in PARAMETERS] for ticker in tickers], dtype=np.float64
+        ).reshape(len(tickers), len(PARAMETERS))
+        self._build(
+            [ticker.ticker_code for ticker in tickers],
+            [(ticker.name, ticker.description, ticker.sector) for ticker in tickers],
+            values,
+            tickers,
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        codes: list[str],
+        texts: list[tuple[str | None, str | None, str | None]],
+        values: np.ndarray,
+        tickers: Sequence[TickerDetails],
+    ) -> "TickerIndex":
+        """
+        An index of tickers already sorted by code, given as their name, description and
+        sector, and their ``PARAMETERS`` values; ``tickers`` is only read for the results.
+        """
+        index = cls.__new__(cls)
+        index._build(codes, texts, values, tickers)
+        return index
+
+    def _build(
+        self,
+        codes: list[str],
+        texts: list[tuple[str | None, str | None, str | None]],
+        values: np.ndarray,
+        tickers: Sequence[TickerDetails],
+    ) -> None:
+        self.tickers = tickers
+        self.codes = codes
+
+        postings: dict[str, list[int]] = {}
+        # Many tickers share their texts, e.g. every built-in ticker of a category.
+        tokens_by_text: dict[tuple, set[str]] = {}
+        for position, text in enumerate(texts):
+            tokens = tokens_by_text.get(text)
+            if tokens is None:
+                tokens = tokens_by_text[text] = set(tokenize(text[0]) + tokenize(text[1]) + tokenize(text[2]))
+            for token in tokens:
+                postings.setdefault(token, []).append(position)
+        self.vocabulary = sorted(postings)
+        self.postings = [np.array(postings[token], dtype=np.int32) for token in self.vocabulary]
+
+        self.order = np.argsort(values, axis=0, kind="stable")
+        self.sorted_values = np.take_along_axis(values, self.order, axis=0)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def search(
+        self,
+        *,
+        code_prefix: str | None = None,
+        terms: list[str] = (),
+        ranges: dict[str, tuple[float | None, float | None]] | None = None,
+        limit: int,
+    ) -> list[TickerDetails]:
+        """
+        Tickers matching every criterion, by code. Each term matches the words it prefixes,
+        and each range is inclusive on the params' ``min``/``max`` that are given.
+        """
+        first, last = 0, len(self.tickers)
+        if code_prefix:
+            first = bisect.bisect_left(self.codes, code_prefix)
+            last = bisect.bisect_left(self.codes, code_prefix + "\uffff", first)
+        if first >= last:
+            return []
+        mask = np.zeros(len(self.tickers), dtype=bool)
+        mask[first:last] = True
+
+        for term in terms:
+            start = bisect.bisect_left(self.vocabulary, term)
+            stop = bisect.bisect_left(self.vocabulary, term + "\uffff", start)
+            matches = np.zeros_like(mask)
+            for positions in self.postings[start:stop]:
+                matches[positions] = True
+            mask &= matches
+
+        for name, (low, high) in (ranges or {}).items():
+            column = PARAMETERS.index(name)
+            values = self.sorted_values[:, column]
+            start = 0 if low is None else np.searchsorted(values, low, side="left")
+            stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+            matches = np.zeros_like(mask)
+            matches[self.order[start:stop, column]] = True
+            mask &= matches
+
+        return [self.tickers[position] for position in np.flatnonzero(mask)[:limit]]
+
+
+_built_in_index: TickerIndex | None = None
+_built_in_index_lock = threading.Lock()
+
+_user_indexes: "OrderedDict[uuid.UUID, tuple[float, TickerIndex]]" = OrderedDict()
+_user_indexes_lock = threading.Lock()
+_USER_INDEXES_SIZE = 1024
+
+
+class _BuiltInTickers(Sequence):
+    """Details of the built-in tickers by position, computed when a search returns them."""
+
+    def __init__(self, codes: list[str]):
+        self.codes = codes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, position: int) -> TickerDetails:
+        code = self.codes[position]
+        return compute_built_in_ticker_derived_details(code, get_built_in_category_context(code[0]))
+
+
+def get_built_in_index() -> TickerIndex:
+    global _built_in_index
+    with _built_in_index_lock:
+        if _built_in_index is None:
+            table = get_built_in_parameter_table()
+            codes = [code.decode() for code in table["ticker_code"]]
+            contexts = {code[0]: get_built_in_category_context(code[0]) for code in codes}
+            _built_in_index = TickerIndex.from_columns(
+                codes,
+                [(contexts[code[0]].name, contexts[code[0]].description, contexts[code[0]].sector) for code in codes],
+                np.stack([table[name] for name in PARAMETERS], axis=1),
+                _BuiltInTickers(codes),
+            )
+        return _built_in_index
+
+
+def get_user_index(user_id: uuid.UUID, load: Callable[[], list[TickerDetails]]) -> TickerIndex:
+    """
+    The index of a user's tickers, calling ``load`` on a miss. Other worker processes don't
+    see this one's updates, so entries are reloaded after ``SEARCH_USER_INDEX_TTL_SECONDS``.
+    """
+    now = time.monotonic()
+    with _user_indexes_lock:
+        entry = _user_indexes.get(user_id)
+        if entry is not None and now - entry[0] < settings.SEARCH_USER_INDEX_TTL_SECONDS:
+            _user_indexes.move_to_end(user_id)
+            return entry[1]
+    index = TickerIndex(load())
+    with _user_indexes_lock:
+        _user_indexes[user_id] = (now, index)
+        while len(_user_indexes) > _USER_INDEXES_SIZE:
+            _user_indexes.popitem(last=False)
+    return index
+
+
+def upsert_user_ticker(user_id: uuid.UUID, details: TickerDetails) -> None:
+    """Adds or replaces a ticker in the user's index, if the index is loaded."""
+    with _user_indexes_lock:
+        entry = _user_indexes.get(user_id)
+        if entry is None:
+            return
+        loaded_at, index = entry
+        tickers = [ticker for ticker in index.tickers if ticker.ticker_code != details.ticker_code]
+        _user_indexes[user_id] = (loaded_at, TickerIndex(tickers + [details]))
@@ -1,11 +1,14 @@
 import uuid
-from typing import List
+from typing import Dict, List, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from src.ticker.models import UserDefinedTicker
-from src.ticker.schemas import UserDefinedTickerCreate
+from src.ticker.built_in_tickers import get_built_in_category_context, compute_built_in_ticker_derived_details, compute_sector_index_details
+from src.ticker.models import UserDefinedBasket, UserDefinedTicker
+from src.ticker.schemas import BasketCreate, TickerDetails, TickerTypeEnum, UserDefinedTickerCreate
+from src.ticker.utils import compute_composite_details, compute_user_defined_ticker_derived_details
+from src.ticker import search as search_index
 
 
 def get_by_user(*, session: Session, ticker_code: str, user_id: uuid.UUID) -> UserDefinedTicker | None:
@@ -17,6 +20,87 @@ def get_by_user(*, session: Session, ticker_code: str, user_id: uuid.UUID) -> Us
     ).scalar_one_or_none()
 
 
+def get_basket_by_user(*, session: Session, ticker_code: str, user_id: uuid.UUID) -> UserDefinedBasket | None:
+    return session.execute(
+        select(UserDefinedBasket).filter(
+            UserDefinedBasket.user_id == user_id,
+            UserDefinedBasket.ticker_code == ticker_code
+        )
+    ).scalar_one_or_none()
+
+
+def get_built_in_details(ticker_code: str) -> TickerDetails | None:
+    """Details of a built-in ticker or sector index, which need no database access."""
+    category_context = get_built_in_category_context(ticker_code[0])
+    if category_context is None:
+        return None
+    if ticker_code.endswith("X"):
+        if ticker_code[1:] != "IDX":
+            return None
+        return compute_sector_index_details(ticker_code[0], category_context)
+    return compute_built_in_ticker_derived_details(ticker_code, category_context)
+
+
+def get_constituent_details(*, session: Session, ticker_codes: List[str], user_id: uuid.UUID) -> Dict[str, TickerDetails]:
+    """
+    Details of the built-in and user's own tickers among ``ticker_codes``, looking the latter
+    up in one query; codes that resolve to nothing, indices and baskets are left out.
+    """
+    resolved = {}
+    user_codes = []
+    for ticker_code in ticker_codes:
+        if ticker_code.endswith("X"):
+            continue
+        details = get_built_in_details(ticker_code)
+        if details is not None:
+            resolved[ticker_code] = details
+        else:
+            user_codes.append(ticker_code)
+    if user_codes:
+        user_defined_tickers = session.execute(
+            select(UserDefinedTicker).filter(
+                UserDefinedTicker.user_id == user_id,
+                UserDefinedTicker.ticker_code.in_(user_codes)
+            )
+        ).scalars()
+        for user_defined_ticker in user_defined_tickers:
+            resolved[user_defined_ticker.ticker_code] = compute_user_defined_ticker_derived_details(
+                user_defined_ticker.ticker_code, user_defined_ticker
+            )
+    return resolved
+
+
+def _get_basket_details(*, session: Session, basket: UserDefinedBasket) -> TickerDetails | None:
+    resolved = get_constituent_details(session=session, ticker_codes=list(basket.constituents), user_id=basket.user_id)
+    if len(resolved) < len(basket.constituents):
+        return None
+    constituents = [(resolved[ticker_code], weight) for ticker_code, weight in basket.constituents.items()]
+    return compute_composite_details(
+        basket.ticker_code,
+        name=basket.name,
+        description=basket.description,
+        sector=None,
+        constituents=constituents,
+        ticker_type=TickerTypeEnum.BASKET,
+    )
+
+
+def get_details(*, session: Session, ticker_code: str, user_id: uuid.UUID) -> TickerDetails | None:
+    """Resolves a built-in ticker, or one of the user's own, to its full details."""
+    built_in_details = get_built_in_details(ticker_code)
+    if built_in_details is not None:
+        return built_in_details
+
+    if ticker_code.endswith("X"):
+        basket = get_basket_by_user(session=session, ticker_code=ticker_code, user_id=user_id)
+        return basket and _get_basket_details(session=session, basket=basket)
+
+    user_defined_ticker = get_by_user(session=session, ticker_code=ticker_code, user_id=user_id)
+    if not user_defined_ticker:
+        return None
+    return compute_user_defined_ticker_derived_details(ticker_code, user_defined_ticker)
+
+
 def create(*, session: Session, user_id: uuid.UUID, ticker_data: UserDefinedTickerCreate) -> UserDefinedTicker:
     new_ticker = UserDefinedTicker(
         user_id=user_id,
@@ -29,12 +113,58 @@ def create(*, session: Session, user_id: uuid.UUID, ticker_data: UserDefinedTick
         jump_intensity=ticker_data.jump_intensity,
         jump_mean=ticker_data.jump_mean,
         jump_std_dev=ticker_data.jump_std_dev,
+        model=ticker_data.model,
+        model_params=ticker_data.model_params,
     )
     session.add(new_ticker)
     session.commit()
     session.refresh(new_ticker)
+    search_index.upsert_user_ticker(
+        user_id, compute_user_defined_ticker_derived_details(new_ticker.ticker_code, new_ticker)
+    )
     return new_ticker
 
 
+def create_basket(*, session: Session, user_id: uuid.UUID, basket_data: BasketCreate) -> UserDefinedBasket:
+    new_basket = UserDefinedBasket(
+        user_id=user_id,
+        ticker_code=basket_data.ticker_code,
+        name=basket_data.name,
+        description=basket_data.description,
+        constituents=basket_data.constituents,
+    )
+    session.add(new_basket)
+    session.commit()
+    session.refresh(new_basket)
+    return new_basket
+
+
+def delete_basket(*, session: Session, basket: UserDefinedBasket) -> None:
+    session.delete(basket)
+    session.commit()
+
+
 def get_all_by_user(*, session: Session, user_id: uuid.UUID) -> List[UserDefinedTicker]:
     return session.query(UserDefinedTicker).filter(UserDefinedTicker.user_id == user_id).all()
+
+
+def search(
+    *,
+    session: Session,
+    user_id: uuid.UUID,
+    code_prefix: str | None,
+    terms: List[str],
+    ranges: Dict[str, Tuple[float | None, float | None]],
+    limit: int,
+) -> List[TickerDetails]:
+    """The user's own matching tickers first, then the built-in ones."""
+    user_index = search_index.get_user_index(user_id, lambda: [
+        compute_user_defined_ticker_derived_details(ticker.ticker_code, ticker)
+        for ticker in get_all_by_user(session=session, user_id=user_id)
+    ])
+    results = user_index.search(code_prefix=code_prefix, terms=terms, ranges=ranges, limit=limit)
+    if len(results) < limit:
+        results += search_index.get_built_in_index().search(
+            code_prefix=code_prefix, terms=terms, ranges=ranges, limit=limit - len(results)
+        )
+    return results
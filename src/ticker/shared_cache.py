@@ -0,0 +1,210 @@
+"""
+Cache of generated arrays shared by every worker process on the host.
+
+Arrays are stored as ``.npy`` files in a tmpfs directory (``/dev/shm`` by default) and read
+back with ``np.load(mmap_mode="r")``, so a worker reads what another one generated without
+copying it. Each file is written to a temporary name and renamed into place, so readers never
+see a partial array.
+
+A small index file, memory-mapped by every worker, records each entry's size and the epoch of
+its last use. Writers take an exclusive ``flock`` on the index to insert entries and evict the
+least recently used ones once the cache is over its byte budget. Eviction only unlinks the
+file: workers still holding the array keep a valid mapping until they drop it, and the kernel
+frees the memory after the last one does.
+
+On a miss the cache can fall back to arrays kept elsewhere, such as a warm-start snapshot;
+an array found there is copied into the cache, so that it is tracked like the others.
+"""
+import fcntl
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import numpy as np
+
+_MAGIC = b"FTKCACHE"
+# Raised whenever the index layout or the generated paths change: a stale cache (and any
+# snapshot of it) is then discarded.
+_VERSION = 3
+_HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("slots", "<u4"),
+    ("epoch", "<u8"),
+    ("total_bytes", "<u8"),
+])
+_ROW = np.dtype([
+    ("key", "S16"),
+    ("nbytes", "<u8"),
+    ("epoch", "<u8"),
+])
+_LOCAL_MAPPINGS = 256
+
+
+def _row_digest(key: bytes) -> bytes:
+    """The digest of an index row: NumPy drops the trailing zero bytes of "S" values."""
+    return bytes(key).ljust(_ROW["key"].itemsize, b"\0")
+
+
+class SharedArrayCache:
+    def __init__(self, directory: str, max_bytes: int, slots: int = 8192):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "index")
+        self._lock_path = os.path.join(directory, "index.lock")
+        with self._exclusive():
+            self._open_index(slots)
+        # Arrays this process has mapped already, so hot entries cost no system call.
+        self._local: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._local_lock = threading.Lock()
+        # Looks up the digest of a missing key, e.g. in a warm-start snapshot.
+        self.fallback: Callable[[bytes], np.ndarray | None] | None = None
+
+    def _open_index(self, slots: int) -> None:
+        size = _HEADER.itemsize + slots * _ROW.itemsize
+        fresh = not os.path.exists(self._index_path) or os.path.getsize(self._index_path) != size
+        if not fresh:
+            header = np.fromfile(self._index_path, dtype=_HEADER, count=1)[0]
+            fresh = header["magic"] != _MAGIC or header["version"] != _VERSION or header["slots"] != slots
+        if fresh:
+            for name in os.listdir(self.directory):
+                if name.endswith(".npy"):
+                    os.unlink(os.path.join(self.directory, name))
+            with open(self._index_path, "wb") as index_file:
+                index_file.truncate(size)
+        self._header = np.memmap(self._index_path, dtype=_HEADER, mode="r+", shape=(1,))
+        self._rows = np.memmap(self._index_path, dtype=_ROW, mode="r+", offset=_HEADER.itemsize, shape=(slots,))
+        if fresh:
+            self._header[0] = (_MAGIC, _VERSION, slots, 0, 0)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, digest: bytes) -> str:
+        return os.path.join(self.directory, f"{digest.hex()}.npy")
+
+    def _find_slot(self, digest: bytes) -> int | None:
+        """Slot holding ``digest``, or the first free slot on its probe sequence."""
+        slots = len(self._rows)
+        start = int.from_bytes(digest[:8], "little") % slots
+        for probe in range(slots):
+            slot = (start + probe) % slots
+            key = self._rows[slot]["key"]
+            if not key or _row_digest(key) == digest:
+                return slot
+        return None
+
+    def get(self, key: str) -> np.ndarray | None:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        with self._local_lock:
+            array = self._local.get(digest)
+            if array is not None:
+                self._local.move_to_end(digest)
+                return array
+        try:
+            array = np.load(self._path(digest), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            array = self.fallback(digest) if self.fallback is not None else None
+            return None if array is None else self._store(digest, array)
+        slot = self._find_slot(digest)
+        if slot is not None and _row_digest(self._rows[slot]["key"]) == digest:
+            # Unlocked: a lost update only makes the entry look a little older.
+            self._rows[slot]["epoch"] = self._header[0]["epoch"]
+        self._remember(digest, array)
+        return array
+
+    def put(self, key: str, array: np.ndarray) -> np.ndarray:
+        return self._store(hashlib.blake2b(key.encode(), digest_size=16).digest(), array)
+
+    def _store(self, digest: bytes, array: np.ndarray) -> np.ndarray:
+        path = self._path(digest)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as array_file:
+            np.save(array_file, array)
+        os.rename(temporary_path, path)
+        with self._exclusive():
+            header = self._header[0]
+            slot = self._find_slot(digest)
+            if slot is None:
+                self._evict_one()
+                slot = self._find_slot(digest)
+            if _row_digest(self._rows[slot]["key"]) != digest:
+                header["total_bytes"] += array.nbytes
+            header["epoch"] += 1
+            self._rows[slot] = (digest, array.nbytes, header["epoch"])
+            while header["total_bytes"] > self.max_bytes and self._evict_one(keep=slot):
+                pass
+        self._remember(digest, array)
+        return array
+
+    def most_recent(self, max_bytes: int) -> list[tuple[bytes, str]]:
+        """Digests and paths of the most recently used entries, up to ``max_bytes`` together."""
+        with self._exclusive():
+            rows = self._rows[self._rows["key"] != b""].copy()
+        rows = rows[np.argsort(rows["epoch"], kind="stable")[::-1]]
+        rows = rows[np.cumsum(rows["nbytes"]) <= max_bytes]
+        digests = [_row_digest(key) for key in rows["key"]]
+        return [(digest, self._path(digest)) for digest in digests]
+
+    def _evict_one(self, keep: int | None = None) -> bool:
+        """Evicts the least recently used entry; must hold the index lock."""
+        used = self._rows["key"] != b""
+        if keep is not None:
+            used[keep] = False
+        if not used.any():
+            return False
+        epochs = np.where(used, self._rows["epoch"], np.iinfo(np.uint64).max)
+        slot = int(np.argmin(epochs))
+        digest = _row_digest(self._rows[slot]["key"])
+        try:
+            os.unlink(self._path(digest))
+        except FileNotFoundError:
+            pass
+        self._header[0]["total_bytes"] -= self._rows[slot]["nbytes"]
+        self._rows[slot] = (b"", 0, 0)
+        self._rehash_after(slot)
+        with self._local_lock:
+            self._local.pop(digest, None)
+        return True
+
+    def _rehash_after(self, emptied: int) -> None:
+        """Re-inserts the rest of the probe run so lookups don't stop at the new hole."""
+        slots = len(self._rows)
+        slot = (emptied + 1) % slots
+        while self._rows[slot]["key"]:
+            row = self._rows[slot].copy()
+            self._rows[slot] = (b"", 0, 0)
+            self._rows[self._find_slot(_row_digest(row["key"]))] = row
+            slot = (slot + 1) % slots
+
+    def _remember(self, digest: bytes, array: np.ndarray) -> None:
+        with self._local_lock:
+            self._local[digest] = array
+            while len(self._local) > _LOCAL_MAPPINGS:
+                self._local.popitem(last=False)
+
+    def get_or_create(self, key: str, create: Callable[[], np.ndarray]) -> np.ndarray:
+        array = self.get(key)
+        if array is None:
+            array = self.put(key, create())
+        return array
+
+
+def open_shared_cache(directory: str | None, max_bytes: int) -> SharedArrayCache | None:
+    """The host's shared cache, or None where the directory cannot be used."""
+    if not directory:
+        return None
+    try:
+        return SharedArrayCache(directory, max_bytes)
+    except OSError:
+        return None
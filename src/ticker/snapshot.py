@@ -0,0 +1,171 @@
+"""
+Warm-start snapshot of what a cold worker would otherwise regenerate under live traffic.
+
+A snapshot is a directory of ``.npy`` files and a manifest, kept on a disk that survives
+restarts, unlike the tmpfs of the shared cache. It holds the built-in ticker parameter table
+and the most recently used arrays of the shared cache (series increments and downsampling
+pyramids), up to ``SNAPSHOT_MAX_BYTES``. Loading one only reads the manifest: the arrays are
+memory-mapped when first used, the shared cache looking an array up in the snapshot before
+regenerating it.
+
+A new snapshot is written to its own directory and published by atomically replacing the
+symlink at ``SNAPSHOT_DIR``; arrays unchanged since the previous snapshot are hard-linked
+rather than copied. One process per host writes at a time, periodically and on shutdown, and
+skips writing when the current snapshot is recent enough. A snapshot of another format, or
+of other built-in ticker definitions, is ignored.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+from src.ticker import shared_cache
+from src.ticker.built_in_tickers import built_in_tickers_hash, get_built_in_parameter_table, set_built_in_parameter_table
+from src.ticker.generation import get_array_cache
+from src.ticker.shared_cache import SharedArrayCache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+_MANIFEST = "manifest.json"
+_BUILT_IN_PARAMETERS = "built-in-parameters.npy"
+_ARRAYS = "arrays"
+# On shutdown, a snapshot this recent was most likely written by another worker going down too.
+_SHUTDOWN_MIN_AGE_SECONDS = 60.0
+
+
+class Snapshot:
+    def __init__(self, directory: str, manifest: dict):
+        self.directory = directory
+        self.created: float = manifest["created"]
+        self.built_in_hash: str = manifest["built_in_hash"]
+        self.arrays: set[str] = set(manifest["arrays"])
+
+    def array_path(self, name: str) -> str:
+        return os.path.join(self.directory, _ARRAYS, f"{name}.npy")
+
+    def get(self, digest: bytes) -> np.ndarray | None:
+        """A shared cache array by the digest of its key."""
+        name = digest.hex()
+        if name not in self.arrays:
+            return None
+        try:
+            return np.load(self.array_path(name), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def built_in_parameters(self) -> np.ndarray | None:
+        """The built-in parameter table, if the built-in tickers are still defined the same way."""
+        if self.built_in_hash != built_in_tickers_hash():
+            return None
+        try:
+            return np.load(os.path.join(self.directory, _BUILT_IN_PARAMETERS), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+def open_snapshot(path: str | None) -> Snapshot | None:
+    """The snapshot published at ``path``, or None if there is no usable one."""
+    if not path:
+        return None
+    # Resolved once, so that the files read later belong to this snapshot even if it is replaced.
+    directory = os.path.realpath(path)
+    try:
+        with open(os.path.join(directory, _MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != SNAPSHOT_VERSION or manifest.get("cache_version") != shared_cache._VERSION:
+        return None
+    return Snapshot(directory, manifest)
+
+
+def load_snapshot(path: str | None) -> Snapshot | None:
+    """Makes the built-in tickers and the shared cache start from the snapshot at ``path``."""
+    snapshot = open_snapshot(path)
+    if snapshot is None:
+        return None
+    table = snapshot.built_in_parameters()
+    if table is not None:
+        set_built_in_parameter_table(table)
+    array_cache = get_array_cache()
+    if array_cache is not None:
+        array_cache.fallback = snapshot.get
+    logger.info("Loaded the warm-start snapshot of %s", time.ctime(snapshot.created))
+    return snapshot
+
+
+def write_snapshot(path: str, array_cache: SharedArrayCache | None, max_bytes: int, min_age: float = 0.0) -> bool:
+    """
+    Writes and publishes a snapshot, unless another process is writing one or the current one
+    is younger than ``min_age`` seconds. Returns whether it did.
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    with open(os.path.join(parent, f"{name}.lock"), "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        previous = open_snapshot(path)
+        if previous is not None and time.time() - previous.created < min_age:
+            return False
+
+        created = time.time()
+        directory = os.path.join(parent, f"{name}.{time.time_ns()}")
+        os.makedirs(os.path.join(directory, _ARRAYS))
+        np.save(os.path.join(directory, _BUILT_IN_PARAMETERS), get_built_in_parameter_table())
+        arrays = []
+        for digest, source in array_cache.most_recent(max_bytes) if array_cache is not None else []:
+            array_name = digest.hex()
+            target = os.path.join(directory, _ARRAYS, f"{array_name}.npy")
+            try:
+                # Arrays never change under their key, so the previous snapshot's copy will do.
+                if previous is not None and array_name in previous.arrays:
+                    os.link(previous.array_path(array_name), target)
+                else:
+                    shutil.copyfile(source, target)
+            except FileNotFoundError:
+                # Evicted from the cache, or the previous snapshot, in the meantime.
+                continue
+            arrays.append(array_name)
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "cache_version": shared_cache._VERSION,
+            "created": created,
+            "built_in_hash": built_in_tickers_hash(),
+            "arrays": arrays,
+        }
+        with open(os.path.join(directory, _MANIFEST), "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        link = f"{directory}.link"
+        os.symlink(os.path.basename(directory), link)
+        os.replace(link, path)
+        # Keep the previous snapshot too: workers that loaded it may still map its arrays.
+        keep = {os.path.basename(directory), previous and os.path.basename(previous.directory)}
+        for entry in os.listdir(parent):
+            if entry.startswith(f"{name}.") and entry[len(name) + 1:].isdigit() and entry not in keep:
+                shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+        logger.info("Wrote a warm-start snapshot of %d arrays", len(arrays))
+        return True
+
+
+def save_snapshot(path: str, max_bytes: int, min_age: float = _SHUTDOWN_MIN_AGE_SECONDS) -> None:
+    try:
+        write_snapshot(path, get_array_cache(), max_bytes, min_age)
+    except OSError as error:
+        logger.warning("Could not write the warm-start snapshot: %s", error)
+
+
+async def keep_snapshot(path: str, max_bytes: int, interval: float) -> None:
+    """Refreshes the snapshot every ``interval`` seconds, from whichever worker gets to it."""
+    while True:
+        await asyncio.sleep(interval)
+        # Other workers' snapshots count, so that the host writes about one per interval.
+        await asyncio.to_thread(save_snapshot, path, max_bytes, interval / 2)
@@ -0,0 +1,267 @@
+"""
+Summary statistics of a ticker over long windows, without materialising the window.
+
+The window is cut into chunks of ``STATS_CHUNK_STEPS`` points, generated and reduced on the
+process pool. Each chunk comes back as a ``StatsAccumulator`` of constant size, and the
+accumulators of consecutive chunks merge into the one of their union:
+
+* return moments: count, mean and central moment sums, merged with the pairwise update of
+  Welford's algorithm extended to the third and fourth moments (Pébay, 2008);
+* realized variance: the sum of squared log-returns;
+* drawdown: highest and lowest log level and the largest drop from a peak, which for two
+  consecutive chunks is also the first one's peak to the second one's trough;
+* jumps: log-returns further than ``jump_threshold`` standard deviations from the chunk's
+  median, the standard deviation being estimated from the interquartile range so that the
+  jumps themselves barely move it. This works alike for stateful models, whose volatility
+  varies, and for indices and baskets, whose volatility is below their params';
+* quantiles of the log-returns: a KLL sketch, which keeps levels of at most ``capacity``
+  values, each value of level ``h`` standing for ``2**h`` returns. A full level is sorted and
+  every other value, from a random offset, moves up a level.
+
+So memory stays constant in the window's length, and chunks can be reduced in any order and
+in parallel as long as they are merged in time order.
+"""
+import math
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import numpy as np
+
+from src.ticker.generation import INITIAL_PRICE, SECONDS_PER_YEAR, get_series, params_hash, series_key, step_timestamp
+from src.ticker.schemas import TickerDetails, TickerStats
+
+QUANTILE_SKETCH_CAPACITY = 2048
+# The interquartile range of a normal distribution, in standard deviations.
+_NORMAL_IQR = 1.349
+
+
+class QuantileSketch:
+    """Mergeable sketch of a distribution's quantiles (KLL with equal level capacities)."""
+
+    def __init__(self, capacity: int = QUANTILE_SKETCH_CAPACITY, seed: int = 0):
+        self.capacity = capacity
+        # levels[h] holds values standing for 2**h samples each.
+        self.levels: list[np.ndarray] = []
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, values: np.ndarray) -> None:
+        self._insert(0, np.asarray(values, dtype=np.float64))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for level, values in enumerate(other.levels):
+            self._insert(level, values)
+
+    def _insert(self, level: int, values: np.ndarray) -> None:
+        while len(values):
+            while len(self.levels) <= level:
+                self.levels.append(np.empty(0))
+            values = np.concatenate((self.levels[level], values))
+            if len(values) <= self.capacity:
+                self.levels[level] = values
+                return
+            values.sort()
+            # An odd value out stays, so that the promoted ones stand for exactly twice as many.
+            self.levels[level] = values[-1:] if len(values) % 2 else np.empty(0)
+            values = values[int(self._rng.integers(2)):len(values) - len(values) % 2:2]
+            level += 1
+
+    def quantiles(self, levels: list[float]) -> list[float]:
+        values = np.concatenate(self.levels)
+        if not len(values):
+            return [math.nan] * len(levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, ranks = values[order], np.cumsum(weights[order])
+        positions = np.searchsorted(ranks, np.asarray(levels) * ranks[-1], side="left")
+        return values[np.minimum(positions, len(values) - 1)].tolist()
+
+
+@dataclass
+class StatsAccumulator:
+    """Statistics of the log levels of consecutive points and of the log-returns between them."""
+    count: int = 0
+    mean: float = 0.0
+    # Sums of the returns' deviations from their mean, to the 2nd, 3rd and 4th power.
+    m2: float = 0.0
+    m3: float = 0.0
+    m4: float = 0.0
+    sum_squares: float = 0.0
+    jumps: int = 0
+    first_level: float = math.nan
+    last_level: float = math.nan
+    peak: float = -math.inf
+    trough: float = math.inf
+    max_drawdown: float = 0.0
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    @classmethod
+    def from_levels(cls, levels: np.ndarray, jump_threshold: float, seed: int) -> "StatsAccumulator":
+        returns = np.diff(levels)
+        accumulator = cls(
+            count=len(returns),
+            first_level=float(levels[0]),
+            last_level=float(levels[-1]),
+            peak=float(levels.max()),
+            trough=float(levels.min()),
+            max_drawdown=float((np.maximum.accumulate(levels) - levels).max()),
+            sketch=QuantileSketch(seed=seed),
+        )
+        if len(returns):
+            accumulator.mean = float(returns.mean())
+            deviations = returns - accumulator.mean
+            squared = deviations * deviations
+            accumulator.m2 = float(squared.sum())
+            accumulator.m3 = float(np.dot(squared, deviations))
+            accumulator.m4 = float(np.dot(squared, squared))
+            accumulator.sum_squares = float(np.dot(returns, returns))
+            # Sorted once for the robust scale, the jumps and the sketch alike.
+            ordered = np.sort(returns)
+            n = len(ordered)
+            median = ordered[n // 2]
+            band = jump_threshold * (ordered[3 * n // 4] - ordered[n // 4]) / _NORMAL_IQR
+            accumulator.jumps = int(
+                np.searchsorted(ordered, median - band, side="left")
+                + n - np.searchsorted(ordered, median + band, side="right")
+            )
+            accumulator.sketch.add(ordered)
+        return accumulator
+
+    def merge(self, later: "StatsAccumulator") -> None:
+        """Folds in the accumulator of the points right after this one's."""
+        if math.isnan(self.first_level):
+            self.first_level = later.first_level
+            self.max_drawdown = later.max_drawdown
+        elif not math.isnan(later.first_level):
+            self.max_drawdown = max(self.max_drawdown, later.max_drawdown, self.peak - later.trough)
+        n_a, n_b = self.count, later.count
+        n = n_a + n_b
+        if n_b and n_a:
+            delta = later.mean - self.mean
+            self.m4 += (
+                later.m4
+                + delta ** 4 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b) / n ** 3
+                + 6 * delta ** 2 * (n_a * n_a * later.m2 + n_b * n_b * self.m2) / n ** 2
+                + 4 * delta * (n_a * later.m3 - n_b * self.m3) / n
+            )
+            self.m3 += (
+                later.m3
+                + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+                + 3 * delta * (n_a * later.m2 - n_b * self.m2) / n
+            )
+            self.m2 += later.m2 + delta ** 2 * n_a * n_b / n
+            self.mean += delta * n_b / n
+        elif n_b:
+            self.mean, self.m2, self.m3, self.m4 = later.mean, later.m2, later.m3, later.m4
+        self.count = n
+        self.sum_squares += later.sum_squares
+        self.jumps += later.jumps
+        if not math.isnan(later.last_level):
+            self.last_level = later.last_level
+        self.peak = max(self.peak, later.peak)
+        self.trough = min(self.trough, later.trough)
+        self.sketch.merge(later.sketch)
+
+
+def reduce_chunk(
+    details: TickerDetails, interval: int, start: int, stop: int, first: bool, jump_threshold: float, seed: int
+) -> StatsAccumulator:
+    """Reduces the points [start, stop), and the return into ``start`` unless ``first``; runs on the process pool."""
+    levels = get_series(details, interval).log_levels(start if first else start - 1, stop)
+    return StatsAccumulator.from_levels(levels, jump_threshold, seed)
+
+
+_results_cache: "OrderedDict[tuple, TickerStats]" = OrderedDict()
+_results_cache_lock = threading.Lock()
+_RESULTS_CACHE_SIZE = 256
+
+
+def _reduce_in_order(
+    executor: Executor,
+    details: TickerDetails,
+    interval: int,
+    chunks: Iterator[tuple[int, int, bool, int]],
+    jump_threshold: float,
+    max_in_flight: int,
+) -> Iterator[StatsAccumulator]:
+    """
+    Accumulators of the chunks in time order, with at most ``max_in_flight`` submitted but not
+    yet merged, so that a long window neither queues all of its chunks on the pool at once nor
+    holds on to their results.
+    """
+    in_flight: deque[Future] = deque()
+    for chunk in chunks:
+        in_flight.append(executor.submit(reduce_chunk, details, interval, *chunk[:3], jump_threshold, chunk[3]))
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def compute_stats(
+    details: TickerDetails,
+    interval: int,
+    start_step: int,
+    stop_step: int,
+    quantile_levels: list[float],
+    jump_threshold: float,
+    executor: Executor | None,
+    chunk_steps: int,
+    max_in_flight: int = 16,
+) -> TickerStats:
+    """
+    Statistics of the points [start_step, stop_step), reduced chunk by chunk on the executor,
+    at most ``max_in_flight`` at a time, or in the calling thread without one. Results are
+    deterministic, so they are cached by the parameter hash like Monte Carlo results.
+    """
+    cache_key = (params_hash(details), interval, start_step, stop_step, tuple(quantile_levels), jump_threshold)
+    with _results_cache_lock:
+        if cache_key in _results_cache:
+            _results_cache.move_to_end(cache_key)
+            return _results_cache[cache_key]
+
+    seed = series_key(params_hash(details), interval) & 0xFFFFFFFF
+    chunks = (
+        (chunk_start, min(chunk_start + chunk_steps, stop_step), chunk_start == start_step, seed + i)
+        for i, chunk_start in enumerate(range(start_step, stop_step, chunk_steps))
+    )
+    if executor is None:
+        results = (reduce_chunk(details, interval, *chunk[:3], jump_threshold, chunk[3]) for chunk in chunks)
+    else:
+        results = _reduce_in_order(executor, details, interval, chunks, jump_threshold, max_in_flight)
+    total = StatsAccumulator()
+    for accumulator in results:
+        total.merge(accumulator)
+        del accumulator
+
+    count = total.count
+    variance = total.m2 / count
+    std_dev = math.sqrt(variance)
+    result = TickerStats(
+        ticker_code=details.ticker_code,
+        interval=interval,
+        start=int(step_timestamp(start_step, interval)),
+        end=int(step_timestamp(stop_step - 1, interval)),
+        returns=count,
+        first_price=INITIAL_PRICE * math.exp(total.first_level),
+        last_price=INITIAL_PRICE * math.exp(total.last_level),
+        high=INITIAL_PRICE * math.exp(total.peak),
+        low=INITIAL_PRICE * math.exp(total.trough),
+        total_return=math.expm1(total.last_level - total.first_level),
+        mean_return=total.mean,
+        return_std_dev=std_dev,
+        skewness=total.m3 / count / variance ** 1.5 if variance > 0 else 0.0,
+        excess_kurtosis=total.m4 / count / variance ** 2 - 3 if variance > 0 else 0.0,
+        realized_volatility=100 * math.sqrt(total.sum_squares / count / (interval / SECONDS_PER_YEAR)),
+        max_drawdown=-math.expm1(-total.max_drawdown),
+        jumps=total.jumps,
+        quantile_levels=quantile_levels,
+        return_quantiles=total.sketch.quantiles(quantile_levels),
+    )
+    with _results_cache_lock:
+        _results_cache[cache_key] = result
+        while len(_results_cache) > _RESULTS_CACHE_SIZE:
+            _results_cache.popitem(last=False)
+    return result
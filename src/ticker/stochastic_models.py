@@ -0,0 +1,378 @@
+"""
+Registry of the stochastic models a ticker's path can follow.
+
+Every model works on many paths at once. Its randomness is drawn up front as fixed-size
+per-step shocks (``n_normals`` normals and ``n_uniforms`` uniforms per path and step), and
+``simulate`` then runs the model's recursion over a chunk of steps, vectorised across paths.
+Models with sequential dependence carry their state from one chunk to the next.
+
+Jumps in the stateful models are Bernoulli per step (probability ``jump_intensity * dt``),
+which matches the Poisson jumps of the Merton model to first order in ``dt``.
+
+Series chain the states at the starts of their blocks with ``chain_states``, which draws the
+state a number of steps later from the model's transition law in O(1). ``block_moments`` gives
+the law of the aggregate move of the steps between two such states, as Merton moments: per-step
+drift and volatility averaged over the steps, and the per-step jump probability and size. Series
+draw each block's aggregate move from it, in O(1) per block, before simulating the steps inside
+the block with ``simulate_bridge``.
+"""
+import math
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Type
+
+import numpy as np
+
+from src.ticker.schemas import TickerModelEnum
+
+if TYPE_CHECKING:
+    from src.ticker.generation import MertonParams
+
+# Upper bound on paths * steps simulated per chunk.
+CHUNK_ELEMENTS = 1 << 20
+
+
+class StochasticModel:
+    """Base class: constant-coefficient Merton jump diffusion."""
+    n_normals = 2
+    n_uniforms = 1
+    defaults: Dict[str, float | None] = {}
+
+    def __init__(self, params: "MertonParams", model_params: Dict[str, float] | None, dt: float):
+        """``params`` are the ticker's ``MertonParams``; ``model_params`` use the same percent units."""
+        self.params = params
+        self.dt = dt
+        self.model_params = {**self.defaults, **(model_params or {})}
+
+    @classmethod
+    def validate(cls, model_params: Dict[str, float] | None) -> None:
+        unknown = set(model_params or {}) - set(cls.defaults)
+        if unknown:
+            raise ValueError(f"Unknown parameters for this model: {', '.join(sorted(unknown))}.")
+
+    def initial_state(self, rng: np.random.Generator, n_paths: int) -> Any:
+        return None
+
+    def chain_states(self, rng: np.random.Generator, start: Any, n_steps: int, count: int) -> Any:
+        """
+        The states after each of ``count`` consecutive runs of ``n_steps`` steps from the state
+        ``start`` of one path, drawn in O(1) per run.
+        """
+        return None
+
+    def block_moments(self, state: Any, end_state: Any, n_steps: int) -> tuple[np.ndarray | float, ...]:
+        """
+        Per-step drift, volatility, jump probability, jump mean and jump standard deviation of
+        the ``n_steps`` steps from ``state`` to ``end_state``, one per path.
+        """
+        p = self.params
+        drift = (p.drift - p.volatility ** 2 / 2 - p.jump_compensator) * self.dt
+        return drift, p.volatility * math.sqrt(self.dt), p.jump_intensity * self.dt, p.jump_mean, p.jump_std_dev
+
+    def simulate(self, z: np.ndarray, u: np.ndarray, state: Any) -> tuple[np.ndarray, Any]:
+        """Log-returns of shape (steps, paths) from shocks ``z`` (steps, paths, n_normals) and ``u``."""
+        p = self.params
+        drift = (p.drift - p.volatility ** 2 / 2 - p.jump_compensator) * self.dt
+        jumps = (u[..., 0] < p.jump_intensity * self.dt) * (p.jump_mean + p.jump_std_dev * z[..., 1])
+        return drift + p.volatility * math.sqrt(self.dt) * z[..., 0] + jumps, state
+
+    def simulate_bridge(self, z: np.ndarray, u: np.ndarray, state: Any, end_state: Any) -> np.ndarray:
+        """
+        Like ``simulate``, for paths known to be in ``end_state`` after the last step. Only
+        models that can pin the end exactly use it; the others leave the end state free.
+        """
+        return self.simulate(z, u, state)[0]
+
+
+class RegimeSwitchingModel(StochasticModel):
+    """Two-state Markov chain between the ticker's own (calm) parameters and a stressed set."""
+    n_normals = 2
+    n_uniforms = 2
+    defaults = {
+        # Per-year transition rates.
+        "calm_to_stressed": 1.0,
+        "stressed_to_calm": 4.0,
+        # Stressed parameters, in the same percent units as the ticker's own. Missing ones
+        # are derived from the calm parameters.
+        "stressed_drift": -20.0,
+        "stressed_volatility": None,
+        "stressed_jump_intensity": None,
+        "stressed_jump_mean": None,
+        "stressed_jump_std_dev": None,
+    }
+
+    def __init__(self, params: "MertonParams", model_params: Dict[str, float] | None, dt: float):
+        super().__init__(params, model_params, dt)
+        mp = self.model_params
+        p = params
+        drift = np.array([p.drift, mp["stressed_drift"] / 100])
+        volatility = np.array([p.volatility, _percent_or(mp["stressed_volatility"], 2 * p.volatility)])
+        jump_intensity = np.array([p.jump_intensity, _or(mp["stressed_jump_intensity"], 3 * p.jump_intensity)])
+        self.jump_mean = np.array([p.jump_mean, _percent_or(mp["stressed_jump_mean"], p.jump_mean - 0.02)])
+        self.jump_std_dev = np.array([p.jump_std_dev, _percent_or(mp["stressed_jump_std_dev"], 2 * p.jump_std_dev)])
+
+        compensator = jump_intensity * (np.exp(self.jump_mean + self.jump_std_dev ** 2 / 2) - 1)
+        self.step_drift = (drift - volatility ** 2 / 2 - compensator) * dt
+        self.step_volatility = volatility * math.sqrt(dt)
+        self.jump_probability = jump_intensity * dt
+        self.switch_probability = 1 - np.exp(-np.array([mp["calm_to_stressed"], mp["stressed_to_calm"]]) * dt)
+        rates = mp["calm_to_stressed"] + mp["stressed_to_calm"]
+        self.stressed_share = mp["calm_to_stressed"] / rates if rates else 0.0
+
+    def initial_state(self, rng: np.random.Generator, n_paths: int) -> np.ndarray:
+        return (rng.random(n_paths) < self.stressed_share).astype(np.intp)
+
+    def _transitions(self, steps: np.ndarray | int) -> np.ndarray:
+        """The transition matrices over each of ``steps`` steps, ``P**k = S + (1 - p01 - p10)**k (I - S)``."""
+        switch = self.switch_probability
+        total = switch.sum()
+        # S has the stationary law in both rows; any law will do when the regimes never switch.
+        stationary = np.tile(np.array([switch[1], switch[0]]) / total if total else np.array([1.0, 0.0]), (2, 1))
+        decay = np.asarray((1 - total) ** np.asarray(steps, dtype=np.float64))
+        return stationary + decay[..., None, None] * (np.eye(2) - stationary)
+
+    def chain_states(self, rng: np.random.Generator, start: np.intp, n_steps: int, count: int) -> np.ndarray:
+        stressed = self._transitions(n_steps)[:, 1].tolist()
+        states = np.empty(count, dtype=np.intp)
+        state = int(start)
+        for i, draw in enumerate(rng.random(count).tolist()):
+            state = int(draw < stressed[state])
+            states[i] = state
+        return states
+
+    def block_moments(self, state: np.ndarray, end_state: np.ndarray, n_steps: int) -> tuple[np.ndarray, ...]:
+        powers = self._transitions(np.arange(n_steps + 1))
+        # Expected share of the steps spent in regime i from s to e: P**(t+1)[s, i] P**(n-t-1)[i, e]
+        # averaged over the steps t, over P**n[s, e].
+        with np.errstate(divide="ignore", invalid="ignore"):
+            occupancy = np.einsum("tsi,tie->sei", powers[1:], powers[-2::-1]) / n_steps / powers[-1][:, :, None]
+        shares = occupancy[state, end_state]
+        jump_weights = shares * self.jump_probability
+        jump_probability = jump_weights.sum(axis=1)
+        jump_weights /= np.where(jump_probability > 0, jump_probability, 1)[:, None]
+        jump_mean = jump_weights @ self.jump_mean
+        jump_variance = jump_weights @ (self.jump_std_dev ** 2 + self.jump_mean ** 2) - jump_mean ** 2
+        return (
+            shares @ self.step_drift,
+            np.sqrt(shares @ self.step_volatility ** 2),
+            jump_probability,
+            jump_mean,
+            np.sqrt(np.maximum(jump_variance, 0)),
+        )
+
+    def simulate(self, z: np.ndarray, u: np.ndarray, state: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        regimes = np.empty(z.shape[:2], dtype=np.intp)
+        regime = state
+        for t in range(len(z)):
+            regime = regime ^ (u[t, :, 1] < self.switch_probability[regime])
+            regimes[t] = regime
+        return self._increments(z, u, regimes), regime
+
+    def simulate_bridge(self, z: np.ndarray, u: np.ndarray, state: np.ndarray, end_state: np.ndarray) -> np.ndarray:
+        n_steps = len(z)
+        powers = self._transitions(np.arange(n_steps + 1))
+        regimes = np.empty(z.shape[:2], dtype=np.intp)
+        regime = state
+        for t in range(n_steps):
+            # Switching now and then reaching end_state, over reaching it from the current regime.
+            remaining = powers[n_steps - t - 1]
+            switch = self.switch_probability[regime] * remaining[1 - regime, end_state] / powers[n_steps - t][regime, end_state]
+            regime = regime ^ (u[t, :, 1] < switch)
+            regimes[t] = regime
+        return self._increments(z, u, regimes)
+
+    def _increments(self, z: np.ndarray, u: np.ndarray, regimes: np.ndarray) -> np.ndarray:
+        jumps = (u[..., 0] < self.jump_probability[regimes]) * (
+            self.jump_mean[regimes] + self.jump_std_dev[regimes] * z[..., 1]
+        )
+        return self.step_drift[regimes] + self.step_volatility[regimes] * z[..., 0] + jumps
+
+
+class GarchModel(StochasticModel):
+    """GARCH(1,1) variance whose long-run level is the ticker's volatility."""
+    n_normals = 2
+    n_uniforms = 1
+    defaults = {
+        "alpha": 0.05,
+        "beta": 0.9,
+    }
+
+    @classmethod
+    def validate(cls, model_params: Dict[str, float] | None) -> None:
+        super().validate(model_params)
+        mp = {**cls.defaults, **(model_params or {})}
+        if mp["alpha"] < 0 or mp["beta"] < 0 or mp["alpha"] + mp["beta"] >= 1:
+            raise ValueError("GARCH parameters need alpha >= 0, beta >= 0 and alpha + beta < 1.")
+
+    def __init__(self, params: "MertonParams", model_params: Dict[str, float] | None, dt: float):
+        super().__init__(params, model_params, dt)
+        self.alpha = self.model_params["alpha"]
+        self.beta = self.model_params["beta"]
+        self.long_run_variance = params.volatility ** 2 * dt
+        self.omega = self.long_run_variance * (1 - self.alpha - self.beta)
+
+    def initial_state(self, rng: np.random.Generator, n_paths: int) -> np.ndarray:
+        return np.full(n_paths, self.long_run_variance)
+
+    def chain_states(self, rng: np.random.Generator, start: float, n_steps: int, count: int) -> np.ndarray:
+        # The variance n steps on is L + phi**n (v - L) + alpha * sum_k phi**(n-1-k) (r_k**2 - v_k),
+        # with phi = alpha + beta. It is drawn from a gamma law with that mean and the variance
+        # of the innovations' sum, 2 alpha**2 sum_k phi**(2(n-1-k)) m_k**2, taking each step's
+        # variance v_k at its mean m_k = L + phi**k (v - L).
+        level = self.long_run_variance
+        persistence = self.alpha + self.beta
+        decay = persistence ** n_steps
+        level_weight = (1 - persistence ** (2 * n_steps)) / (1 - persistence ** 2)
+        cross_weight = persistence ** (n_steps - 1) * (1 - decay) / (1 - persistence)
+        gap_weight = n_steps * persistence ** (2 * n_steps - 2)
+        states = np.empty(count)
+        state = float(start)
+        for i in range(count):
+            gap = state - level
+            mean = level + decay * gap
+            variance = 2 * self.alpha ** 2 * (
+                level ** 2 * level_weight + 2 * level * gap * cross_weight + gap ** 2 * gap_weight
+            )
+            state = rng.gamma(mean ** 2 / variance, variance / mean) if variance > 0 else mean
+            states[i] = state
+        return states
+
+    def block_moments(self, state: np.ndarray, end_state: np.ndarray, n_steps: int) -> tuple[np.ndarray | float, ...]:
+        p = self.params
+        variance = _mean_reverting_average(state, self.long_run_variance, self.alpha + self.beta, n_steps)
+        return (
+            (p.drift - p.jump_compensator) * self.dt - variance / 2,
+            np.sqrt(variance),
+            p.jump_intensity * self.dt,
+            p.jump_mean,
+            p.jump_std_dev,
+        )
+
+    def simulate(self, z: np.ndarray, u: np.ndarray, state: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        p = self.params
+        shocks = np.empty(z.shape[:2])
+        variances = np.empty(z.shape[:2])
+        variance = state
+        for t in range(len(z)):
+            variances[t] = variance
+            shocks[t] = np.sqrt(variance) * z[t, :, 0]
+            variance = self.omega + self.alpha * shocks[t] ** 2 + self.beta * variance
+        jumps = (u[..., 0] < p.jump_intensity * self.dt) * (p.jump_mean + p.jump_std_dev * z[..., 1])
+        return (p.drift - p.jump_compensator) * self.dt - variances / 2 + shocks + jumps, variance
+
+
+class HestonModel(StochasticModel):
+    """Heston variance (full-truncation Euler) mean-reverting to the ticker's volatility, plus jumps."""
+    n_normals = 3
+    n_uniforms = 1
+    defaults = {
+        "kappa": 2.0,
+        "xi": 0.3,
+        "rho": -0.7,
+    }
+
+    @classmethod
+    def validate(cls, model_params: Dict[str, float] | None) -> None:
+        super().validate(model_params)
+        mp = {**cls.defaults, **(model_params or {})}
+        if mp["kappa"] <= 0 or mp["xi"] <= 0 or not -1 <= mp["rho"] <= 1:
+            raise ValueError("Heston parameters need kappa > 0, xi > 0 and -1 <= rho <= 1.")
+
+    def __init__(self, params: "MertonParams", model_params: Dict[str, float] | None, dt: float):
+        super().__init__(params, model_params, dt)
+        self.kappa = self.model_params["kappa"]
+        self.xi = self.model_params["xi"]
+        self.rho = self.model_params["rho"]
+        self.theta = params.volatility ** 2
+
+    def initial_state(self, rng: np.random.Generator, n_paths: int) -> np.ndarray:
+        # Stationary law of the CIR process.
+        shape = 2 * self.kappa * self.theta / self.xi ** 2
+        return rng.gamma(shape, self.theta / shape, n_paths)
+
+    def chain_states(self, rng: np.random.Generator, start: float, n_steps: int, count: int) -> np.ndarray:
+        # The exact CIR transition: a scaled noncentral chi-square.
+        decay = math.exp(-self.kappa * n_steps * self.dt)
+        scale = self.xi ** 2 * (1 - decay) / (4 * self.kappa)
+        degrees = 4 * self.kappa * self.theta / self.xi ** 2
+        states = np.empty(count)
+        state = float(start)
+        for i in range(count):
+            state = scale * rng.noncentral_chisquare(degrees, state * decay / scale)
+            states[i] = state
+        return states
+
+    def block_moments(self, state: np.ndarray, end_state: np.ndarray, n_steps: int) -> tuple[np.ndarray | float, ...]:
+        p = self.params
+        variance = _mean_reverting_average(state, self.theta, math.exp(-self.kappa * self.dt), n_steps)
+        return (
+            (p.drift - p.jump_compensator - variance / 2) * self.dt,
+            np.sqrt(variance * self.dt),
+            p.jump_intensity * self.dt,
+            p.jump_mean,
+            p.jump_std_dev,
+        )
+
+    def simulate(self, z: np.ndarray, u: np.ndarray, state: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        p = self.params
+        dt = self.dt
+        sqrt_dt = math.sqrt(dt)
+        price_z = z[..., 0]
+        variance_z = self.rho * price_z + math.sqrt(1 - self.rho ** 2) * z[..., 2]
+        variances = np.empty(z.shape[:2])
+        variance = state
+        for t in range(len(z)):
+            positive = np.maximum(variance, 0.0)
+            variances[t] = positive
+            variance = variance + self.kappa * (self.theta - positive) * dt + self.xi * np.sqrt(positive) * sqrt_dt * variance_z[t]
+        jumps = (u[..., 0] < p.jump_intensity * dt) * (p.jump_mean + p.jump_std_dev * z[..., 1])
+        increments = (p.drift - p.jump_compensator - variances / 2) * dt + np.sqrt(variances) * sqrt_dt * price_z + jumps
+        return increments, variance
+
+
+MODELS: Dict[TickerModelEnum, Type[StochasticModel]] = {
+    TickerModelEnum.MERTON: StochasticModel,
+    TickerModelEnum.REGIME_SWITCHING: RegimeSwitchingModel,
+    TickerModelEnum.GARCH: GarchModel,
+    TickerModelEnum.HESTON: HestonModel,
+}
+
+
+def get_model(model: TickerModelEnum, params: "MertonParams", model_params: Dict[str, float] | None, dt: float) -> StochasticModel:
+    return MODELS[model](params, model_params, dt)
+
+
+def validate_model_params(model: TickerModelEnum, model_params: Dict[str, float] | None) -> None:
+    """Raises ValueError if the parameters do not fit the model."""
+    MODELS[model].validate(model_params)
+
+
+def draw_shocks(model: StochasticModel, rng: np.random.Generator, n_steps: int, n_paths: int) -> tuple[np.ndarray, np.ndarray]:
+    z = rng.standard_normal((n_steps, n_paths, model.n_normals))
+    u = rng.random((n_steps, n_paths, model.n_uniforms))
+    return z, u
+
+
+def simulate_paths(
+    model: StochasticModel, rng: np.random.Generator, n_paths: int, n_steps: int
+) -> Iterator[np.ndarray]:
+    """Yields the log-returns of ``n_paths`` paths as (steps, paths) chunks over time."""
+    chunk_steps = max(1, CHUNK_ELEMENTS // n_paths)
+    state = model.initial_state(rng, n_paths)
+    for chunk_start in range(0, n_steps, chunk_steps):
+        z, u = draw_shocks(model, rng, min(chunk_steps, n_steps - chunk_start), n_paths)
+        increments, state = model.simulate(z, u, state)
+        yield increments
+
+
+def _mean_reverting_average(start: np.ndarray, level: float, persistence: float, n_steps: int) -> np.ndarray:
+    """Average over ``n_steps`` steps of the expected variance, from ``start``, reverting to ``level``."""
+    if persistence >= 1:
+        return start
+    return level + (start - level) * (1 - persistence ** n_steps) / (n_steps * (1 - persistence))
+
+
+def _or(value: float | None, default: float) -> float:
+    return default if value is None else value
+
+
+def _percent_or(value: float | None, default: float) -> float:
+    return default if value is None else value / 100
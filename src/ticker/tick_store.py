@@ -0,0 +1,155 @@
+"""
+Persisted tick datasets: a user's ticks of a ticker over a window, kept in the ``ticks`` table.
+
+The table is range-partitioned by day on time, so a query over a window only scans the days it
+covers; the partitions a dataset needs are created (in a short transaction of their own, as it
+locks the parent table) before its rows are written.
+
+Rows are written with ``COPY ... FROM STDIN`` in binary format. Each chunk of the series is
+encoded into its wire format by NumPy: a packed big-endian record per row with the field
+count, each field's length and its value, so no Python object is made per row. Ingesting a
+window again replaces its rows.
+"""
+import datetime
+import uuid
+
+import numpy as np
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from src.ticker.generation import Series, step_timestamp
+from src.ticker.models import ticks
+
+SECONDS_PER_DAY = 86400
+# Postgres counts time in microseconds from 2000-01-01 UTC.
+_POSTGRES_EPOCH_TIMESTAMP = 946684800
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + b"\x00\x00\x00\x00" + b"\x00\x00\x00\x00"
+_COPY_TRAILER = b"\xff\xff"
+# A row of the binary COPY format, in the column order of _COPY_STATEMENT.
+_COPY_ROW = np.dtype([
+    ("fields", ">i2"),
+    ("user_id_size", ">i4"),
+    ("user_id", "S16"),
+    ("ticker_code_size", ">i4"),
+    ("ticker_code", "S4"),
+    ("interval_size", ">i4"),
+    ("interval", ">i4"),
+    ("time_size", ">i4"),
+    ("time", ">i8"),
+    ("price_size", ">i4"),
+    ("price", ">f8"),
+])
+_COPY_STATEMENT = "COPY ticks (user_id, ticker_code, interval, time, price) FROM STDIN (FORMAT BINARY)"
+# Serialises the creation of partitions across sessions.
+_PARTITION_LOCK_KEY = 0x7469636B
+
+
+def partition_days(first_timestamp: int, last_timestamp: int) -> range:
+    """Days (since the Unix epoch) of the partitions holding the times between the two, inclusive."""
+    return range(first_timestamp // SECONDS_PER_DAY, last_timestamp // SECONDS_PER_DAY + 1)
+
+
+def partition_name(day: int) -> str:
+    return f"ticks_p{datetime.date.fromordinal(day + datetime.date(1970, 1, 1).toordinal()):%Y%m%d}"
+
+
+def ensure_partitions(session: Session, days: range) -> None:
+    """Creates the missing day partitions and commits, in as few round-trips as possible."""
+    existing = set(session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'ticks'::regclass"
+    )).scalars())
+    missing = [day for day in days if partition_name(day) not in existing]
+    if not missing:
+        session.rollback()
+        return
+    statements = [f"SELECT pg_advisory_xact_lock({_PARTITION_LOCK_KEY})"]
+    for day in missing:
+        lower = datetime.datetime.fromtimestamp(day * SECONDS_PER_DAY, datetime.UTC).isoformat()
+        upper = datetime.datetime.fromtimestamp((day + 1) * SECONDS_PER_DAY, datetime.UTC).isoformat()
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF ticks "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+    # Driver-level, as the timestamps' colons would read as bind parameters in text().
+    session.connection().exec_driver_sql("; ".join(statements))
+    session.commit()
+
+
+def encode_copy_rows(user_id: uuid.UUID, ticker_code: str, interval: int, timestamps: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """The rows of one dataset, as records of the binary COPY format."""
+    rows = np.empty(len(prices), dtype=_COPY_ROW)
+    rows[...] = np.array(
+        (5, 16, user_id.bytes, 4, ticker_code.encode(), 4, interval, 8, 0, 8, 0.0), dtype=_COPY_ROW
+    )
+    rows["time"] = (np.asarray(timestamps, dtype=np.int64) - _POSTGRES_EPOCH_TIMESTAMP) * 1_000_000
+    rows["price"] = prices
+    return rows
+
+
+def ingest_ticks(
+    session: Session,
+    user_id: uuid.UUID,
+    ticker_code: str,
+    series: Series,
+    start_step: int,
+    stop_step: int,
+    chunk_steps: int,
+) -> int:
+    """
+    Writes the ticks [start_step, stop_step) of ``series`` as the user's dataset, replacing any
+    ticks of the same series in that window, and commits. Returns the number of rows.
+    """
+    interval = series.interval
+    first_timestamp = int(step_timestamp(start_step, interval))
+    last_timestamp = int(step_timestamp(stop_step - 1, interval))
+    ensure_partitions(session, partition_days(first_timestamp, last_timestamp))
+
+    session.execute(delete(ticks).where(
+        ticks.c.user_id == user_id,
+        ticks.c.ticker_code == ticker_code,
+        ticks.c.interval == interval,
+        ticks.c.time >= datetime.datetime.fromtimestamp(first_timestamp, datetime.UTC),
+        ticks.c.time <= datetime.datetime.fromtimestamp(last_timestamp, datetime.UTC),
+    ))
+    cursor = session.connection().connection.driver_connection.cursor()
+    with cursor.copy(_COPY_STATEMENT) as copy:
+        copy.write(_COPY_SIGNATURE)
+        for chunk_start in range(start_step, stop_step, chunk_steps):
+            chunk_stop = min(chunk_start + chunk_steps, stop_step)
+            steps = np.arange(chunk_start, chunk_stop, dtype=np.int64)
+            rows = encode_copy_rows(
+                user_id, ticker_code, interval, step_timestamp(steps, interval), series.prices(chunk_start, chunk_stop)
+            )
+            copy.write(rows.view(np.uint8).data)
+        copy.write(_COPY_TRAILER)
+    session.commit()
+    return stop_step - start_step
+
+
+def read_ticks(
+    session: Session,
+    user_id: uuid.UUID,
+    ticker_code: str,
+    interval: int,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    limit: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Timestamps and prices of the user's persisted ticks in [start, end), at most ``limit`` of them."""
+    rows = session.execute(
+        select(ticks.c.time, ticks.c.price)
+        .where(
+            ticks.c.user_id == user_id,
+            ticks.c.ticker_code == ticker_code,
+            ticks.c.interval == interval,
+            # Bounds on the partition key prune the days outside the window.
+            ticks.c.time >= start,
+            ticks.c.time < end,
+        )
+        .order_by(ticks.c.time)
+        .limit(limit)
+    ).all()
+    timestamps = np.fromiter((int(row.time.timestamp()) for row in rows), dtype=np.int64, count=len(rows))
+    prices = np.fromiter((row.price for row in rows), dtype=np.float64, count=len(rows))
+    return timestamps, prices
@@ -1,4 +1,6 @@
-from src.ticker.schemas import TickerDetails, TickerTypeEnum
+from src import security
+from src.ticker.generation import GeneratorState
+from src.ticker.schemas import BasketConstituent, TickerDetails, TickerTypeEnum
 from src.ticker.models import UserDefinedTicker
 
 
@@ -27,6 +29,72 @@ def compute_user_defined_ticker_derived_details(ticker_code: str, custom_ticker_
         jump_intensity=custom_ticker_details.jump_intensity,
         jump_mean=custom_ticker_details.jump_mean,
         jump_std_dev=custom_ticker_details.jump_std_dev,
+        model=custom_ticker_details.model,
+        model_params=custom_ticker_details.model_params,
         market=market,
         type=TickerTypeEnum.USER_DEFINED,
     )
+
+
+def compute_composite_details(
+    ticker_code: str,
+    name: str,
+    description: str | None,
+    sector: str | None,
+    constituents: list[tuple[TickerDetails, float]],
+    ticker_type: TickerTypeEnum,
+) -> TickerDetails:
+    """Details of an index or basket, with normalised weights and weight-averaged params."""
+    total_weight = sum(weight for _, weight in constituents)
+
+    def weighted_mean(field: str) -> float:
+        return round(sum(getattr(details, field) * weight for details, weight in constituents) / total_weight, 2)
+
+    return TickerDetails(
+        ticker_code=ticker_code,
+        name=name,
+        description=description,
+        sector=sector,
+        drift=weighted_mean("drift"),
+        volatility=weighted_mean("volatility"),
+        jump_intensity=weighted_mean("jump_intensity"),
+        jump_mean=weighted_mean("jump_mean"),
+        jump_std_dev=weighted_mean("jump_std_dev"),
+        market="composite",
+        type=ticker_type,
+        constituents=[
+            BasketConstituent(ticker_code=details.ticker_code, weight=weight / total_weight, details=details)
+            for details, weight in constituents
+        ],
+    )
+
+
+def encode_series_cursor(state: GeneratorState) -> str:
+    """Signs the generator state so any worker can continue the path from it."""
+    return security.create_cursor_token({
+        "tc": state.ticker_code,
+        "ph": state.params_hash,
+        "i": state.interval,
+        "k": format(state.key, "x"),
+        "n": state.counter,
+        "p": state.last_price,
+        "t": state.timestamp,
+    })
+
+
+def decode_series_cursor(cursor: str) -> GeneratorState | None:
+    payload = security.decode_cursor_token(cursor)
+    if payload is None:
+        return None
+    try:
+        return GeneratorState(
+            ticker_code=payload["tc"],
+            params_hash=payload["ph"],
+            interval=int(payload["i"]),
+            key=int(payload["k"], 16),
+            counter=int(payload["n"]),
+            last_price=float(payload["p"]),
+            timestamp=int(payload["t"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
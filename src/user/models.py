@@ -1,7 +1,7 @@
 import datetime
 import uuid
 
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Float
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -24,6 +24,12 @@ class User(Base):
     last_name = Column(String(255), nullable=False)
     created_at = Column(DateTime(timezone=True), default=utcnow)
     updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+    # Per-user rate limits; NULL means the defaults from settings.
+    requests_per_second = Column(Float, nullable=True)
+    points_per_second = Column(Float, nullable=True)
 
     # Relationships
-    tickers = relationship("UserDefinedTicker", back_populates="user", cascade="all, delete-orphan")
+    # The foreign keys cascade on delete, so deleting a user needn't load these first.
+    tickers = relationship("UserDefinedTicker", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    baskets = relationship("UserDefinedBasket", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    alerts = relationship("PriceAlert", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from src import security
 from src.dependencies import SessionDep, CurrentUser, get_current_active_superuser
 from src.email import service as email_service
+from src.query_budget import query_budget
 from src.user import service
 from src.user.schemas import UserPublic, UserCreate, UserUpdateMe, Message, UpdatePassword, UsersPublic, UserUpdate
 
@@ -13,13 +14,13 @@ from src.user.schemas import UserPublic, UserCreate, UserUpdateMe, Message, Upda
 main_router = APIRouter()
 
 
-@main_router.get("/me", response_model=UserPublic)
+@main_router.get("/me", response_model=UserPublic, dependencies=[Depends(query_budget(1))])
 def read_user_me(current_user: CurrentUser) -> Any:
     """Get current user."""
     return current_user
 
 
-@main_router.patch("/me", response_model=UserPublic)
+@main_router.patch("/me", response_model=UserPublic, dependencies=[Depends(query_budget(4))])
 def update_user_me(
     *, session: SessionDep, current_user: CurrentUser, user_in: UserUpdateMe,
 ) -> Any:
@@ -35,7 +36,7 @@ def update_user_me(
     return updated_user
 
 
-@main_router.patch("/me/password", response_model=Message)
+@main_router.patch("/me/password", response_model=Message, dependencies=[Depends(query_budget(3))])
 def update_password_me(
     *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
@@ -51,7 +52,7 @@ def update_password_me(
     return Message(message="Password updated successfully.")
 
 
-@main_router.delete("/me", response_model=Message)
+@main_router.delete("/me", response_model=Message, dependencies=[Depends(query_budget(2))])
 def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
     """
     Delete own user.
@@ -66,7 +67,7 @@ admin_router = APIRouter()
 
 @admin_router.get(
     "/",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), Depends(query_budget(3))],
     response_model=UsersPublic,
     include_in_schema=False
 )
@@ -102,7 +103,7 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
 
 @admin_router.get(
     "/{user_id}",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), Depends(query_budget(2))],
     response_model=UserPublic,
     include_in_schema=False
 )
@@ -119,7 +120,7 @@ def read_user_by_id(session: SessionDep, user_id: uuid.UUID) -> UserPublic:
 
 @admin_router.patch(
     "/{user_id}",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), Depends(query_budget(5))],
     response_model=UserPublic,
     include_in_schema=False
 )
@@ -149,7 +150,7 @@ def update_user(
 
 @admin_router.delete(
     "/{user_id}",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser), Depends(query_budget(3))],
     include_in_schema=False
 )
 def delete_user(
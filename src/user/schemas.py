@@ -54,6 +54,8 @@ class UserUpdate(BaseModel):
     password: Optional[str] = Field(default=None, min_length=8, max_length=40)
     first_name: Optional[str] = Field(default=None, max_length=255)
     last_name: Optional[str] = Field(default=None, max_length=255)
+    requests_per_second: Optional[float] = Field(default=None, gt=0)
+    points_per_second: Optional[float] = Field(default=None, gt=0)
 
 
 class UsersPublic(BaseModel):